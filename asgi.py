@@ -0,0 +1,399 @@
+"""ASGI serving mode: the routes of main.py on FastAPI, for many concurrent connections per worker.
+
+Uploads are read and the OpenRouter review is awaited on the event loop, so
+an idle or slow connection costs a coroutine, not a thread. PDF parsing,
+OCR and TF-IDF scoring run on the bounded stage executors of
+etl_pipeline/executors.py; sqlite, file and subprocess calls (job store,
+metrics, caches, catalogue, keyword config) go through asyncio.to_thread.
+Serve it with the same gunicorn settings as the Flask app, or with uvicorn
+directly:
+
+    GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn -c gunicorn.conf.py asgi:app
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import io
+import os
+import time
+import zipfile
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from starlette.exceptions import HTTPException
+from starlette.routing import Match
+
+from etl_pipeline.executors import stage_runner, StageBusy, StageTimeout
+from etl_pipeline.extract import extract_resume_features, check_upload, resolve_names, DocumentRejected
+from etl_pipeline.predict import predict_batch
+from etl_pipeline.sinks import log_results
+from etl_pipeline.feedback import areview
+from etl_pipeline.jobs import job_queue, QueueFull, CallbackRejected, check_callback_url, public_job
+from etl_pipeline.review_client import review_client
+from etl_pipeline import catalogue
+from etl_pipeline import keywords
+from etl_pipeline import metrics
+from etl_pipeline.cache import extraction_cache
+from etl_pipeline.uploads import archive_members, ArchiveTooLarge
+from service import ADMIN_TOKEN, MAX_BATCH_FILES, allowed_file, score_upload, review_upload
+
+app = FastAPI(title="PathFinder ML API", version="1.0.0", docs_url=None, redoc_url=None, openapi_url=None)
+
+
+def error(message, status, headers=None):
+    return JSONResponse({"error": message}, status, headers=headers)
+
+
+def endpoint_of(scope):
+    """Route template of a request, as the metrics label it"""
+    for route in app.router.routes:
+        if route.matches(scope)[0] == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+@app.middleware("http")
+async def request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    endpoint = endpoint_of(request.scope)
+    metrics.IN_FLIGHT.inc(endpoint=endpoint)
+    metrics.start_flusher()
+    # Opt-in per-request stage breakdown, returned as a Server-Timing header
+    trace = metrics.start_trace() if request.headers.get('X-Trace') else None
+    try:
+        response = await call_next(request)
+    finally:
+        metrics.IN_FLIGHT.dec(endpoint=endpoint)
+    elapsed = time.perf_counter() - started
+    metrics.REQUEST_SECONDS.observe(elapsed, endpoint=endpoint)
+    metrics.REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    if trace is not None:
+        response.headers['Server-Timing'] = metrics.server_timing(metrics.finish_trace(trace), elapsed)
+    return response
+
+
+def rejected(e):
+    """Response for an upload refused by pre-flight checks or a stage at its limits"""
+    if isinstance(e, DocumentRejected):
+        return error(str(e), e.status)
+    if isinstance(e, StageBusy):
+        return error(str(e), 503, {"Retry-After": str(e.retry_after)})
+    return error(str(e), 504)
+
+
+async def single_upload(request):
+    """(form, file) of a one-resume upload, or (None, error response)"""
+    form = await request.form()
+    file = form.get('file')
+    if file is None or isinstance(file, str):
+        return None, error("No file part in request", 400)
+    if file.filename == '':
+        return None, error("No selected file", 400)
+    if not allowed_file(file.filename):
+        return None, error("Unsupported file type. Only .pdf accepted", 400)
+    return form, file
+
+
+async def extract(data, resolve_name=True):
+    """Features of one PDF; scans go to the OCR stage so they don't hold up text-layer PDFs"""
+    # Cache lookup and pdfium probe in one pre-flight call; the probe is handed on, not repeated
+    preflight = await stage_runner.run("preflight", check_upload, data, resolve_name)
+    if preflight.features is not None:
+        return preflight.features
+    lane = "ocr" if preflight.needs_ocr else "extract"
+    return await stage_runner.run(lane, extract_resume_features, data, resolve_name, preflight)
+
+
+def wants_async(request):
+    """Clients opt into a 202 + job id with ?async=1 or a "Prefer: respond-async" header"""
+    return request.query_params.get('async') in ('1', 'true') or 'respond-async' in request.headers.get('Prefer', '')
+
+
+def wants_explain(request):
+    """?explain=1 adds the shared terms behind each recommendation"""
+    return request.query_params.get('explain') in ('1', 'true')
+
+
+async def enqueue(form, kind, lane, fn, *args):
+    """Queue a job and answer 202 with where to poll for it"""
+    callback_url = form.get('callback_url') or None
+    try:
+        if callback_url:
+            # Resolving the callback host blocks; keep it off the event loop
+            await asyncio.to_thread(check_callback_url, callback_url)
+    except CallbackRejected as e:
+        return error(str(e), 400)
+    try:
+        job_id = await asyncio.to_thread(job_queue.submit, kind, lane, fn, *args, callback_url=callback_url)
+    except QueueFull as e:
+        return error(str(e), 503, {"Retry-After": str(e.retry_after)})
+    status_url = app.url_path_for('job_status', job_id=job_id)
+    return JSONResponse({"job_id": job_id, "status": "queued", "lane": lane, "status_url": status_url}, 202,
+                        headers={"Location": status_url})
+
+
+@app.post('/process-resume')
+async def process_resume(request: Request):
+    try:
+        form, file = await single_upload(request)
+        if form is None:
+            return file
+        data = await file.read()
+
+        if wants_async(request):
+            preflight = await stage_runner.run("preflight", check_upload, data)
+            lane = "ocr" if preflight.needs_ocr else "fast"
+            return await enqueue(form, "process-resume", lane, score_upload, io.BytesIO(data), file.filename,
+                                 wants_explain(request), preflight)
+
+        features = await extract(data)
+        results = await stage_runner.run("predict", predict_batch, [features], 3, wants_explain(request))
+        log_results(results, "/process-resume", file.filename)
+        return JSONResponse(results)
+
+    except (DocumentRejected, StageBusy, StageTimeout) as e:
+        return rejected(e)
+    except Exception as e:
+        return error(f"Unexpected server error: {e}", 500)
+
+
+def unpack_uploads(uploads):
+    """(filename, PDF bytes) of every PDF in the uploads, zip archives included"""
+    pdfs, unpacked = [], 0
+    for filename, data in uploads:
+        if filename.lower().endswith('.zip'):
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                # Checked from the archive's directory before anything is unpacked
+                members = archive_members(archive, allowed_file, MAX_BATCH_FILES, len(pdfs), unpacked)
+                unpacked += sum(member.file_size for member in members)
+                for member in members:
+                    pdfs.append((os.path.basename(member.filename), archive.read(member)))
+        elif allowed_file(filename):
+            pdfs.append((filename, data))
+    return pdfs
+
+
+@app.post('/process-resumes')
+async def process_resumes(request: Request):
+    """Score a batch of resumes with one TF-IDF transform and one similarity pass"""
+    try:
+        form = await request.form(max_files=MAX_BATCH_FILES + 1)
+        files = [f for f in form.getlist('files') + form.getlist('file') if not isinstance(f, str) and f.filename]
+        uploads = [(f.filename, await f.read()) for f in files]
+        uploads = await stage_runner.run("preflight", unpack_uploads, uploads)
+
+        if not uploads:
+            return error("No PDF files in request", 400)
+
+        if len(uploads) > MAX_BATCH_FILES:
+            return error(f"Too many files, at most {MAX_BATCH_FILES} accepted", 413)
+
+        extracted = await asyncio.gather(*(extract(data, False) for _, data in uploads), return_exceptions=True)
+        filenames, features, errors = [], [], []
+        for (filename, _), outcome in zip(uploads, extracted):
+            if isinstance(outcome, Exception):
+                errors.append({"filename": filename, "error": str(outcome)})
+            else:
+                features.append(outcome)
+                filenames.append(filename)
+        # Headers without a rule-based name go through spaCy together
+        if any(f["Name"] is None for f in features):
+            features = await stage_runner.run("extract", resolve_names, features)
+
+        explain = wants_explain(request)
+        results = await stage_runner.run("predict", predict_batch, features, 3, explain) if features else []
+        for record in results:
+            record["filename"] = filenames[record["cv_index"] - 1]
+        log_results(results, "/process-resumes")
+
+        return JSONResponse({"results": results, "errors": errors})
+
+    except zipfile.BadZipFile as e:
+        return error(f"Invalid zip archive: {e}", 400)
+    except ArchiveTooLarge as e:
+        return error(str(e), 413)
+    except (StageBusy, StageTimeout) as e:
+        return rejected(e)
+    except Exception as e:
+        return error(f"Unexpected server error: {e}", 500)
+
+
+@app.post('/review')
+async def review_profile(request: Request):
+    try:
+        form, file = await single_upload(request)
+        if form is None:
+            return file
+        data = await file.read()
+
+        if wants_async(request):
+            return await enqueue(form, "review", "llm", review_upload, io.BytesIO(data))
+
+        # Only extraction takes a stage slot; the LLM call is awaited on the event loop
+        body, status = await areview(await extract(data))
+        return JSONResponse(body, status)
+
+    except (DocumentRejected, StageBusy, StageTimeout) as e:
+        return rejected(e)
+    except Exception as e:
+        return error(f"Review process failed: {e}", 500)
+
+
+@app.get('/health')
+async def health_check():
+    """Health check endpoint for monitoring"""
+    return {"status": "healthy", "service": "PathFinder ML API", "version": "1.0.0"}
+
+
+@app.get('/jobs/{job_id}')
+async def job_status(job_id: str):
+    """Status of an async job, with its result once finished"""
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if job is None:
+        return error("Unknown or expired job", 404)
+    return public_job(job)
+
+
+@app.get('/job-stats')
+async def job_stats():
+    """Lane queue depths of this worker and job counts by status"""
+    return await asyncio.to_thread(job_queue.stats)
+
+
+@app.get('/stage-stats')
+async def stage_stats():
+    """Concurrency, waiting calls and timeout of each executor stage in this worker"""
+    return stage_runner.stats()
+
+
+@app.get('/metrics')
+async def metrics_endpoint():
+    """Prometheus metrics: per-stage latency histograms, request counters and in-flight gauges"""
+    return Response(await asyncio.to_thread(metrics.render), media_type='text/plain; version=0.0.4')
+
+
+@app.get('/cache-stats')
+async def cache_stats():
+    """Hit/miss counters of the extraction cache"""
+    return await asyncio.to_thread(extraction_cache.stats)
+
+
+@app.get('/review-stats')
+async def review_stats():
+    """Request/retry counters and cache hits of the LLM review client"""
+    return review_client.stats()
+
+
+def admin_denied(request):
+    if ADMIN_TOKEN and request.headers.get('X-Admin-Token') != ADMIN_TOKEN:
+        return error("Invalid admin token", 403)
+    return None
+
+
+@app.get('/catalogue')
+async def catalogue_stats():
+    """Generation, version and posting counts of the job catalogue in this worker"""
+    return await asyncio.to_thread(catalogue.stats)
+
+
+@app.post('/catalogue/jobs')
+async def add_jobs(request: Request):
+    """Append job postings ({"title", "text"} or {"jobs": [...]}) without a refit"""
+    denied = admin_denied(request)
+    if denied:
+        return denied
+    try:
+        try:
+            payload = await request.json()
+        except ValueError:
+            payload = {}
+        payload = payload or {}
+        postings = payload.get("jobs", [payload] if payload else [])
+        if not postings:
+            return error("No job postings in request", 400)
+        job_ids = await stage_runner.run("predict", catalogue.add_postings, postings)
+        return JSONResponse({"job_ids": job_ids, **await asyncio.to_thread(catalogue.stats)}, 201)
+    except ValueError as e:
+        return error(str(e), 400)
+    except Exception as e:
+        return error(f"Catalogue update failed: {e}", 500)
+
+
+@app.delete('/catalogue/jobs/{job_id}')
+async def remove_job(job_id: int, request: Request):
+    """Retire a job posting by job id"""
+    denied = admin_denied(request)
+    if denied:
+        return denied
+    try:
+        removed, unknown = await stage_runner.run("predict", catalogue.remove_postings, [job_id])
+        if unknown:
+            return error(f"Unknown job id {job_id}", 404)
+        return {"removed": removed, **await asyncio.to_thread(catalogue.stats)}
+    except Exception as e:
+        return error(f"Catalogue update failed: {e}", 500)
+
+
+@app.post('/catalogue/compact')
+async def compact_catalogue(request: Request):
+    """Fold added/retired postings into a new generation in a background process"""
+    denied = admin_denied(request)
+    if denied:
+        return denied
+    if await asyncio.to_thread(catalogue.start_compaction) is None:
+        return error("Compaction already running", 409)
+    return JSONResponse({"status": "compaction started"}, 202)
+
+
+@app.get('/keywords')
+async def keyword_stats():
+    """Compile time, group sizes and warnings of the keyword config in this worker"""
+    return await asyncio.to_thread(keywords.stats)
+
+
+@app.post('/keywords/reload')
+async def reload_keywords(request: Request):
+    """Reload the keyword config in this worker now; the others pick it up on their next poll"""
+    denied = admin_denied(request)
+    if denied:
+        return denied
+    try:
+        return (await asyncio.to_thread(keywords.reload)).stats()
+    except keywords.KeywordConfigError as e:
+        return JSONResponse({"error": "Invalid keyword config, current one kept", "problems": e.problems}, 400)
+    except Exception as e:
+        return error(f"Keyword config reload failed: {e}", 500)
+
+
+@app.post('/debug-extract')
+async def debug_extract(request: Request):
+    """Debug endpoint to see extracted features"""
+    try:
+        form, file = await single_upload(request)
+        if form is None:
+            return file
+        extracted = await extract(await file.read())
+        return {
+            "extracted_features": extracted,
+            "missing_fields": {
+                "Experience": not extracted.get("Experience"),
+                "skill": not extracted.get("skill"),
+                "ability": not extracted.get("ability"),
+                "program": not extracted.get("program")
+            }
+        }
+    except (DocumentRejected, StageBusy, StageTimeout) as e:
+        return rejected(e)
+    except Exception as e:
+        return error(f"Debug extraction failed: {e}", 500)
+
+
+@app.exception_handler(HTTPException)
+async def http_error(request, exc):
+    if exc.status_code == 404:
+        return error("Endpoint not found", 404)
+    return error(str(exc.detail), exc.status_code)
+
+
+@app.exception_handler(Exception)
+async def internal_error(request, exc):
+    return error("Internal server error", 500)
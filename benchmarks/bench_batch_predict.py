@@ -0,0 +1,70 @@
+"""Throughput of batched TF-IDF scoring versus the per-row cosine/argsort loop.
+
+Run from the repository root (the predict module loads ./models and ./dataset):
+
+    python -m benchmarks.bench_batch_predict
+"""
+import argparse
+import time
+
+import pandas as pd
+from sklearn.metrics.pairwise import cosine_similarity
+
+from etl_pipeline import predict as predict_module
+from etl_pipeline.registry import DATA_DIR
+
+_df_ready = None
+
+
+def legacy_top_n(texts, top_n=3):
+    """The original predict() loop: dense cosine, full argsort and iloc per hit."""
+    new_tfidf = predict_module.vectorizer.transform(texts)
+    cosine_similarities = cosine_similarity(new_tfidf, predict_module.tfidf_matrix)
+    global _df_ready
+    if _df_ready is None:
+        _df_ready = pd.read_csv(f"{DATA_DIR}/job_reference_data.csv")
+    df_ready = _df_ready
+    results = []
+    for i, sims in enumerate(cosine_similarities):
+        for idx in sims.argsort()[-top_n:][::-1]:
+            title = df_ready.iloc[idx]["title"] if idx < len(df_ready) else "Unknown"
+            results.append((i, title, sims[idx]))
+    return results
+
+
+def batched_top_n(texts, top_n=3):
+    new_tfidf = predict_module.vectorizer.transform(texts)
+    indices, scores, _ = predict_module.score_matrix(new_tfidf, top_n)
+    return predict_module.format_matches(indices, scores)
+
+
+def throughput(fn, texts, batch_size, min_resumes):
+    """Return resumes per second for fn over repeated batches."""
+    batch = (texts * (batch_size // len(texts) + 1))[:batch_size]
+    fn(batch)  # warm-up
+    done = 0
+    start = time.perf_counter()
+    while done < min_resumes:
+        fn(batch)
+        done += batch_size
+    return done / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default="LSTM/UpdatedResumeDataSet.csv")
+    parser.add_argument("--batch-sizes", default="1,32,512")
+    parser.add_argument("--min-resumes", type=int, default=512)
+    args = parser.parse_args()
+
+    texts = pd.read_csv(args.corpus)["Resume"].astype(str).tolist()
+    print(f"catalogue rows: {predict_module.job_index.size}")
+    print(f"{'batch':>6} {'legacy cv/s':>12} {'batched cv/s':>13} {'speedup':>8}")
+    for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+        legacy = throughput(legacy_top_n, texts, batch_size, args.min_resumes)
+        batched = throughput(batched_top_n, texts, batch_size, args.min_resumes)
+        print(f"{batch_size:>6} {legacy:>12.1f} {batched:>13.1f} {batched / legacy:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
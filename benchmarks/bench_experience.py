@@ -0,0 +1,51 @@
+"""Throughput of the experience extractor and its date arithmetic.
+
+Runs extract_experience over UpdatedResumeDataSet.csv replicated to a
+large corpus, and calculate_months over every dated role it finds. Run
+from the repository root:
+
+    python -m benchmarks.bench_experience --copies 10
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from etl_pipeline import extract
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default="LSTM/UpdatedResumeDataSet.csv")
+    parser.add_argument("--copies", type=int, default=10)
+    args = parser.parse_args()
+
+    resumes = pd.read_csv(args.corpus)["Resume"].astype(str).tolist()
+    corpus = [extract.preprocess_lines(extract.clean_text(text)) for text in resumes] * args.copies
+
+    start = time.perf_counter()
+    roles = sum(len(extract.extract_experience(lines)) for lines in corpus)
+    elapsed = time.perf_counter() - start
+    print(f"extract_experience: {len(corpus)} resumes, {roles} dated roles in {elapsed:.2f}s "
+          f"({len(corpus) / elapsed:,.0f} resumes/s)")
+
+    date_pairs = []
+    for lines in corpus[:len(resumes)]:
+        for i, line in enumerate(lines):
+            found = extract.re.findall(extract.DATE_PATTERN, "\n".join(lines[i:i + 3]))
+            if len(found) > 1:
+                date_pairs.append((f"{found[0][0]} {found[0][1]}", f"{found[1][0]} {found[1][1]}"))
+    date_pairs *= args.copies
+
+    start = time.perf_counter()
+    for start_date, end_date in date_pairs:
+        extract.calculate_months(start_date, end_date)
+    elapsed = time.perf_counter() - start
+    print(f"calculate_months: {len(date_pairs)} date pairs in {elapsed:.2f}s "
+          f"({len(date_pairs) / elapsed:,.0f} pairs/s)")
+    if hasattr(extract, "parse_month_year"):
+        print(f"date cache: {extract.parse_month_year.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Per-resume feature extraction time on LSTM/UpdatedResumeDataSet.csv.
+
+Compares calling each extractor separately over the same lines (one scan
+per section) with the single-pass section scanner used by
+extract_resume_features. On revisions without scan_sections only the
+per-extractor mode runs, which gives the "before" number. Run from the
+repository root:
+
+    python -m benchmarks.bench_extract
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from etl_pipeline import extract
+
+
+def per_extractor(lines):
+    extract.extract_name(lines)
+    extract.extract_experience(lines)
+    extract.extract_skills(lines)
+    extract.extract_ability(lines)
+    extract.extract_education(lines)
+
+
+def single_pass(lines):
+    extract.extract_name(lines)
+    extract.scan_sections(lines)
+
+
+def time_per_resume(fn, corpus, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for lines in corpus:
+            fn(lines)
+    return (time.perf_counter() - start) * 1000 / (repeat * len(corpus))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default="LSTM/UpdatedResumeDataSet.csv")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    resumes = pd.read_csv(args.corpus)["Resume"].astype(str).tolist()
+    corpus = [extract.preprocess_lines(extract.clean_text(text)) for text in resumes]
+    print(f"resumes: {len(corpus)}, mean lines per resume: {sum(map(len, corpus)) / len(corpus):.1f}")
+
+    modes = [("per-extractor scans", per_extractor)]
+    if hasattr(extract, "scan_sections"):
+        modes.append(("single-pass scan", single_pass))
+    for label, fn in modes:
+        print(f"{label:<22} {time_per_resume(fn, corpus, args.repeat):8.3f} ms/resume")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Latency and ranking quality of TF-IDF-only versus skill-fused job matching.
+
+Scores resumes of LSTM/UpdatedResumeDataSet.csv in batches of --batch (1,
+as /process-resume does, by default) with the plain job index and with the
+skill index at each weight. rows/cv is the rows the cosine is computed for;
+shared/cv the postings sharing a skill with the resume, which the skill
+overlap is gathered from.
+Quality is measured two ways:
+
+    exact@N   share of the TF-IDF-only top N that the ranking keeps
+    skills@N  mean IDF-weighted share of the resume's skills found in the recommended postings
+
+Run from the repository root after building the skill index:
+
+    python -m etl_pipeline.skills build
+    python -m benchmarks.bench_hybrid --weights 0.1,0.3,0.5
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from etl_pipeline import registry, skills
+from etl_pipeline.extract import extract_resume_features
+from etl_pipeline.predict import ResumeRecord, score_matrix, vectorize_records
+from etl_pipeline.registry import get_reference
+
+
+def rank(reference, records, top_n, weight, limit):
+    """Recommended job rows per resume of a batch; weight None is TF-IDF only."""
+    queries = vectorize_records(records, reference)
+    if weight is None:
+        return score_matrix(queries, top_n, reference)[0]
+    return skills.hybrid_search(reference, queries, [record.skills for record in records], top_n, weight, limit)[0]
+
+
+def rows_scored(reference, records, top_n, weight, limit):
+    """Rows the cosine is computed for: the union of the batch's candidates, plus the whole index per fallback."""
+    if weight is None:
+        return reference.job_index.size * len(records)
+    skill_index = reference.skill_index
+    candidates = skill_index.candidates(skill_index.query_matrix([record.skills for record in records]), limit)
+    union = np.unique(np.concatenate([rows for rows, _ in candidates]))
+    fallbacks = sum(len(rows) < top_n for rows, _ in candidates)
+    return len(union) + fallbacks * reference.job_index.size
+
+
+def postings_shared(reference, records, weight):
+    """Postings the skill overlap is gathered from (0 for TF-IDF only)."""
+    if weight is None:
+        return 0
+    skill_index = reference.skill_index
+    queries = skill_index.query_matrix([record.skills for record in records])
+    return (queries @ skill_index.postings).nnz
+
+
+def skill_coverage(skill_index, record, rows):
+    """IDF-weighted share of the resume's indexed skills that the postings at rows mention."""
+    ids = [skill_index.term_ids[s] for s in record.skills if s in skill_index.term_ids]
+    if not ids:
+        return None
+    hits = skill_index.postings[ids][:, rows].toarray()
+    weights = skill_index.idf[ids]
+    return float((hits * weights[:, np.newaxis]).sum(axis=0).mean() / weights.sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default="LSTM/UpdatedResumeDataSet.csv")
+    parser.add_argument("--count", type=int, default=200, help="resumes sampled from the corpus")
+    parser.add_argument("--weights", default="0.1,0.3,0.5", help="skill weights to compare")
+    parser.add_argument("--candidates", type=int, default=skills.SKILL_CANDIDATES)
+    parser.add_argument("--top-n", type=int, default=3)
+    parser.add_argument("--batch", type=int, default=1, help="resumes scored per call")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    reference = get_reference()
+    if reference.skill_index is None:
+        reference.skill_index = skills.load_skill_index(registry.SKILL_INDEX_PATH, reference.tfidf_matrix.shape[0])
+
+    corpus = pd.read_csv(args.corpus).sample(n=args.count, random_state=args.seed)
+    records = [ResumeRecord.from_features(extract_resume_features(text)) for text in corpus["Resume"].astype(str)]
+
+    modes = [("tfidf", None)] + [(f"w={w}", float(w)) for w in args.weights.split(",")]
+    baseline = {}
+    print(f"catalogue rows: {reference.job_index.size}, skills indexed: {len(reference.skill_index.terms)}")
+    print(f"{'mode':>8} {'ms/cv':>8} {'rows/cv':>9} {'shared/cv':>10} {'exact@N':>8} {'skills@N':>9}")
+    for name, weight in modes:
+        elapsed, scored, shared, kept, coverage = 0.0, 0, 0, [], []
+        for start in range(0, len(records), args.batch):
+            batch = records[start:start + args.batch]
+            begin = time.perf_counter()
+            ranked = rank(reference, batch, args.top_n, weight, args.candidates)
+            elapsed += time.perf_counter() - begin
+            scored += rows_scored(reference, batch, args.top_n, weight, args.candidates)
+            shared += postings_shared(reference, batch, weight)
+            for i, (record, rows) in enumerate(zip(batch, ranked), start=start):
+                if weight is None:
+                    baseline[i] = set(rows.tolist())
+                kept.append(len(baseline[i] & set(rows.tolist())) / len(rows))
+                share = skill_coverage(reference.skill_index, record, rows)
+                if share is not None:
+                    coverage.append(share)
+        print(f"{name:>8} {elapsed * 1000 / len(records):>8.2f} {scored / len(records):>9.0f} {shared / len(records):>10.0f} "
+              f"{np.mean(kept):>8.2f} {np.mean(coverage):>9.2f}")
+
+if __name__ == "__main__":
+    main()
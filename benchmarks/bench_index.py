@@ -0,0 +1,71 @@
+"""Recall@N and latency of the approximate job index against exact search.
+
+Run from the repository root (the predict module loads ./models and ./dataset):
+
+    python -m benchmarks.bench_index --n-lists 64,256 --n-probe 1,4,16
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from etl_pipeline import predict as predict_module
+from etl_pipeline.index import ExactIndex, IVFIndex
+
+
+def timed_search(index, queries, top_n):
+    start = time.perf_counter()
+    indices, _ = index.search(queries, top_n)
+    return indices, (time.perf_counter() - start) * 1000 / queries.shape[0]
+
+
+def single_query_ms(index, queries, top_n, n=50):
+    """Mean latency when queries arrive one at a time, as on /process-resume."""
+    return float(np.mean([timed_search(index, queries[i:i + 1], top_n)[1] for i in range(min(n, queries.shape[0]))]))
+
+
+def recall(exact, approx):
+    """Fraction of the exact top-N rows that the approximate search also returned."""
+    hits = sum(len(set(e) & set(a)) for e, a in zip(exact, approx))
+    return hits / exact.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default="LSTM/UpdatedResumeDataSet.csv")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-n", type=int, default=3)
+    parser.add_argument("--n-lists", default="64,256")
+    parser.add_argument("--n-probe", default="1,4,16")
+    args = parser.parse_args()
+
+    texts = pd.read_csv(args.corpus)["Resume"].astype(str).tolist()
+    texts = (texts * (args.queries // len(texts) + 1))[:args.queries]
+    queries = predict_module.vectorizer.transform(texts)
+
+    exact = ExactIndex(predict_module.tfidf_matrix)
+    exact_idx, exact_ms = timed_search(exact, queries, args.top_n)
+    single_ms = single_query_ms(exact, queries, args.top_n)
+
+    print(f"catalogue rows: {exact.size}, queries: {queries.shape[0]}, recall@{args.top_n}")
+    print(f"{'backend':<24} {'build s':>8} {'recall':>7} {'ms/query batched':>17} {'ms/query single':>16}")
+    print(f"{'exact':<24} {'-':>8} {1.0:>7.3f} {exact_ms:>17.3f} {single_ms:>16.3f}")
+
+    for n_lists in (int(n) for n in args.n_lists.split(",")):
+        start = time.perf_counter()
+        ivf = IVFIndex.build(predict_module.tfidf_matrix, n_lists=n_lists)
+        build_s = time.perf_counter() - start
+        for n_probe in (int(p) for p in args.n_probe.split(",")):
+            ivf.n_probe = n_probe
+            approx_idx, approx_ms = timed_search(ivf, queries, args.top_n)
+            single_ms = single_query_ms(ivf, queries, args.top_n)
+            label = f"ivf lists={n_lists} probe={n_probe}"
+            print(
+                f"{label:<24} {build_s:>8.1f} {recall(exact_idx, approx_idx):>7.3f} "
+                f"{approx_ms:>17.3f} {single_ms:>16.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
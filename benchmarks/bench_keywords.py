@@ -0,0 +1,75 @@
+"""Compile time and per-line match cost of the keyword config's section matchers.
+
+Compiles the config --repeat times, then classifies every preprocessed line
+of the resume corpus three ways:
+
+    substring  any(keyword in line) per keyword group, the pre-matcher approach
+    full       the single-regex matcher of all sections, as /process-resume uses it
+    skill      the skill-only matcher, as skill_vocabulary uses it
+
+Run from the repository root:
+
+    python -m benchmarks.bench_keywords
+    python -m benchmarks.bench_keywords --config path/to/keywords.json
+"""
+import argparse
+import json
+import re
+import statistics
+import time
+
+import pandas as pd
+
+from etl_pipeline import keywords
+from etl_pipeline.extract import line_sections, preprocess_lines
+
+
+def substring_sections(lower_line, groups):
+    return {group for group, kws in groups.items() if any(kw in lower_line for kw in kws)}
+
+
+def per_line_us(fn, lines, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for line in lines:
+            fn(line)
+    return (time.perf_counter() - start) * 1e6 / (repeat * len(lines))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default=keywords.KEYWORDS_PATH)
+    parser.add_argument("--corpus", default="LSTM/UpdatedResumeDataSet.csv")
+    parser.add_argument("--count", type=int, default=300, help="resumes taken from the corpus")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(args.config, encoding="utf-8") as f:
+        raw = json.load(f)
+    compile_ms = []
+    for _ in range(args.repeat):
+        re.purge()  # re's pattern cache would otherwise hide the compile
+        start = time.perf_counter()
+        config = keywords.KeywordConfig(raw, args.config)
+        config.matcher({"skill"})
+        compile_ms.append((time.perf_counter() - start) * 1000)
+    print(f"keywords: {sum(len(kws) for kws in config.groups.values())}, warnings: {len(config.warnings)}")
+    print(f"compile: median {statistics.median(compile_ms):.2f} ms, max {max(compile_ms):.2f} ms")
+
+    texts = pd.read_csv(args.corpus, usecols=["Resume"])["Resume"].astype(str).head(args.count)
+    lines = [line.lower() for text in texts for line in preprocess_lines(text)]
+    full, skill = config.matcher(keywords.SECTIONS), config.matcher({"skill"})
+    assert all(line_sections(line, full) == substring_sections(line, config.groups) for line in lines)
+
+    print(f"{len(lines)} lines, mean {statistics.mean(map(len, lines)):.0f} chars")
+    print(f"{'matcher':>10} {'us/line':>8}")
+    for name, fn in [
+        ("substring", lambda line: substring_sections(line, config.groups)),
+        ("full", lambda line: line_sections(line, full)),
+        ("skill", lambda line: line_sections(line, skill)),
+    ]:
+        print(f"{name:>10} {per_line_us(fn, lines, max(1, args.repeat // 10)):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Throughput of the spaCy name fallback: one nlp() call per resume versus batched nlp.pipe.
+
+Runs NER over the header snippet (first five preprocessed lines) of every
+resume in the corpus, not only the ones whose header rules fail, so the
+per-document cost is measured on enough documents:
+
+    full       spacy.load(SPACY_MODEL) with every pipe, one nlp() call per header
+    excluded   the pipes extract_name never uses excluded, one call per header (the previous behaviour)
+    registry   registry.get_nlp(), which also drops a tok2vec left feeding nothing, one call per header
+    pipe       registry.get_nlp() through nlp.pipe, per --batch-sizes and --processes
+
+Names agreeing with the per-call registry model are counted for each mode.
+Run from the repository root (SPACY_MODEL may be a model path):
+
+    python -m benchmarks.bench_ner --batch-sizes 16,64,256 --processes 1,2
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from etl_pipeline import registry
+from etl_pipeline.extract import header_name, header_snippet, person_name, preprocess_lines
+
+
+def per_call(nlp, snippets):
+    return [person_name(nlp(snippet)) for snippet in snippets]
+
+
+def piped(nlp, snippets, batch_size, n_process):
+    return [person_name(doc) for doc in nlp.pipe(snippets, batch_size=batch_size, n_process=n_process)]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    names = fn(*args)
+    return names, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default="LSTM/UpdatedResumeDataSet.csv")
+    parser.add_argument("--count", type=int, default=0, help="resumes taken from the corpus (0: all)")
+    parser.add_argument("--batch-sizes", default="16,64,256")
+    parser.add_argument("--processes", default="1")
+    args = parser.parse_args()
+
+    import spacy
+
+    texts = pd.read_csv(args.corpus, usecols=["Resume"])["Resume"].astype(str)
+    if args.count:
+        texts = texts.head(args.count)
+    headers = [preprocess_lines(text) for text in texts]
+    snippets = [header_snippet(lines) for lines in headers]
+    fallbacks = sum(header_name(lines) is None for lines in headers)
+    print(f"{len(snippets)} resumes, {fallbacks} need the NER fallback; model {registry.SPACY_MODEL}")
+
+    nlp = registry.get_nlp()
+    if nlp is None:
+        raise SystemExit(f"❌ spaCy model {registry.SPACY_MODEL} is not available")
+    models = [
+        ("full", spacy.load(registry.SPACY_MODEL)),
+        ("excluded", spacy.load(registry.SPACY_MODEL, exclude=registry.SPACY_EXCLUDE)),
+        ("registry", nlp),
+    ]
+    for _, model in models:
+        per_call(model, snippets[:20])  # warm-up
+
+    reference = None
+    rows = []
+    for name, model in models:
+        names, seconds = timed(per_call, model, snippets)
+        reference = names if name == "registry" else reference
+        rows.append((name, ",".join(model.pipe_names), "-", "-", names, seconds))
+    for n_process in map(int, args.processes.split(",")):
+        for batch_size in map(int, args.batch_sizes.split(",")):
+            names, seconds = timed(piped, nlp, snippets, batch_size, n_process)
+            rows.append(("pipe", ",".join(nlp.pipe_names), batch_size, n_process, names, seconds))
+
+    print(f"{'mode':>9} {'pipes':>34} {'batch':>6} {'procs':>6} {'docs/s':>8} {'ms/doc':>7} {'agree':>6}")
+    for name, pipes, batch_size, n_process, names, seconds in rows:
+        agree = sum(a == b for a, b in zip(names, reference))
+        print(f"{name:>9} {pipes:>34} {batch_size:>6} {n_process:>6} {len(snippets) / seconds:>8.0f} "
+              f"{seconds * 1000 / len(snippets):>7.2f} {agree:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Per-request latency and memory of scoring one CV through DataFrames versus ResumeRecords.
+
+The legacy path is what /process-resume used to do: DataFrame([extracted]),
+preprocess_data adding combined_text, the shared scoring, then a results
+DataFrame turned back into dicts. The record path is predict_records.
+Memory is the peak traced by tracemalloc during one call. Run from the
+repository root (the predict module loads ./models and ./dataset):
+
+    python -m benchmarks.bench_records --catalogue-rows 10000
+"""
+import argparse
+import time
+import tracemalloc
+
+import pandas as pd
+
+from etl_pipeline import predict as predict_module
+from etl_pipeline.index import ExactIndex
+from etl_pipeline.registry import JobReference, get_reference, set_reference
+from benchmarks.corpus import generate_corpus, load_pools
+
+
+def legacy_predict(extracted, top_n=3):
+    df = pd.DataFrame([extracted])
+    new_tfidf = predict_module.preprocess_data(df)
+    indices, scores, _ = predict_module.score_matrix(new_tfidf, top_n)
+    return pd.DataFrame(predict_module.format_matches(indices, scores)).to_dict(orient="records")
+
+
+def record_predict(extracted, top_n=3):
+    return predict_module.predict_records([predict_module.ResumeRecord.from_features(extracted)], top_n)
+
+
+def measure(fn, inputs, repeat):
+    """(mean ms per call, mean peak KiB per call) over the inputs."""
+    for features in inputs[:3]:
+        fn(features)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for features in inputs:
+            fn(features)
+    mean_ms = (time.perf_counter() - start) * 1000 / (repeat * len(inputs))
+
+    peaks = []
+    tracemalloc.start()
+    for features in inputs:
+        tracemalloc.reset_peak()
+        fn(features)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+    return mean_ms, sum(peaks) / len(peaks) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default="LSTM/UpdatedResumeDataSet.csv")
+    parser.add_argument("--count", type=int, default=50, help="synthetic resumes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--catalogue-rows", type=int, default=0, help="score against the first N job rows (0: all)")
+    args = parser.parse_args()
+
+    pools = load_pools(args.corpus)
+    inputs = [
+        {"ability": " ".join(lines[4:7]), "skill": lines[-1], "program": lines[1]}
+        for lines in generate_corpus(args.count, length=1500, pools=pools)
+    ]
+
+    reference = get_reference()
+    if args.catalogue_rows:
+        matrix = reference.tfidf_matrix[:args.catalogue_rows]
+        # Row numbers stay below N, so the full title array still lines up
+        set_reference(JobReference(reference.vectorizer, matrix, reference.job_titles, ExactIndex(matrix)))
+    try:
+        assert legacy_predict(inputs[0]) == record_predict(inputs[0])
+        print(f"catalogue rows: {get_reference().job_index.size}")
+        print(f"{'path':>8} {'ms/call':>9} {'peak KiB':>9}")
+        for name, fn in (("legacy", legacy_predict), ("records", record_predict)):
+            mean_ms, peak_kib = measure(fn, inputs, args.repeat)
+            print(f"{name:>8} {mean_ms:>9.3f} {peak_kib:>9.1f}")
+    finally:
+        set_reference(reference)
+
+
+if __name__ == "__main__":
+    main()
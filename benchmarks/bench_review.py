@@ -0,0 +1,88 @@
+"""Review throughput against a local OpenRouter stub: per-request sessions vs the pooled client.
+
+The legacy path is the original requests.post call (fresh connection, no
+retries) behind a fixed number of sync workers; the client path submits from
+many threads, as gthread workers do. Run from the repository root:
+
+    python -m benchmarks.bench_review --reviews 64 --latency 0.2
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.stub_openrouter import start_stub
+from etl_pipeline.cache import ExtractionCache
+from etl_pipeline.review_client import ReviewClient, build_prompt, parse_review
+
+
+def profiles(n):
+    return [
+        {"Experience": f"Engineer {i} (12 months)", "skill": "python, sql", "ability": "building apis", "program": "informatics"}
+        for i in range(n)
+    ]
+
+
+def legacy_review(url, profile):
+    body = {"model": "stub", "messages": [{"role": "user", "content": build_prompt(profile)}]}
+    response = requests.post(url, headers={"Authorization": "Bearer stub"}, json=body)
+    response.raise_for_status()
+    return parse_review(response.json()["choices"][0]["message"]["content"])
+
+
+def run(fn, items, threads):
+    """Run fn over items from a thread pool; returns (seconds, errors)."""
+    errors = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for future in [pool.submit(fn, item) for item in items]:
+            try:
+                future.result()
+            except Exception:
+                errors += 1
+    return time.perf_counter() - start, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reviews", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--fail-every", type=int, default=10, help="stub answers every Nth request with 429")
+    parser.add_argument("--workers", type=int, default=2, help="sync workers for the legacy path")
+    parser.add_argument("--threads", type=int, default=64, help="caller threads for the client path")
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    items = profiles(args.reviews)
+
+    server = start_stub(args.latency, args.fail_every)
+    elapsed, errors = run(lambda p: legacy_review(server.url, p), items, args.workers)
+    print(f"legacy  {args.workers:>3} workers: {args.reviews / elapsed:6.1f} reviews/s, {errors} errors, "
+          f"{server.connections} connections")
+    server.shutdown()
+
+    server = start_stub(args.latency, args.fail_every)
+    client = ReviewClient(endpoint=server.url, api_key="stub", model="stub", concurrency=args.concurrency,
+                          backoff=0.05, cache=ExtractionCache(max_entries=4 * args.reviews))
+    elapsed, errors = run(client.review, items, args.threads)
+    print(f"client  {args.threads:>3} threads: {args.reviews / elapsed:6.1f} reviews/s, {errors} errors, "
+          f"{server.connections} connections")
+
+    # Same profiles with different spacing/case: all served from the cache
+    repeats = [{k: f"  {v.upper()} " for k, v in p.items()} for p in items]
+    elapsed, errors = run(client.review, repeats, args.threads)
+    print(f"cached  {args.threads:>3} threads: {args.reviews / elapsed:6.0f} reviews/s, {errors} errors")
+
+    # Identical profiles submitted together share one in-flight call
+    client.cache.clear()
+    elapsed, errors = run(client.review, profiles(1) * args.reviews, args.threads)
+    print(f"dedup   {args.threads:>3} threads: {args.reviews} identical reviews in {elapsed:.2f}s, {errors} errors")
+
+    print(f"client stats: {client.stats()}, stub saw {server.requests} requests")
+    client.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
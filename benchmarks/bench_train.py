@@ -0,0 +1,132 @@
+"""Artifact size, load time and scoring latency of model bundles built with different vocabulary pruning.
+
+Builds one bundle per --configs entry (min_df:max_features, 0 keeping every
+term) with etl_pipeline.train, then for each reports:
+
+    build     seconds to fit and write the bundle
+    disk      bundle size on disk
+    matrix    in-memory size of the CSR matrix once loaded
+    load      registry.load_reference of the bundle, hash checks included
+    ms/cv     per-resume scoring (transform + exact top 3), as /process-resume does it
+    top1/3    agreement of the top-3 rows with the first configuration
+
+The legacy float64 joblib artifacts of MODEL_DIR are measured too when
+present. Run from the repository root:
+
+    python -m benchmarks.bench_train --configs 1:1000,1:5000,5:20000,5:0
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from etl_pipeline import registry, train
+from etl_pipeline.predict import ResumeRecord, format_matches, score_matrix, vectorize_records
+from benchmarks.corpus import generate_corpus, load_pools
+
+
+def parse_configs(value):
+    configs = []
+    for item in value.split(","):
+        min_df, max_features = item.split(":")
+        configs.append((train.count_or_share(min_df), int(max_features)))
+    return configs
+
+
+def disk_bytes(directory, names):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in names
+               if os.path.exists(os.path.join(directory, name)))
+
+
+def matrix_bytes(matrix):
+    return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+
+
+def load(directory, repeat):
+    """(reference, median load seconds); load_reference's own logging is swallowed."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            reference = registry.load_reference(directory)
+        times.append(time.perf_counter() - start)
+    return reference, float(np.median(times))
+
+
+def score(reference, records, repeat):
+    """(mean ms per resume, top-3 row indices of every resume)."""
+    def one(record):
+        indices, scores, _ = score_matrix(vectorize_records([record], reference), 3, reference)
+        format_matches(indices, scores, reference)
+        return indices[0]
+
+    for record in records[:3]:
+        one(record)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        top = [one(record) for record in records]
+    return (time.perf_counter() - start) * 1000 / (repeat * len(records)), np.vstack(top)
+
+
+def agreement(top, baseline):
+    top1 = float(np.mean(top[:, 0] == baseline[:, 0]))
+    top3 = float(np.mean([len(set(a) & set(b)) / len(b) for a, b in zip(top, baseline)]))
+    return top1, top3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reference-csv", default=os.path.join(registry.DATA_DIR, "job_reference_data.csv"))
+    parser.add_argument("--configs", type=parse_configs, default=parse_configs("1:1000,1:5000,5:20000,5:0"))
+    parser.add_argument("--output-dir", help="where bundles are built (a temporary directory by default)")
+    parser.add_argument("--corpus", default="LSTM/UpdatedResumeDataSet.csv")
+    parser.add_argument("--count", type=int, default=50, help="synthetic resumes scored")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pools = load_pools(args.corpus)
+    records = [
+        ResumeRecord(" ".join(lines[4:7]), lines[-1], lines[1])
+        for lines in generate_corpus(args.count, length=1500, pools=pools)
+    ]
+
+    rows, baseline, n_rows = [], None, 0
+    with tempfile.TemporaryDirectory() as scratch:
+        output_dir = args.output_dir or scratch
+        for min_df, max_features in args.configs:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                directory = train.build(args.reference_csv, output_dir, min_df, max_features)
+            build_seconds = time.perf_counter() - start
+            reference, load_seconds = load(directory, args.repeat)
+            ms, top = score(reference, records, args.repeat)
+            if baseline is None:
+                baseline, n_rows = top, reference.tfidf_matrix.shape[0]
+            rows.append((f"{min_df}:{max_features}", reference.tfidf_matrix.shape[1], build_seconds,
+                         train.bundle_bytes(directory), matrix_bytes(reference.tfidf_matrix), load_seconds, ms,
+                         *agreement(top, baseline)))
+
+    legacy_files = ("tfidf_vectorizer.joblib", "tfidf_matrix.joblib", "job_titles.npy", "job_title_offsets.npy")
+    if not registry.is_bundle(registry.MODEL_DIR) and os.path.exists(registry.model_path("tfidf_matrix.joblib")):
+        reference, load_seconds = load(registry.MODEL_DIR, args.repeat)
+        ms, top = score(reference, records, args.repeat)
+        # Rows only line up with the bundles' when the legacy matrix was fitted on the same CSV
+        same_rows = reference.tfidf_matrix.shape[0] == n_rows
+        rows.append(("legacy", reference.tfidf_matrix.shape[1], float("nan"),
+                     disk_bytes(registry.MODEL_DIR, legacy_files), matrix_bytes(reference.tfidf_matrix),
+                     load_seconds, ms, *(agreement(top, baseline) if same_rows else (float("nan"),) * 2)))
+
+    print(f"{len(records)} resumes, reference {args.reference_csv}")
+    print(f"{'config':>10} {'terms':>7} {'build s':>8} {'disk MiB':>9} {'matrix MiB':>11} {'load ms':>8} "
+          f"{'ms/cv':>7} {'top1':>6} {'top3':>6}")
+    for name, terms, build_seconds, disk, memory, load_seconds, ms, top1, top3 in rows:
+        print(f"{name:>10} {terms:>7} {build_seconds:>8.1f} {disk / 2**20:>9.2f} {memory / 2**20:>11.2f} "
+              f"{load_seconds * 1000:>8.1f} {ms:>7.3f} {top1:>6.2f} {top3:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
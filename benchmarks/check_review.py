@@ -0,0 +1,99 @@
+"""Scripted checks of the review client against the local OpenRouter stub.
+
+Covers what the throughput benchmark doesn't assert: 429 and 5xx answers are
+retried until a review comes back, identical in-flight profiles share one
+call, and a review past REVIEW_DEADLINE is cancelled and answered with the
+degraded review. Exits non-zero on the first failed check. Run from the
+repository root:
+
+    python -m benchmarks.check_review
+"""
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_review import profiles
+from benchmarks.stub_openrouter import start_stub
+from etl_pipeline import feedback
+from etl_pipeline.cache import ExtractionCache
+from etl_pipeline.review_client import ReviewClient, ReviewDeadlineExceeded
+
+
+def client_for(server, **kwargs):
+    options = {"backoff": 0.01, "cache": ExtractionCache(max_entries=0), **kwargs}
+    return ReviewClient(endpoint=server.url, api_key="stub", model="stub", **options)
+
+
+def check(name, condition, detail):
+    print(f"{'✅' if condition else '❌'} {name}: {detail}")
+    if not condition:
+        sys.exit(1)
+
+
+def check_retries(status):
+    # Every other request fails, so each review needs exactly one retry
+    server = start_stub(latency=0.01, fail_every=2, fail_status=status)
+    client = client_for(server)
+    try:
+        reviews = [client.review(profile) for profile in profiles(4)]
+        stats = client.stats()
+        check(f"retry on {status}", len(reviews) == 4 and stats["retries"] >= 3 and stats["failures"] == 0,
+              f"{len(reviews)} reviews, {stats['retries']} retries, {server.requests} stub requests")
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def check_coalescing(callers=16):
+    server = start_stub(latency=0.3)
+    client = client_for(server)
+    try:
+        with ThreadPoolExecutor(max_workers=callers) as pool:
+            reviews = list(pool.map(client.review, profiles(1) * callers))
+        check("coalescing", len(reviews) == callers and server.requests == 1,
+              f"{callers} identical reviews, {server.requests} stub request(s), "
+              f"{client.stats()['coalesced']} coalesced")
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def check_deadline(deadline=0.3):
+    server = start_stub(latency=2.0)
+    client = client_for(server, deadline=deadline)
+    try:
+        started = time.perf_counter()
+        try:
+            client.review(profiles(1)[0])
+            raised = False
+        except ReviewDeadlineExceeded:
+            raised = True
+        waited = time.perf_counter() - started
+        time.sleep(0.05)
+        check("deadline (sync)", raised and waited < deadline + 0.2 and not client._inflight,
+              f"gave up after {waited:.2f}s, {len(client._inflight)} call(s) left in flight")
+
+        started = time.perf_counter()
+        previous, feedback.review_client = feedback.review_client, client
+        try:
+            body, status = asyncio.run(feedback.areview(profiles(2)[1]))
+        finally:
+            feedback.review_client = previous
+        waited = time.perf_counter() - started
+        check("deadline (async, degraded)", status == 200 and body.get("degraded") and waited < deadline + 0.2,
+              f"{status} after {waited:.2f}s, degraded={body.get('degraded')}")
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def main():
+    check_retries(429)
+    check_retries(503)
+    check_coalescing()
+    check_deadline()
+
+
+if __name__ == "__main__":
+    main()
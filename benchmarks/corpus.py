@@ -0,0 +1,170 @@
+"""Synthetic resume corpus generator for the benchmark suite.
+
+Builds resumes of a controlled length and section mix out of pieces of
+LSTM/UpdatedResumeDataSet.csv (skill lists, education lines, company names,
+ability sentences, filler sentences), and writes them as text files and/or
+simple text-layer PDFs. The same seed always gives the same corpus. Run from
+the repository root:
+
+    python -m benchmarks.corpus --count 50 --length 3000 --sections skill,education,experience --out /tmp/corpus
+"""
+import argparse
+import random
+import re
+import textwrap
+from pathlib import Path
+
+import pandas as pd
+
+SECTIONS = ("skill", "education", "experience", "ability")
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+FIRST_NAMES = ["Aisha", "Budi", "Carlos", "Dewi", "Elena", "Farhan", "Grace", "Hiro", "Ines", "James", "Kavya", "Liam"]
+LAST_NAMES = ["Santoso", "Garcia", "Tanaka", "Okafor", "Kumar", "Novak", "Smith", "Wijaya", "Rossi", "Chen"]
+ABILITY_WORDS = ("developing", "creating", "building", "researching", "automating", "testing")
+
+EDUCATION_REGEX = re.compile(r"\b(Bachelor|Master|B\.?\s?E\b|B\.?\s?Tech|M\.?\s?Tech|MBA|M\.?Sc|B\.?Sc|University|College|Degree)", re.I)
+COMPANY_REGEX = re.compile(r"company - ([A-Za-z][A-Za-z0-9&.,' ]{2,40}?)\s*(?:description|\r|\n|$)", re.I)
+SKILL_REGEX = re.compile(r"^[A-Za-z][A-Za-z0-9+#./ -]{1,28}$")
+NOT_SKILLS = ("company", "description", "exprience", "experience", "education", "month", "skill", "detail")
+SENTENCE_REGEX = re.compile(r"[A-Z][^.\n\r•*]{40,220}[.]")
+
+# Lines per page and characters per line of generated PDFs
+PDF_LINES_PER_PAGE = 60
+PDF_LINE_CHARS = 95
+
+
+def load_pools(corpus="LSTM/UpdatedResumeDataSet.csv"):
+    """Pieces of real resumes the synthetic ones are assembled from."""
+    frame = pd.read_csv(corpus)
+    texts = frame["Resume"].astype(str).str.replace("â¢", "•").tolist()
+    pools = {"title": sorted(set(frame["Category"].astype(str))), "skill": set(), "education": set(),
+             "company": set(), "ability": set(), "filler": set()}
+    for text in texts:
+        head = re.search(r"Skills?\s*[:\-]?(.{0,400})", text, flags=re.S)
+        if head:
+            for token in re.split(r"[•*,\n\r]|\s{2,}", head.group(1)):
+                token = token.strip(" -:")
+                if SKILL_REGEX.match(token) and not any(word in token.lower() for word in NOT_SKILLS):
+                    pools["skill"].add(token)
+        for line in re.split(r"[\r\n]+", text):
+            if EDUCATION_REGEX.search(line) and 10 <= len(line) <= 150:
+                pools["education"].add(line.strip())
+        pools["company"].update(match.strip() for match in COMPANY_REGEX.findall(text))
+        for sentence in SENTENCE_REGEX.findall(text):
+            bucket = "ability" if any(word in sentence.lower() for word in ABILITY_WORDS) else "filler"
+            pools[bucket].add(sentence.strip())
+    # Sorted so the pools (and with them the corpus) do not depend on set ordering
+    return {name: sorted(values) for name, values in pools.items()}
+
+
+def date_range(rng):
+    start_year = rng.randint(2008, 2022)
+    start = f"{rng.choice(MONTHS)} {start_year}"
+    if rng.random() < 0.2:
+        return f"{start} - Present"
+    return f"{start} - {rng.choice(MONTHS)} {rng.randint(start_year, 2024)}"
+
+
+def generate_resume(rng, pools, length=3000, sections=SECTIONS):
+    """One resume as a list of lines, roughly `length` characters long."""
+    lines = [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", f"{rng.choice(pools['title'])}",
+             f"{rng.choice(FIRST_NAMES).lower()}@example.com"]
+    if "ability" in sections:
+        lines += ["", "SUMMARY"] + rng.sample(pools["ability"], min(3, len(pools["ability"])))
+    if "skill" in sections:
+        lines += ["", "SKILLS", ", ".join(rng.sample(pools["skill"], min(rng.randint(8, 20), len(pools["skill"]))))]
+    if "education" in sections:
+        lines += ["", "EDUCATION"] + rng.sample(pools["education"], min(2, len(pools["education"])))
+    roles = []
+    if "experience" in sections:
+        lines += ["", "EXPERIENCE"]
+        for _ in range(rng.randint(2, 4)):
+            roles.append(len(lines))
+            lines += [f"{rng.choice(pools['title'])} at {rng.choice(pools['company'] or ['Acme Corp'])}", date_range(rng)]
+
+    # Pad with filler sentences, spread over the roles when there are any
+    size = sum(len(line) + 1 for line in lines)
+    extra = []
+    while size < length and pools["filler"]:
+        sentence = rng.choice(pools["filler"])
+        extra.append(sentence)
+        size += len(sentence) + 1
+    if roles:
+        for i, sentence in enumerate(extra):
+            position = roles[i % len(roles)] + 2 + i // len(roles)
+            lines.insert(min(position, len(lines)), sentence)
+    else:
+        lines += ["", "PROJECTS"] + extra
+    return lines
+
+
+def pdf_escape(text):
+    text = text.encode("latin-1", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def pdf_bytes(lines):
+    """Lines as a minimal A4 PDF with a Helvetica text layer."""
+    wrapped = [part for line in lines for part in (textwrap.wrap(line, PDF_LINE_CHARS) or [""])]
+    pages = [wrapped[i:i + PDF_LINES_PER_PAGE] for i in range(0, max(1, len(wrapped)), PDF_LINES_PER_PAGE)]
+
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    kids = []
+    for page_lines in pages:
+        content = "BT /F1 10 Tf 12 TL 50 800 Td " + " T* ".join(f"({pdf_escape(line)}) Tj" for line in page_lines) + " ET"
+        content = content.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def generate_corpus(count, length=3000, sections=SECTIONS, seed=0, pools=None, corpus="LSTM/UpdatedResumeDataSet.csv"):
+    """`count` resumes as lists of lines; the same arguments always give the same corpus."""
+    pools = pools or load_pools(corpus)
+    rng = random.Random(seed)
+    return [generate_resume(rng, pools, length, sections) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default="LSTM/UpdatedResumeDataSet.csv")
+    parser.add_argument("--count", type=int, default=50)
+    parser.add_argument("--length", type=int, default=3000, help="approximate characters per resume")
+    parser.add_argument("--sections", default=",".join(SECTIONS), help=f"comma-separated subset of {SECTIONS}")
+    parser.add_argument("--format", default="txt,pdf", help="txt, pdf or both")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True, help="output directory")
+    args = parser.parse_args()
+
+    sections = tuple(s for s in args.sections.split(",") if s)
+    unknown = set(sections) - set(SECTIONS)
+    if unknown:
+        parser.error(f"unknown sections: {sorted(unknown)}")
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    resumes = generate_corpus(args.count, args.length, sections, args.seed, corpus=args.corpus)
+    formats = args.format.split(",")
+    for i, lines in enumerate(resumes):
+        if "txt" in formats:
+            (out / f"resume_{i:05d}.txt").write_text("\n".join(lines), encoding="utf-8")
+        if "pdf" in formats:
+            (out / f"resume_{i:05d}.pdf").write_bytes(pdf_bytes(lines))
+    print(f"✅ Wrote {len(resumes)} resumes ({args.format}) to {out}")
+
+
+if __name__ == "__main__":
+    main()
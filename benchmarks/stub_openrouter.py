@@ -0,0 +1,100 @@
+"""Local stand-in for the OpenRouter chat completions API.
+
+Answers every POST after a fixed latency with a fenced JSON review, and can
+inject 429/503 answers to exercise retries. Run it and point the API at it:
+
+    python -m benchmarks.stub_openrouter --port 8099 --latency 0.5
+    OPENROUTER_ENDPOINT=http://127.0.0.1:8099/api/v1/chat/completions OPENROUTER_API_KEY=stub python main.py
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REVIEW = {
+    "strengths": ["Solid experience"],
+    "weaknesses": ["Few metrics"],
+    "suggestions": ["Quantify achievements"],
+}
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.2, fail_every=0, fail_status=429):
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.fail_every = fail_every
+        self.fail_status = fail_status
+        self.counter = itertools.count(1)
+        self.connections = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/v1/chat/completions"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        n = next(self.server.counter)
+        with self.server.lock:
+            self.server.requests += 1
+        time.sleep(self.server.latency)
+
+        if self.server.fail_every and n % self.server.fail_every == 0:
+            self.reply(self.server.fail_status, {"error": "stub failure"}, {"Retry-After": "0"})
+            return
+
+        prompt = body["messages"][0]["content"]
+        content = "```json\n" + json.dumps({**REVIEW, "prompt_chars": len(prompt)}) + "\n```"
+        self.reply(200, {"choices": [{"message": {"role": "assistant", "content": content}}]})
+
+    def reply(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_stub(latency=0.2, fail_every=0, fail_status=429, port=0):
+    """Start a stub server in a background thread; returns the server (see .url)."""
+    server = StubServer(("127.0.0.1", port), latency=latency, fail_every=fail_every, fail_status=fail_status)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--fail-every", type=int, default=0, help="answer every Nth request with --fail-status")
+    parser.add_argument("--fail-status", type=int, default=429)
+    args = parser.parse_args()
+
+    server = StubServer(("127.0.0.1", args.port), args.latency, args.fail_every, args.fail_status)
+    print(f"Stub OpenRouter listening on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
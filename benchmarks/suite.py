@@ -0,0 +1,302 @@
+"""Reproducible benchmark suite with machine-readable results.
+
+Times the pipeline on a synthetic corpus (see benchmarks/corpus.py) so runs
+on different revisions are comparable:
+
+    extract     extract_resume_features on raw text and on PDF bytes, per resume length
+    extractors  each section extractor and the single-pass scanner on preprocessed lines
+    months      calculate_months over the corpus's date ranges
+    predict     predict_batch, without and with explanations, per batch size and catalogue size
+    http        /process-resume, /process-resumes and /review end to end, per client concurrency
+
+The extraction cache is disabled and /review talks to the local OpenRouter
+stub. Results are written as JSON; --compare prints the change against an
+earlier results file. Run from the repository root:
+
+    python -m benchmarks.suite --output bench-results.json
+    python -m benchmarks.suite --only predict,http --compare bench-results.json
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.corpus import SECTIONS, generate_corpus, load_pools, pdf_bytes
+
+BENCHMARKS = ("extract", "extractors", "months", "predict", "http")
+
+
+def summarize(benchmark, case, samples, items=1, **params):
+    """Result record of per-call durations (seconds); items is how many resumes one call handles."""
+    ordered = sorted(samples)
+    total = sum(ordered)
+    return {
+        "benchmark": benchmark,
+        "case": case,
+        "params": params,
+        "calls": len(ordered),
+        "mean_ms": round(total / len(ordered) * 1000, 4),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 4),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 4),
+        "items_per_s": round(len(ordered) * items / total, 2) if total else None,
+    }
+
+
+def time_calls(fn, inputs, repeat=1, warmup=1):
+    """Per-call durations of fn over inputs, after `warmup` untimed calls."""
+    for item in inputs[:warmup]:
+        fn(item)
+    samples = []
+    for _ in range(repeat):
+        for item in inputs:
+            start = time.perf_counter()
+            fn(item)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_extract(args, pools):
+    from etl_pipeline.extract import extract_resume_features
+
+    results = []
+    for length in args.lengths:
+        corpus = generate_corpus(args.count, length, args.sections, args.seed, pools)
+        texts = ["\n".join(lines) for lines in corpus]
+        pdfs = [pdf_bytes(lines) for lines in corpus]
+        results.append(summarize("extract", "raw_text", time_calls(extract_resume_features, texts, args.repeat),
+                                 length=length))
+        results.append(summarize("extract", "pdf", time_calls(extract_resume_features, pdfs, args.repeat),
+                                 length=length))
+    return results
+
+
+def bench_extractors(args, pools):
+    from etl_pipeline import extract
+
+    corpus = generate_corpus(args.count, args.lengths[0], args.sections, args.seed, pools)
+    lines = [extract.preprocess_lines(extract.clean_text("\n".join(resume))) for resume in corpus]
+    extractors = {
+        "extract_name": extract.extract_name,
+        "extract_experience": extract.extract_experience,
+        "extract_skills": extract.extract_skills,
+        "extract_ability": extract.extract_ability,
+        "extract_education": extract.extract_education,
+        "scan_sections": extract.scan_sections,
+    }
+    return [summarize("extractors", name, time_calls(fn, lines, args.repeat), length=args.lengths[0])
+            for name, fn in extractors.items()]
+
+
+def bench_months(args, pools):
+    from etl_pipeline.extract import calculate_months
+
+    corpus = generate_corpus(args.count, args.lengths[0], args.sections, args.seed, pools)
+    pairs = [tuple(line.split(" - ")) for resume in corpus for line in resume
+             if " - " in line and line.split(" - ")[0][:3] in ("Jan", "Feb", "Mar", "Apr", "May", "Jun",
+                                                               "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")]
+    return [summarize("months", "calculate_months", time_calls(lambda pair: calculate_months(*pair), pairs,
+                                                               args.repeat * 10))]
+
+
+def bench_predict(args, pools):
+    from etl_pipeline import registry
+    from etl_pipeline.extract import extract_resume_features
+    from etl_pipeline.index import ExactIndex
+    from etl_pipeline.predict import predict_batch
+
+    corpus = generate_corpus(max(args.batch_sizes), args.lengths[0], args.sections, args.seed, pools)
+    features = [extract_resume_features("\n".join(lines)) for lines in corpus]
+    full = registry.get_reference()
+    results = []
+    try:
+        for size in args.catalogue_sizes:
+            rows = full.tfidf_matrix.shape[0] if size == "all" else min(int(size), full.tfidf_matrix.shape[0])
+            matrix = full.tfidf_matrix[:rows]
+            registry.set_reference(registry.JobReference(full.vectorizer, matrix, full.job_titles, ExactIndex(matrix)))
+            for batch_size in args.batch_sizes:
+                batches = [features[:batch_size]] * max(1, args.count // batch_size)
+                for name, explain in (("predict_batch", False), ("predict_batch_explain", True)):
+                    samples = time_calls(lambda batch: predict_batch(batch, explain=explain), batches, args.repeat)
+                    results.append(summarize("predict", name, samples, items=batch_size,
+                                             batch_size=batch_size, catalogue_rows=rows))
+    finally:
+        registry.set_reference(full)
+    return results
+
+
+def run_clients(url, requests, concurrency):
+    """Send `requests` (callables taking an httpx.Client) from `concurrency` threads; returns (latency, status)."""
+    import httpx
+
+    local = threading.local()
+
+    def send(request):
+        if not hasattr(local, "client"):
+            local.client = httpx.Client(base_url=url, timeout=300)
+        start = time.perf_counter()
+        response = request(local.client)
+        return time.perf_counter() - start, response.status_code
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        return list(pool.map(send, requests))
+
+
+def bench_http(args, pools):
+    url = args.url
+    server = None
+    if url is None:
+        from werkzeug.serving import make_server
+        from main import app
+
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}"
+
+    corpus = generate_corpus(args.count, args.lengths[0], args.sections, args.seed, pools)
+    pdfs = [pdf_bytes(lines) for lines in corpus]
+    endpoints = {
+        "/process-resume": lambda i: lambda client: client.post(
+            "/process-resume", files={"file": (f"cv{i}.pdf", pdfs[i % len(pdfs)], "application/pdf")}),
+        "/process-resumes": lambda i: lambda client: client.post(
+            "/process-resumes", files=[("files", (f"cv{j}.pdf", pdfs[j % len(pdfs)], "application/pdf"))
+                                       for j in range(i, i + args.http_batch)]),
+        "/review": lambda i: lambda client: client.post(
+            "/review", files={"file": (f"cv{i}.pdf", pdfs[i % len(pdfs)], "application/pdf")}),
+    }
+    results = []
+    try:
+        for endpoint, make_request in endpoints.items():
+            items = args.http_batch if endpoint == "/process-resumes" else 1
+            with contextlib.redirect_stdout(open(os.devnull, "w")):
+                run_clients(url, [make_request(0)], 1)  # warm-up
+            for concurrency in args.concurrency:
+                requests = [make_request(i) for i in range(args.requests)]
+                start = time.perf_counter()
+                # The API's own debug prints would drown the report
+                with contextlib.redirect_stdout(open(os.devnull, "w")):
+                    responses = run_clients(url, requests, concurrency)
+                wall = time.perf_counter() - start
+                samples = [latency for latency, _ in responses]
+                result = summarize("http", endpoint, samples, items=items, concurrency=concurrency)
+                # e.g. /review answers 400 for resumes missing a section; counted, not fatal
+                result["errors"] = sum(1 for _, status in responses if status >= 400)
+                # Throughput of the server as a whole, not of one client
+                result["items_per_s"] = round(len(samples) * items / wall, 2)
+                results.append(result)
+    finally:
+        if server is not None:
+            server.shutdown()
+    return results
+
+
+def metadata(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "args": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+    }
+
+
+def result_key(result):
+    return result["benchmark"], result["case"], json.dumps(result["params"], sort_keys=True)
+
+
+def print_results(results, baseline=None):
+    previous = {result_key(r): r for r in (baseline or [])}
+    for result in results:
+        params = " ".join(f"{k}={v}" for k, v in result["params"].items())
+        line = (f"{result['benchmark']:<11} {result['case']:<20} {params:<36} "
+                f"mean {result['mean_ms']:>10.3f} ms  p95 {result['p95_ms']:>10.3f} ms  {result['items_per_s']:>10,.1f}/s")
+        before = previous.get(result_key(result))
+        if before:
+            line += f"  ({(result['mean_ms'] / before['mean_ms'] - 1) * 100:+.1f}% mean vs baseline)"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default="LSTM/UpdatedResumeDataSet.csv")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help=f"comma-separated subset of {BENCHMARKS}")
+    parser.add_argument("--count", type=int, default=40, help="synthetic resumes per case")
+    parser.add_argument("--lengths", default="1000,3000,10000", help="resume lengths in characters")
+    parser.add_argument("--sections", default=",".join(SECTIONS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--batch-sizes", default="1,32,256")
+    parser.add_argument("--catalogue-sizes", default="1000,10000,all", help="job rows scored against")
+    parser.add_argument("--concurrency", default="1,8", help="concurrent HTTP clients")
+    parser.add_argument("--requests", type=int, default=40, help="HTTP requests per endpoint and concurrency")
+    parser.add_argument("--http-batch", type=int, default=8, help="resumes per /process-resumes request")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds the OpenRouter stub takes per review")
+    parser.add_argument("--url", help="benchmark a running server instead of an in-process one")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    args.lengths = [int(n) for n in args.lengths.split(",")]
+    args.sections = tuple(s for s in args.sections.split(",") if s)
+    args.batch_sizes = [int(n) for n in args.batch_sizes.split(",")]
+    args.catalogue_sizes = args.catalogue_sizes.split(",")
+    args.concurrency = [int(n) for n in args.concurrency.split(",")]
+    selected = [name for name in args.only.split(",") if name]
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {sorted(unknown)}")
+
+    # Settings read at import time by etl_pipeline, so they go in before it is imported
+    os.environ["EXTRACT_CACHE_SIZE"] = "0"
+    os.environ.pop("EXTRACT_CACHE_PATH", None)
+    os.environ["REVIEW_CACHE_SIZE"] = "0"
+    os.environ.pop("REVIEW_CACHE_PATH", None)
+    os.environ.setdefault("CATALOGUE_POLL_SECONDS", "0")
+    os.environ["RESULT_SINK"] = "none"
+    stub = None
+    if "http" in selected and args.url is None:
+        from benchmarks.stub_openrouter import start_stub
+
+        stub = start_stub(latency=args.llm_latency)
+        os.environ["OPENROUTER_API_KEY"] = "benchmark"
+        os.environ["OPENROUTER_ENDPOINT"] = stub.url
+
+    pools = load_pools(args.corpus)
+    runners = {"extract": bench_extract, "extractors": bench_extractors, "months": bench_months,
+               "predict": bench_predict, "http": bench_http}
+    results = []
+    try:
+        for name in selected:
+            start = time.perf_counter()
+            results.extend(runners[name](args, pools))
+            print(f"✅ {name} done in {time.perf_counter() - start:.1f}s")
+    finally:
+        if stub is not None:
+            stub.shutdown()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"meta": metadata(args), "results": results}, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
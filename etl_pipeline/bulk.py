@@ -0,0 +1,320 @@
+"""Offline bulk scoring of a resume corpus.
+
+Streams resumes from a directory of PDFs or a CSV column of resume text,
+extracts features in a process pool one chunk at a time, scores each chunk
+with the batched TF-IDF path and appends the matches to CSV, JSONL or
+Parquet. A checkpoint is written after every chunk, so an interrupted run
+continues where it stopped with --resume. Run from the repository root:
+
+    python -m etl_pipeline.bulk LSTM/UpdatedResumeDataSet.csv --text-column Resume --output dataset/bulk.jsonl
+    python -m etl_pipeline.bulk ./resumes --output dataset/bulk.csv --workers 4 --resume
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+import pandas as pd
+
+from etl_pipeline import guard, ocr
+from etl_pipeline.extract import extract_resume_features, resolve_names
+from etl_pipeline.predict import predict_batch
+
+RESULT_FIELDS = ["id", "rank", "recommended_job_title", "similarity_score", "score", "error"]
+FEATURE_FIELDS = ["Name", "Experience", "skill", "ability", "program"]
+
+# Columns tried, in order, when --text-column is not given
+TEXT_COLUMNS = ["Resume", "resume_str", "resume", "text"]
+
+# Extracted chunks kept in flight ahead of the one being scored
+PIPELINE_DEPTH = 2
+
+
+def iter_pdf_dir(root):
+    """(relative path, absolute path) of every PDF under root, in a stable order."""
+    root = Path(root)
+    for path in sorted(root.rglob("*")):
+        if path.is_file() and path.suffix.lower() == ".pdf":
+            yield str(path.relative_to(root)), str(path)
+
+
+def iter_csv(path, text_column=None, id_column=None, chunk_size=1024):
+    """(id, resume text) rows of a CSV, read a chunk at a time."""
+    for frame in pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False):
+        if text_column is None:
+            text_column = next((c for c in TEXT_COLUMNS if c in frame.columns), None)
+            if text_column is None:
+                raise ValueError(f"No resume text column in {path}; pass --text-column (columns: {list(frame.columns)})")
+        if id_column is not None and id_column not in frame.columns:
+            raise ValueError(f"Column {id_column!r} not in {path}")
+        ids = frame[id_column] if id_column else frame.index.astype(str)
+        yield from zip(ids, frame[text_column])
+
+
+def count_inputs(path):
+    """Number of resumes in a PDF directory, or None when counting would mean reading a CSV twice."""
+    if Path(path).is_dir():
+        return sum(1 for _ in iter_pdf_dir(path))
+    return None
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def init_worker():
+    # Documents are already spread over the bulk pool; OCR each one's pages serially
+    ocr.OCR_WORKERS = 1
+    # and parse them in the worker: a guard child would re-import this module (-m etl_pipeline.bulk) per PDF
+    guard.PDF_GUARD = False
+
+
+def extract_one(item):
+    """Extract the features one resume is scored on; errors are returned, not raised.
+
+    Names the header rules can't find are left to score_chunk, which only
+    resolves them (one nlp.pipe batch per chunk) when they are written out.
+    """
+    key, source = item
+    try:
+        features = extract_resume_features(source, resolve_name=False)
+        kept = {field: features[field] for field in FEATURE_FIELDS}
+        if kept["Name"] is None:
+            kept["resume_str"] = features["resume_str"]  # resolve_names reads the header from it
+        return key, kept, None
+    except Exception as e:
+        return key, None, str(e)
+
+
+def score_chunk(extracted, top_n=3, include_features=False):
+    """Score one chunk of extract_one results into output rows."""
+    ok = [(key, features) for key, features, error in extracted if error is None]
+    rows = [{"id": key, "error": error} for key, _, error in extracted if error is not None]
+    if include_features:
+        resolve_names([features for _, features in ok])
+    for _, features in ok:
+        features.pop("resume_str", None)
+
+    matches = predict_batch([features for _, features in ok], top_n) if ok else []
+    rank, previous = 0, None
+    for match in matches:
+        rank = rank + 1 if match["cv_index"] == previous else 1
+        previous = match["cv_index"]
+        key, features = ok[match["cv_index"] - 1]
+        row = {
+            "id": key,
+            "rank": rank,
+            "recommended_job_title": match["recommended_job_title"],
+            "similarity_score": match["similarity_score"],
+            "score": match["score"],
+        }
+        if include_features:
+            row.update(features)
+        rows.append(row)
+    return rows
+
+
+class CsvWriter:
+    """Appends rows to a CSV file; positions are byte offsets."""
+
+    def __init__(self, path, fields, position=0):
+        self.path = path
+        self.fields = fields
+        self.file = open(path, "a+", newline="", encoding="utf-8")
+        self.file.truncate(position)
+        self.file.seek(position)
+        self.writer = csv.DictWriter(self.file, fieldnames=fields, extrasaction="ignore")
+        if position == 0:
+            self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def commit(self):
+        """Make written rows durable and return the position to resume from."""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class JsonlWriter(CsvWriter):
+    """Appends one JSON object per row."""
+
+    def __init__(self, path, fields, position=0):
+        self.path = path
+        self.fields = fields
+        self.file = open(path, "a+", encoding="utf-8")
+        self.file.truncate(position)
+        self.file.seek(position)
+
+    def write(self, rows):
+        for row in rows:
+            self.file.write(json.dumps({field: row.get(field) for field in self.fields}, ensure_ascii=False) + "\n")
+
+
+class ParquetWriter:
+    """Writes every chunk as a part file of a Parquet dataset directory; positions are part counts."""
+
+    def __init__(self, path, fields, position=0):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)")
+        self.path = Path(path)
+        self.fields = fields
+        self.path.mkdir(parents=True, exist_ok=True)
+        # Parts past the checkpoint belong to a chunk that was never committed
+        for part in self.path.glob("part-*.parquet"):
+            if int(part.stem.split("-")[1]) >= position:
+                part.unlink()
+        self.parts = position
+
+    def write(self, rows):
+        frame = pd.DataFrame(rows, columns=self.fields)
+        # Fixed types even in a part holding only failed resumes (all-null columns), so every part has one schema
+        numeric = {"rank": "Int64", "score": "float64"}
+        frame = frame.astype({field: numeric.get(field, "string") for field in self.fields})
+        frame.to_parquet(self.path / f"part-{self.parts:05d}.parquet", index=False)
+        self.parts += 1
+
+    def commit(self):
+        return self.parts
+
+    def close(self):
+        pass
+
+
+WRITERS = {"csv": CsvWriter, "jsonl": JsonlWriter, "parquet": ParquetWriter}
+
+
+def output_format(path, fmt=None):
+    fmt = fmt or Path(path).suffix.lstrip(".").lower()
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown output format {fmt!r}; use one of {sorted(WRITERS)}")
+    return fmt
+
+
+def load_checkpoint(path, input_path):
+    """Progress of an earlier run over the same input, or a fresh start."""
+    if not os.path.exists(path):
+        return {"input": input_path, "processed": 0, "rows": 0, "position": 0}
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint["input"] != input_path:
+        raise ValueError(f"Checkpoint {path} belongs to {checkpoint['input']}, not {input_path}")
+    return checkpoint
+
+
+def save_checkpoint(path, checkpoint):
+    """Replace the checkpoint atomically so a crash never leaves half of one."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def report(processed, total, started_at, start_count, rows):
+    elapsed = time.perf_counter() - started_at
+    rate = (processed - start_count) / elapsed if elapsed > 0 else 0.0
+    progress = f"{processed:,}"
+    if total:
+        eta = (total - processed) / rate if rate else 0
+        progress += f"/{total:,} ({processed / total:.1%}, ETA {eta:,.0f}s)"
+    print(f"⏱ {progress} resumes · {rows:,} rows · {rate:,.1f} resumes/s", file=sys.stderr, flush=True)
+
+
+def run_bulk(input_path, output, fmt=None, text_column=None, id_column=None, chunk_size=256, workers=None,
+             top_n=3, include_features=False, checkpoint_path=None, resume=False):
+    """Score every resume in input_path into output; returns the final checkpoint dict."""
+    input_path = os.path.abspath(input_path)
+    fmt = output_format(output, fmt)
+    checkpoint_path = checkpoint_path or f"{output}.checkpoint.json"
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if not resume and (os.path.exists(checkpoint_path) or os.path.exists(output)):
+        raise FileExistsError(f"{output} or its checkpoint already exists; pass --resume to continue it")
+    checkpoint = load_checkpoint(checkpoint_path, input_path)
+
+    if os.path.isdir(input_path):
+        items = iter_pdf_dir(input_path)
+    else:
+        items = iter_csv(input_path, text_column, id_column)
+    items = islice(items, checkpoint["processed"], None)
+    total = count_inputs(input_path)
+
+    fields = RESULT_FIELDS + (FEATURE_FIELDS if include_features else [])
+    writer = WRITERS[fmt](output, fields, checkpoint["position"])
+    if checkpoint["processed"]:
+        print(f"✅ Resuming after {checkpoint['processed']:,} resumes", file=sys.stderr)
+
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("forkserver"),
+                                   initializer=init_worker)
+    started_at, start_count = time.perf_counter(), checkpoint["processed"]
+    in_flight, chunk_sizes = deque(), deque()
+
+    def finish(chunk_results):
+        rows = score_chunk(list(chunk_results), top_n, include_features)
+        writer.write(rows)
+        checkpoint["position"] = writer.commit()
+        checkpoint["processed"] += chunk_sizes.popleft()
+        checkpoint["rows"] += len(rows)
+        save_checkpoint(checkpoint_path, checkpoint)
+        report(checkpoint["processed"], total, started_at, start_count, checkpoint["rows"])
+
+    try:
+        for chunk in chunked(items, chunk_size):
+            in_flight.append(pool.map(extract_one, chunk) if pool else map(extract_one, chunk))
+            chunk_sizes.append(len(chunk))
+            if len(in_flight) >= PIPELINE_DEPTH:
+                finish(in_flight.popleft())
+        while in_flight:
+            finish(in_flight.popleft())
+    finally:
+        writer.close()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    print(f"✅ Scored {checkpoint['processed']:,} resumes into {output} ({checkpoint['rows']:,} rows)", file=sys.stderr)
+    return checkpoint
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a resume corpus against the job catalogue.")
+    parser.add_argument("input", help="directory of PDFs, or a CSV with one resume text per row")
+    parser.add_argument("--output", required=True, help="output file (.csv/.jsonl) or Parquet directory")
+    parser.add_argument("--format", choices=sorted(WRITERS), help="defaults to the output extension")
+    parser.add_argument("--text-column", help=f"CSV column holding resume text (default: first of {TEXT_COLUMNS})")
+    parser.add_argument("--id-column", help="CSV column identifying each resume (default: row number)")
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="extraction processes (1 runs in-process)")
+    parser.add_argument("--top-n", type=int, default=3)
+    parser.add_argument("--include-features", action="store_true", help="also write the extracted fields")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <output>.checkpoint.json)")
+    parser.add_argument("--resume", action="store_true", help="continue a previous run from its checkpoint")
+    args = parser.parse_args()
+
+    # Parse in-process here too, as init_worker does for the pool
+    guard.PDF_GUARD = False
+    run_bulk(args.input, args.output, args.format, args.text_column, args.id_column, args.chunk_size,
+             args.workers, args.top_n, args.include_features, args.checkpoint, args.resume)
+
+
+if __name__ == "__main__":
+    main()
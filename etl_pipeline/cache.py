@@ -0,0 +1,156 @@
+"""Content-addressed cache for extracted resume text and features.
+
+Entries are keyed by the SHA-256 of the uploaded bytes, kept in an in-process
+LRU tier and optionally in a shared sqlite file so gunicorn workers and
+restarts reuse each other's pdfplumber/OCR results.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def content_hash(data) -> str:
+    """SHA-256 hex digest of the raw upload bytes or of a seekable binary stream."""
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(data).hexdigest()
+    digest = hashlib.sha256()
+    data.seek(0)
+    for chunk in iter(lambda: data.read(1024 * 1024), b""):
+        digest.update(chunk)
+    data.seek(0)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """Two-tier LRU cache with TTL, size-based eviction and hit/miss counters."""
+
+    def __init__(self, max_entries=256, ttl=86400, disk_path=None, max_disk_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_path = disk_path
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0, "evictions": 0}
+
+        self._db = None
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    @classmethod
+    def from_env(cls, prefix="EXTRACT_CACHE"):
+        """Build the cache from <prefix>_SIZE/_TTL/_PATH/_MAX_BYTES environment variables."""
+        return cls(
+            max_entries=int(os.getenv(f"{prefix}_SIZE", "256")),
+            ttl=float(os.getenv(f"{prefix}_TTL", "86400")),
+            disk_path=os.getenv(f"{prefix}_PATH") or None,
+            max_disk_bytes=int(os.getenv(f"{prefix}_MAX_BYTES", str(256 * 1024 * 1024))),
+        )
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 or self._db is not None
+
+    def _expired(self, created, now):
+        return self.ttl > 0 and now - created > self.ttl
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, value = entry
+                if not self._expired(created, now):
+                    self._memory.move_to_end(key)
+                    self._counters["hits"] += 1
+                    self._counters["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    if not self._expired(row[1], now):
+                        self._db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+                        value = json.loads(row[0])
+                        self._remember(key, row[1], value)
+                        self._counters["hits"] += 1
+                        self._counters["disk_hits"] += 1
+                        return value
+                    self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, key, value):
+        """Store a JSON-serialisable value in every configured tier."""
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._db is not None:
+                payload = json.dumps(value)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                    (key, payload, len(payload), now, now),
+                )
+                self._evict_disk(now)
+
+    def _remember(self, key, created, value):
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _evict_disk(self, now):
+        """Drop expired rows, then least recently used rows until under the byte budget."""
+        if self.ttl > 0:
+            self._db.execute("DELETE FROM entries WHERE created < ?", (now - self.ttl,))
+        deleted = self._db.execute(
+            "DELETE FROM entries WHERE key IN ("
+            "SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY accessed DESC) AS running FROM entries) "
+            "WHERE running > ?)",
+            (self.max_disk_bytes,),
+        ).rowcount
+        self._counters["evictions"] += max(deleted, 0)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM entries")
+
+    def stats(self):
+        """Hit/miss counters and current tier sizes."""
+        with self._lock:
+            stats = dict(self._counters)
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+            stats["memory_entries"] = len(self._memory)
+            if self._db is not None:
+                count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+                stats["disk_entries"] = count
+                stats["disk_bytes"] = size
+            return stats
+
+
+extraction_cache = ExtractionCache.from_env()
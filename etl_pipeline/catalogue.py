@@ -0,0 +1,556 @@
+"""Incremental job catalogue: append and retire postings without refitting or restarting.
+
+The catalogue is a sequence of generations of base artifacts (generation 0
+is MODEL_DIR plus DATA_DIR/job_reference_data.csv) and a small delta kept in
+a shared sqlite file: postings added since the last compaction, transformed
+with the existing vocabulary and IDF, and tombstones of retired job ids.
+
+Every worker polls the delta version in a background thread and swaps in a
+new reference when it changes. Delta changes reuse the memory-mapped base as
+is, so a swap only builds the small delta matrix; requests already running
+keep the reference they started with, and nothing is reloaded on the request
+path. Compaction folds the delta into a new generation directory, refitting
+IDF over the fixed vocabulary, and publishes it in one sqlite transaction:
+
+    python -m etl_pipeline.catalogue add --title "Data Engineer" --text "python spark airflow sql"
+    python -m etl_pipeline.catalogue remove 42 1337
+    python -m etl_pipeline.catalogue compact
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import joblib
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+from etl_pipeline import registry
+from etl_pipeline.index import IVFIndex, build_index, save_index, top_n_matches
+from etl_pipeline.skills import SkillIndex, save_skill_index
+
+CATALOGUE_DIR = os.getenv("CATALOGUE_DIR", os.path.join(registry.MODEL_DIR, "catalogue"))
+CATALOGUE_POLL_SECONDS = float(os.getenv("CATALOGUE_POLL_SECONDS", "5"))
+# Compact automatically once added + retired postings exceed this fraction of the catalogue (0 disables)
+CATALOGUE_COMPACT_RATIO = float(os.getenv("CATALOGUE_COMPACT_RATIO", "0.05"))
+# Seconds a compaction may hold the lease before another process may take over
+COMPACT_LEASE_SECONDS = 3600
+
+_lock = threading.Lock()
+_base = None
+_store = None
+_watcher_pid = None
+
+
+class CatalogueStore:
+    """Delta postings, tombstones and the published generation, shared through sqlite."""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(CATALOGUE_DIR, "catalogue.db")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "job_id INTEGER PRIMARY KEY, title TEXT NOT NULL, text TEXT NOT NULL, added REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS tombstones (job_id INTEGER PRIMARY KEY, removed REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL NOT NULL);"
+        )
+        self._lock = threading.Lock()
+        self.pid = os.getpid()
+
+    def _meta(self, key, default=0):
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return int(row[0]) if row else default
+
+    def _set_meta(self, key, value):
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def state(self):
+        """(generation, version) currently published."""
+        with self._lock:
+            return self._meta("generation"), self._meta("version")
+
+    def add(self, postings, base_rows):
+        """Append postings ({"title", "text"}); returns their new job ids."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # Job ids of appended postings continue after every id the base has ever used
+                next_id = max(self._meta("next_id"), base_rows)
+                ids = list(range(next_id, next_id + len(postings)))
+                self._db.executemany(
+                    "INSERT INTO postings (job_id, title, text, added) VALUES (?, ?, ?, ?)",
+                    [(job_id, str(p["title"]), str(p["text"]), now) for job_id, p in zip(ids, postings)],
+                )
+                self._set_meta("next_id", next_id + len(postings))
+                self._set_meta("version", self._meta("version") + 1)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return ids
+
+    def remove(self, job_ids):
+        """Tombstone job ids; returns how many were not already retired."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                before = self._db.total_changes
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO tombstones (job_id, removed) VALUES (?, ?)",
+                    [(int(job_id), now) for job_id in job_ids],
+                )
+                removed = self._db.total_changes - before
+                if removed:
+                    self._set_meta("version", self._meta("version") + 1)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return removed
+
+    def delta(self):
+        """(version, postings DataFrame, tombstoned job ids) read in one snapshot."""
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                version = self._meta("version")
+                postings = pd.read_sql_query("SELECT job_id, title, text FROM postings ORDER BY job_id", self._db)
+                tombstones = np.array([r[0] for r in self._db.execute("SELECT job_id FROM tombstones")], dtype=np.int64)
+            finally:
+                self._db.execute("COMMIT")
+        return version, postings, tombstones
+
+    def acquire_compaction(self, owner):
+        """Take the compaction lease unless another live process holds it."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                held = self._meta("compact_until") > now
+                if not held:
+                    self._set_meta("compact_until", now + COMPACT_LEASE_SECONDS)
+                    self._set_meta("compact_owner", owner)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return not held
+
+    def publish(self, generation, max_job_id, tombstones):
+        """Make a compacted generation current and drop the delta it absorbed, atomically."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute("DELETE FROM postings WHERE job_id <= ?", (int(max_job_id),))
+                self._db.executemany("DELETE FROM tombstones WHERE job_id = ?", [(int(j),) for j in tombstones])
+                self._set_meta("generation", generation)
+                self._set_meta("version", self._meta("version") + 1)
+                self._set_meta("compact_until", 0)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def compaction_running(self):
+        with self._lock:
+            return self._meta("compact_until") > time.time()
+
+    def release_compaction(self, owner=None):
+        """Drop the compaction lease; with an owner, only while that owner still holds it."""
+        with self._lock:
+            if owner is None:
+                self._set_meta("compact_until", 0)
+            else:
+                self._db.execute("UPDATE meta SET value = 0 WHERE key = 'compact_until' AND "
+                                 "(SELECT value FROM meta WHERE key = 'compact_owner') = ?", (owner,))
+
+    def counts(self):
+        with self._lock:
+            postings = self._db.execute("SELECT COUNT(*) FROM postings").fetchone()[0]
+            tombstones = self._db.execute("SELECT COUNT(*) FROM tombstones").fetchone()[0]
+        return postings, tombstones
+
+
+def get_store(create=False):
+    """This process's connection to the shared store; None while the catalogue has never been changed."""
+    global _store
+    if _store is None or _store.pid != os.getpid():
+        path = os.path.join(CATALOGUE_DIR, "catalogue.db")
+        if not create and not os.path.exists(path):
+            return None
+        _store = CatalogueStore(path)
+    return _store
+
+
+class CatalogueTitles:
+    """Titles of the base rows followed by the appended postings."""
+
+    def __init__(self, base, delta):
+        self.base = base
+        self.delta = np.asarray(delta, dtype=object)
+        self.n_base = len(base)
+
+    def __len__(self):
+        return self.n_base + len(self.delta)
+
+    def __getitem__(self, indices):
+        indices = np.asarray(indices)
+        titles = np.empty(indices.shape, dtype=object)
+        in_base = indices < self.n_base
+        titles[in_base] = self.base[indices[in_base]]
+        titles[~in_base] = self.delta[indices[~in_base] - self.n_base]
+        return titles
+
+
+class CatalogueIndex:
+    """Base index plus appended postings, minus tombstoned rows.
+
+    Appended postings are rows n_base.. in the order of delta_matrix. Base
+    hits are over-fetched by the number of retired base rows so that the top
+    N survive the tombstone filter; with fewer than N live rows, fewer are
+    returned, never a retired one.
+    """
+
+    def __init__(self, base, delta_matrix, dead_rows):
+        self.base = base
+        self.backend = base.backend
+        self.delta_matrix = normalize(delta_matrix) if delta_matrix is not None else None
+        self.dead_rows = np.asarray(dead_rows, dtype=np.int64)
+
+    @property
+    def size(self):
+        n_delta = self.delta_matrix.shape[0] if self.delta_matrix is not None else 0
+        return self.base.size + n_delta - len(self.dead_rows)
+
+    def search(self, queries, top_n=3):
+        """Return (indices, scores) of the top N live rows for each query row."""
+        # Like the base indexes, at most as many hits as there are rows to return, so no -inf ever comes back
+        top_n = min(top_n, self.size)
+        if top_n <= 0:
+            return np.empty((queries.shape[0], 0), dtype=np.intp), np.empty((queries.shape[0], 0))
+        k = min(top_n + len(self.dead_rows), self.base.size)
+        indices, scores = self.base.search(queries, k)
+        if len(self.dead_rows):
+            scores = np.where(np.isin(indices, self.dead_rows), -np.inf, scores)
+
+        if self.delta_matrix is not None and self.delta_matrix.shape[0]:
+            delta_scores = (self.delta_matrix @ normalize(queries).toarray().T).T
+            delta_rows = np.arange(self.base.size, self.base.size + self.delta_matrix.shape[0])
+            indices = np.hstack([indices, np.broadcast_to(delta_rows, delta_scores.shape)])
+            scores = np.hstack([scores, delta_scores])
+
+        order, scores = top_n_matches(scores, top_n)
+        return np.take_along_axis(indices, order, axis=1), scores
+
+    def score_rows(self, queries, rows):
+        """Cosine similarity of each query row to the given rows; retired rows score -inf."""
+        rows = np.asarray(rows)
+        in_base = rows < self.base.size
+        scores = np.empty((queries.shape[0], len(rows)))
+        scores[:, in_base] = self.base.score_rows(queries, rows[in_base])
+        if not in_base.all():
+            delta_rows = rows[~in_base] - self.base.size
+            scores[:, ~in_base] = (self.delta_matrix[delta_rows] @ normalize(queries).toarray().T).T
+        if len(self.dead_rows):
+            scores[:, np.isin(rows, self.dead_rows)] = -np.inf
+        return scores
+
+    def vectors(self, rows):
+        """L2-normalised CSR vectors of the given rows, base or appended."""
+        rows = np.asarray(rows)
+        in_base = rows < self.base.size
+        if in_base.all():
+            return self.base.vectors(rows)
+        # Base rows first, then appended ones, put back in the order asked for
+        order = np.concatenate([np.flatnonzero(in_base), np.flatnonzero(~in_base)])
+        stacked = sparse.vstack([self.base.vectors(rows[in_base]),
+                                 self.delta_matrix[rows[~in_base] - self.base.size]], format="csr")
+        return stacked[np.argsort(order)]
+
+
+def generation_dir(generation):
+    return os.path.join(CATALOGUE_DIR, f"gen-{generation:05d}")
+
+
+def base_artifacts(generation):
+    """Artifact directory, reference CSV and job ids of a generation's base rows."""
+    if generation == 0:
+        return registry.MODEL_DIR, os.path.join(registry.DATA_DIR, "job_reference_data.csv"), None
+    directory = generation_dir(generation)
+    return directory, os.path.join(directory, "job_reference_data.csv"), np.load(os.path.join(directory, "job_ids.npy"))
+
+
+def load_base(generation):
+    """Base reference of a generation, loaded once per process and shared by every delta view."""
+    global _base
+    if _base is None or _base.generation != generation:
+        directory, reference_csv, job_ids = base_artifacts(generation)
+        _base = registry.load_reference(directory, reference_csv, generation=generation)
+        n_rows = _base.tfidf_matrix.shape[0]
+        _base.job_ids = job_ids if job_ids is not None else np.arange(n_rows, dtype=np.int64)
+    return _base
+
+
+def apply_delta(base, version, postings, tombstones):
+    """A reference over base plus appended postings, minus tombstones; base arrays are shared, not copied."""
+    live = postings[~postings["job_id"].isin(tombstones)]
+    dead_rows = np.flatnonzero(np.isin(base.job_ids, tombstones))
+
+    delta_matrix = base.vectorizer.transform(live["text"]) if len(live) else None
+    reference = registry.JobReference(
+        base.vectorizer,
+        base.tfidf_matrix,
+        CatalogueTitles(base.job_titles, live["title"].to_numpy()),
+        CatalogueIndex(base.job_index, delta_matrix, dead_rows),
+        generation=base.generation,
+        version=version,
+        skill_index=base.skill_index.extend(live["text"]) if base.skill_index is not None else None,
+    )
+    reference.job_ids = np.concatenate([base.job_ids, live["job_id"].to_numpy(dtype=np.int64)])
+    reference.n_live = reference.job_index.size
+    return reference
+
+
+def current_reference():
+    """Build the reference for the generation and delta currently published."""
+    store = get_store()
+    if store is None:
+        base = load_base(0)
+        base.n_live = base.job_index.size
+        return base
+    generation, _ = store.state()
+    version, postings, tombstones = store.delta()
+    return apply_delta(load_base(generation), version, postings, tombstones)
+
+
+def refresh(force=False):
+    """Swap in a new reference if the published catalogue changed; returns the reference in use."""
+    store = get_store()
+    current = registry.get_reference()
+    if store is None:
+        return current
+    generation, version = store.state()
+    if force or (generation, version) != (current.generation, current.version):
+        with _lock:
+            start = time.perf_counter()
+            reference = current_reference()
+            registry.set_reference(reference)
+            print(f"✅ Catalogue swapped to generation {reference.generation} version {reference.version} "
+                  f"({reference.n_live} live postings) in {time.perf_counter() - start:.2f}s")
+            maybe_compact(store, reference)
+            return reference
+    return current
+
+
+def needs_compaction(store, reference):
+    if CATALOGUE_COMPACT_RATIO <= 0:
+        return False
+    postings, tombstones = store.counts()
+    return postings + tombstones > CATALOGUE_COMPACT_RATIO * max(1, reference.tfidf_matrix.shape[0])
+
+
+def maybe_compact(store, reference):
+    """Start compaction in a separate process once the delta is large enough, keeping it off the web workers' CPU."""
+    if needs_compaction(store, reference) and not store.compaction_running():
+        start_compaction(if_needed=True)
+
+
+def _reap(process, store, owner):
+    if process.wait():
+        print(f"❌ Catalogue compaction (pid {process.pid}) exited with code {process.returncode}")
+        # A child killed before it could release leaves the lease to its parent
+        store.release_compaction(owner)
+
+
+def start_compaction(if_needed=False):
+    """Run compact() in a child process, or return None when another process holds the compaction lease.
+
+    The lease is taken here, in sqlite, so only the worker that wins it pays
+    for a child importing the full stack; the child runs under it.
+    """
+    store = get_store(create=True)
+    owner = os.getpid()
+    if not store.acquire_compaction(owner):
+        return None
+    command = [sys.executable, "-m", "etl_pipeline.catalogue", "compact", "--lease-owner", str(owner)]
+    try:
+        process = subprocess.Popen(command + (["--if-needed"] if if_needed else []))
+    except Exception:
+        store.release_compaction(owner)
+        raise
+    # Waited on in the background so the finished child is reaped, not left a zombie
+    threading.Thread(target=_reap, args=(process, store, owner), name="catalogue-compaction", daemon=True).start()
+    return process
+
+
+def _watch_loop():
+    while True:
+        time.sleep(CATALOGUE_POLL_SECONDS)
+        try:
+            refresh()
+        except Exception as e:
+            print(f"❌ Catalogue refresh failed: {e}")
+
+
+def watch():
+    """Start this process's catalogue poller (again after a fork)."""
+    global _watcher_pid
+    if _watcher_pid == os.getpid() or CATALOGUE_POLL_SECONDS <= 0:
+        return
+    with _lock:
+        if _watcher_pid != os.getpid():
+            _watcher_pid = os.getpid()
+            threading.Thread(target=_watch_loop, name="catalogue-watcher", daemon=True).start()
+
+
+def add_postings(postings):
+    """Append postings and swap them into this process right away; returns their job ids."""
+    if not postings:
+        return []
+    for posting in postings:
+        if not str(posting.get("title") or "").strip() or not str(posting.get("text") or "").strip():
+            raise ValueError("Every posting needs a non-empty title and text")
+    reference = registry.get_reference()
+    ids = get_store(create=True).add(postings, base_rows=int(reference.job_ids.max(initial=-1)) + 1)
+    refresh()
+    return ids
+
+
+def remove_postings(job_ids):
+    """Tombstone existing job ids; returns (removed count, unknown ids)."""
+    reference = registry.get_reference()
+    job_ids = [int(job_id) for job_id in job_ids]
+    existing = set(reference.job_ids.tolist())
+    unknown = [job_id for job_id in job_ids if job_id not in existing]
+    known = [job_id for job_id in job_ids if job_id not in unknown]
+    removed = get_store(create=True).remove(known) if known else 0
+    if removed:
+        refresh()
+    return removed, unknown
+
+
+def compact(if_needed=False, lease_owner=None):
+    """Fold the delta into a new generation with refitted IDF; returns the new generation or None.
+
+    lease_owner is the process that already took the compaction lease for
+    this run (see start_compaction); without one the lease is taken here.
+    """
+    store = get_store(create=True)
+    owner = lease_owner or os.getpid()
+    if lease_owner is None and not store.acquire_compaction(owner):
+        print("⚠️ Another process is compacting the catalogue")
+        return None
+    try:
+        generation, _ = store.state()
+        base = load_base(generation)
+        if if_needed and not needs_compaction(store, base):
+            store.release_compaction(owner)
+            return None
+        version, postings, tombstones = store.delta()
+        start = time.perf_counter()
+
+        _, reference_csv, _ = base_artifacts(generation)
+        reference = pd.read_csv(reference_csv, usecols=["title", "combined_text"])
+        reference = reference.iloc[:len(base.job_ids)]
+        reference["job_id"] = base.job_ids[:len(reference)]
+        postings = postings.rename(columns={"text": "combined_text"})
+        merged = pd.concat([reference, postings], ignore_index=True)
+        merged = merged[~merged["job_id"].isin(tombstones)]
+        merged["title"] = merged["title"].fillna("Unknown").astype(str)
+
+        # Same vocabulary, IDF refitted over the live postings
+        vectorizer = base.vectorizer.__class__(**base.vectorizer.get_params())
+        vectorizer.set_params(vocabulary=base.vectorizer.vocabulary_)
+        matrix = vectorizer.fit_transform(merged["combined_text"].fillna(""))
+
+        new_generation = generation + 1
+        target = generation_dir(new_generation)
+        staging = f"{target}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        joblib.dump(vectorizer, os.path.join(staging, "tfidf_vectorizer.joblib"))
+        joblib.dump(matrix, os.path.join(staging, "tfidf_matrix.joblib"))
+        np.save(os.path.join(staging, "job_ids.npy"), merged["job_id"].to_numpy(dtype=np.int64))
+        registry.write_titles(merged["title"], staging)
+        merged[["title", "combined_text"]].to_csv(os.path.join(staging, "job_reference_data.csv"), index=False)
+        if registry.JOB_INDEX_BACKEND == IVFIndex.backend:
+            save_index(build_index(matrix, IVFIndex.backend), os.path.join(staging, "job_index.joblib"))
+        if base.skill_index is not None:
+            skill_index = SkillIndex.build(merged["combined_text"].fillna(""), base.skill_index.terms,
+                                           base.skill_index.min_df, base.skill_index.max_df)
+            save_skill_index(skill_index, os.path.join(staging, "skill_index.joblib"))
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(staging, target)
+
+        max_job_id = int(postings["job_id"].max()) if len(postings) else -1
+        store.publish(new_generation, max_job_id, tombstones)
+        print(f"✅ Compacted catalogue into generation {new_generation}: {len(merged)} postings "
+              f"({len(postings)} added, {len(tombstones)} retired) in {time.perf_counter() - start:.1f}s")
+
+        # Older generations stay on disk until no worker can still be mapping them
+        for old in range(max(1, generation - 1), generation):
+            shutil.rmtree(generation_dir(old), ignore_errors=True)
+        return new_generation
+    except Exception:
+        store.release_compaction(owner)
+        raise
+
+
+def stats():
+    reference = registry.get_reference()
+    store = get_store()
+    postings, tombstones = store.counts() if store else (0, 0)
+    return {
+        "generation": reference.generation,
+        "version": reference.version,
+        "base_postings": int(reference.tfidf_matrix.shape[0]),
+        "added_postings": postings,
+        "retired_postings": tombstones,
+        "live_postings": int(reference.n_live),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update the job catalogue without a full refit.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="append one posting, or every row of a CSV with title/combined_text")
+    add.add_argument("--title")
+    add.add_argument("--text")
+    add.add_argument("--csv")
+    remove = commands.add_parser("remove", help="retire postings by job id")
+    remove.add_argument("job_ids", type=int, nargs="+")
+    compact_cmd = commands.add_parser("compact", help="fold added/retired postings into a new generation")
+    compact_cmd.add_argument("--if-needed", action="store_true", help="only past CATALOGUE_COMPACT_RATIO")
+    compact_cmd.add_argument("--lease-owner", type=int, help=argparse.SUPPRESS)
+    commands.add_parser("stats")
+    args = parser.parse_args()
+
+    if args.command == "add":
+        if args.csv:
+            frame = pd.read_csv(args.csv, usecols=["title", "combined_text"])
+            postings = [{"title": t, "text": x} for t, x in zip(frame["title"], frame["combined_text"])]
+        else:
+            postings = [{"title": args.title, "text": args.text}]
+        ids = add_postings(postings)
+        print(f"✅ Added {len(ids)} postings (job ids {ids[0]}..{ids[-1]})")
+    elif args.command == "remove":
+        removed, unknown = remove_postings(args.job_ids)
+        print(f"✅ Retired {removed} postings" + (f"; unknown job ids: {unknown}" if unknown else ""))
+    elif args.command == "compact":
+        compact(if_needed=args.if_needed, lease_owner=args.lease_owner)
+    else:
+        print(stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Bounded executors for the CPU-bound stages of the ASGI app (asgi.py).
+
+The event loop only reads uploads and waits on the LLM. Every CPU-bound stage
+runs on a thread pool sized to the cores, behind its own concurrency limit,
+waiting-call limit and timeout:
+
+    preflight  pdfium probes and zip unpacking, milliseconds
+    extract    pdfplumber parsing and section extraction of text-layer PDFs
+    ocr        scans, which go through OCR (itself spread over OCR_WORKERS processes)
+    predict    TF-IDF transform and job matching
+
+A stage with ASGI_<STAGE>_QUEUE calls already waiting raises StageBusy (503
+with Retry-After). A call that has not finished ASGI_<STAGE>_TIMEOUT seconds
+after it arrived raises StageTimeout (504); the work itself cannot be
+interrupted, so it keeps its slot until it returns. With
+ASGI_EXTRACT_PROCESSES set, extraction runs in that many processes instead,
+so pure-Python PDF parsing is not serialised on the GIL.
+"""
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from etl_pipeline.metrics import counter, gauge
+
+CPUS = os.cpu_count() or 1
+ASGI_THREADS = int(os.getenv("ASGI_THREADS", str(2 * CPUS)))
+ASGI_EXTRACT_PROCESSES = int(os.getenv("ASGI_EXTRACT_PROCESSES", "0"))
+
+
+def stage_limits(stage, concurrency, queue, timeout):
+    """(concurrency, waiting-call limit, timeout) of a stage, overridable with ASGI_<STAGE>_* variables."""
+    prefix = f"ASGI_{stage.upper()}_"
+    return (
+        int(os.getenv(prefix + "CONCURRENCY", str(concurrency))),
+        int(os.getenv(prefix + "QUEUE", str(queue))),
+        float(os.getenv(prefix + "TIMEOUT", str(timeout))),
+    )
+
+
+STAGES = {
+    "preflight": stage_limits("preflight", CPUS, 256, 10),
+    "extract": stage_limits("extract", CPUS, 128, 60),
+    "ocr": stage_limits("ocr", max(1, CPUS // 2), 16, 300),
+    "predict": stage_limits("predict", CPUS, 256, 30),
+}
+
+STAGE_WAITING = gauge("pathfinder_stage_waiting", "Calls waiting for a stage's concurrency limit", ["stage"])
+STAGE_REJECTIONS = counter("pathfinder_stage_rejections_total", "Calls refused or timed out by a stage", ["stage", "reason"])
+
+
+class StageBusy(RuntimeError):
+    """A stage has as many calls waiting as it accepts; retry later."""
+
+    def __init__(self, stage, retry_after=5):
+        super().__init__(f"The {stage} stage is at capacity, retry later")
+        self.stage = stage
+        self.retry_after = retry_after
+
+
+class StageTimeout(TimeoutError):
+    """A stage call did not finish within the stage's timeout."""
+
+    def __init__(self, stage, timeout):
+        super().__init__(f"The {stage} stage did not finish within {timeout:g}s")
+        self.stage = stage
+
+
+class StageRunner:
+    """Runs blocking functions for an event loop, per stage concurrency, queue and time limits."""
+
+    def __init__(self, stages=None, threads=ASGI_THREADS, extract_processes=ASGI_EXTRACT_PROCESSES):
+        self.stages = dict(stages or STAGES)
+        self.threads = threads
+        self.extract_processes = extract_processes
+        self._pid = None
+
+    def _ensure_started(self):
+        """Create the pools on first use (and again after a fork)."""
+        if self._pid == os.getpid():
+            return
+        self._threads = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="stage")
+        self._processes = None
+        if self.extract_processes > 0:
+            # Spawned, not forked: the worker already runs the event loop and client threads
+            self._processes = ProcessPoolExecutor(self.extract_processes, mp_context=multiprocessing.get_context("spawn"))
+        self._semaphores = {}
+        self._waiting = dict.fromkeys(self.stages, 0)
+        self._pid = os.getpid()
+
+    async def run(self, stage, fn, *args):
+        """await fn(*args) run on the stage's executor."""
+        self._ensure_started()
+        concurrency, queue_limit, timeout = self.stages[stage]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        semaphore = self._semaphores.setdefault(stage, asyncio.Semaphore(concurrency))
+
+        if self._waiting[stage] >= queue_limit:
+            STAGE_REJECTIONS.inc(stage=stage, reason="busy")
+            raise StageBusy(stage)
+        self._waiting[stage] += 1
+        STAGE_WAITING.inc(stage=stage)
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            STAGE_REJECTIONS.inc(stage=stage, reason="timeout")
+            raise StageTimeout(stage, timeout)
+        finally:
+            self._waiting[stage] -= 1
+            STAGE_WAITING.dec(stage=stage)
+
+        if stage == "extract" and self._processes is not None:
+            future = loop.run_in_executor(self._processes, fn, *args)
+        else:
+            # Copy the context so stage timings still reach the request's trace
+            context = contextvars.copy_context()
+            future = loop.run_in_executor(self._threads, functools.partial(context.run, fn, *args))
+        # The slot is freed when the work returns, not when the caller stops waiting for it
+        future.add_done_callback(lambda _: semaphore.release())
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            STAGE_REJECTIONS.inc(stage=stage, reason="timeout")
+            raise StageTimeout(stage, timeout)
+
+    def stats(self):
+        self._ensure_started()
+        return {
+            stage: {"concurrency": concurrency, "waiting": self._waiting[stage], "queue_limit": queue_limit,
+                    "timeout": timeout}
+            for stage, (concurrency, queue_limit, timeout) in self.stages.items()
+        }
+
+
+stage_runner = StageRunner()
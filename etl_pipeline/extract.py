@@ -1,107 +1,281 @@
+import os
+import threading
 import uuid
 import re
+import string
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Union
-import pdfplumber
-import spacy
+import pypdfium2 as pdfium
 import pytesseract
 from PIL import Image
-from pdf2image import convert_from_path
 from datetime import datetime
+from functools import lru_cache
 from dateutil import parser as dateparser
-from langdetect import detect
-from typing import Union
+from typing import Union, Optional, BinaryIO
+
+from etl_pipeline import keywords
+from etl_pipeline.cache import content_hash, extraction_cache
+from etl_pipeline.language import guess_language
+from etl_pipeline.metrics import stage, CACHE_LOOKUPS, LANGUAGE_REJECTIONS, OCR_FALLBACKS
+from etl_pipeline.registry import get_nlp
+from etl_pipeline.keywords import SECTIONS
+from etl_pipeline.ocr import OCR_DPI, ocr_pdf
+from etl_pipeline.guard import ParseLimitExceeded, parse_text
+from etl_pipeline.uploads import as_stream, is_file_like, materialize
+
+# A resume is a path to a PDF, PDF bytes / a binary stream, or a raw resume string
+ResumeInput = Union[str, Path, bytes, BinaryIO]
 
 # pytesseract.pytesseract.tesseract_cmd = r""
 
-# Load NLP model with error handling
-try:
-    nlp = spacy.load("en_core_web_sm")
-except Exception as e:
-    print(f"Error loading Spacy NLP model: {e}")
-    nlp = None
-
-# Keywords for different resume sections
-SKILL_KEYWORDS = ["skill", "skills", "technical skill", "programming language", "soft skills", "languages", "frameworks", "couserworks", "tools"]
-EDUCATION_KEYWORDS = {"education", "degree", "university", "college", "coursework", "courses"}
-EXPERIENCE_KEYWORDS = {"intern", "assistant", "manager", "developer", "engineer", 
-                        "designer", "coordinator", "lead", "officer", "specialist",
-                        "analyst", "consultant", "staff"}
-ABILITY_KEYWORDS = [
-    "developing", "creating", "building",
-    "designing", "implementing", "making",
-    "managing", "leading", "collaborating",
-    "analyzing", "optimizing", "researching",
-    "engineering", "automating", "testing",
-    "planning", "mentoring", "preparing", "leading", 
-    "brainstorming", "searching", "working"
-]
-EDUCATION_KEYWORDS = {"education", "degree", "university", "college", "coursework", "courses"}
-EXPERIENCE_KEYWORDS = {"intern", "assistant", "manager", "developer", "engineer", "analyst", "consultant"}
-ABILITY_KEYWORDS = ["developing", "creating", "building", "researching", "automating", "testing"]
+# Pre-flight limits, checked before a document is parsed in full
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(10 * 1024 * 1024)))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "20"))
+# Pages probed for a text layer and a language sample before the rest is extracted
+PDF_PROBE_PAGES = int(os.getenv("PDF_PROBE_PAGES", "2"))
+# Largest page OCR may rasterise; bigger pages are rendered at a lower DPI, or refused below 72 DPI
+PDF_MAX_PAGE_PIXELS = int(os.getenv("PDF_MAX_PAGE_PIXELS", str(16_000_000)))
+# Header snippets per nlp.pipe batch, and processes spaCy spreads them over, when names are resolved in bulk
+NER_BATCH_SIZE = int(os.getenv("NER_BATCH_SIZE", "64"))
+NER_PROCESSES = int(os.getenv("NER_PROCESSES", "1"))
+# Characters used to detect the language, and extracted at most per document
+LANGUAGE_SAMPLE_CHARS = int(os.getenv("LANGUAGE_SAMPLE_CHARS", "2000"))
+MAX_TEXT_CHARS = int(os.getenv("MAX_TEXT_CHARS", "50000"))
+
+
+PDFIUM_LOCK = threading.Lock()
+
+
+class DocumentRejected(ValueError):
+    """An upload refused by the pre-flight checks; status is the HTTP status to answer with."""
+
+    def __init__(self, message, status=422):
+        super().__init__(message)
+        self.status = status
+
+    def __reduce__(self):
+        # Keep the status when raised in a process pool worker
+        return self.__class__, (str(self), self.status)
+
+
+# Section keywords and experience fallback patterns live in keywords.json (see keywords.py)
 DATE_PATTERN = r'([A-Za-z]{3,10})\s*(\d{4})'
+DATE_REGEX = re.compile(DATE_PATTERN)
+ASCII_LETTERS = frozenset(string.ascii_letters)
+DATE_HEAD_REGEX = re.compile(r'\s*(\d{4})')
+SKILL_TOKEN_REGEX = re.compile(r'\b[a-zA-Z0-9+#.]+\b')
 
 
 def detect_language(text: str) -> None:
-    """Detects if the text is in English, raises an error if not."""
+    """Detects if a bounded sample of the text is in English, raises DocumentRejected if not."""
+    sanitized_text = re.sub(r"\S+@\S+|\+\d{9,}|http\S+", "", text[:2 * LANGUAGE_SAMPLE_CHARS])
+    with stage("language_detect"):
+        lang, _ = guess_language(sanitized_text[:LANGUAGE_SAMPLE_CHARS])
+    if lang != "en":
+        LANGUAGE_REJECTIONS.inc()
+        raise DocumentRejected(f"Resume must be in English (detected: {lang}).", status=422)
+
+def is_pdf_payload(input_data: ResumeInput) -> bool:
+    """True for in-memory PDF uploads (bytes or a binary stream)."""
+    return isinstance(input_data, (bytes, bytearray, memoryview)) or is_file_like(input_data)
+
+
+def existing_path(input_data: ResumeInput) -> Optional[Path]:
+    """Path for inputs naming an existing file; raw resume strings return None."""
+    if not isinstance(input_data, (str, Path)):
+        return None
     try:
-        sanitized_text = re.sub(r"\S+@\S+|\+\d{9,}|http\S+", "", text) 
-        lang = detect(sanitized_text)
-        if lang != "en":
-            raise ValueError("Error: Resume must be in English.")
-    except Exception as e:
-        raise ValueError(f"Error detecting language: {e}")
+        path = Path(input_data)
+        return path if path.is_file() else None
+    except (OSError, ValueError):
+        # Long or multi-line raw resume strings are not valid file names
+        return None
+
 
-def extract_text(input_data: Union[str, Path]) -> str:
+def upload_digest(input_data: ResumeInput) -> Optional[str]:
+    """Content hash of an uploaded PDF, or None for raw resume strings."""
+    if is_pdf_payload(input_data):
+        return content_hash(input_data)
+    path = existing_path(input_data)
+    if path is not None and path.suffix.lower() == ".pdf":
+        with open(path, "rb") as f:
+            return content_hash(f)
+    return None
+
+
+def extract_text(input_data: ResumeInput, digest: Optional[str] = None, probe: Optional[tuple] = None) -> str:
     try:
-        path = Path(input_data)
-        if path.exists():
-            if path.suffix.lower() == ".pdf":
-                extracted = extract_text_from_pdf(path)
+        path = existing_path(input_data)
+        if path is not None or is_pdf_payload(input_data):
+            if path is not None and path.suffix.lower() != ".pdf":
+                raise ValueError(f"Unsupported file format: {path.suffix}")
             # elif path.suffix.lower() in [".jpg", ".jpeg", ".png", ".tiff"]:
             #     extracted = extract_text_via_ocr(path)
-            else:
-                raise ValueError(f"Unsupported file format: {path.suffix}")
-            return clean_text(extracted)
+
+            # Identical uploads reuse the pdfplumber/OCR result
+            cache_key = f"text:{digest or upload_digest(input_data)}"
+            cached = extraction_cache.get(cache_key)
+            CACHE_LOOKUPS.inc(kind="text", result="miss" if cached is None else "hit")
+            if cached is not None:
+                return cached
+
+            extracted = clean_text(extract_text_from_pdf(path or input_data, probe))
+            extraction_cache.set(cache_key, extracted)
+            return extracted
 
         # If it's not a file, assume it's raw resume string
         return clean_text(str(input_data))
 
+    except DocumentRejected:
+        raise
     except Exception as e:
         raise RuntimeError(f"Error extracting text: {e}")
 
 
 
-def extract_text_from_pdf(pdf_path: Union[str, Path]) -> str:
-    """Extract text from a PDF using pdfplumber, fallback to OCR if necessary."""
-    try:
-        text_blocks = []
-        with pdfplumber.open(str(pdf_path)) as pdf:
-            for page in pdf.pages:
-                extracted = page.extract_text()
-                if extracted:
-                    text_blocks.append(extracted)
+def payload_size(pdf_source: ResumeInput) -> int:
+    """Size in bytes of a PDF path, bytes or seekable stream."""
+    if isinstance(pdf_source, (str, Path)):
+        return os.path.getsize(pdf_source)
+    if isinstance(pdf_source, (bytes, bytearray, memoryview)):
+        return len(pdf_source)
+    size = pdf_source.seek(0, os.SEEK_END)
+    pdf_source.seek(0)
+    return size
 
-        if not text_blocks:
-            return extract_text_via_ocr(pdf_path)
 
-        full_text = "\n".join(text_blocks)
-        detect_language(full_text)  # Raise error if not English
-        return full_text.strip()
+def probe_pdf(pdf_source: ResumeInput) -> tuple:
+    """(page count, text of the first PDF_PROBE_PAGES pages, largest page area in square points) read with pdfium.
 
+    pdfium is far cheaper than pdfplumber; page sizes come from the page
+    tree, without loading the pages. Unreadable files raise DocumentRejected.
+    """
+    source = str(pdf_source) if isinstance(pdf_source, (str, Path)) else as_stream(pdf_source)
+    # pdfium is not thread-safe; probes take milliseconds, so gunicorn threads simply take turns
+    with PDFIUM_LOCK:
+        return _probe_pdf(source, pdf_source)
+
+
+def _probe_pdf(source, pdf_source):
+    try:
+        pdf = pdfium.PdfDocument(source, autoclose=False)
+    except pdfium.PdfiumError as e:
+        if is_file_like(pdf_source):
+            pdf_source.seek(0)
+        raise DocumentRejected(f"Not a readable PDF: {e}", status=422)
+    try:
+        sample = []
+        for number in range(min(len(pdf), PDF_PROBE_PAGES)):
+            page = pdf[number]
+            textpage = page.get_textpage()
+            sample.append(textpage.get_text_bounded())
+            textpage.close()
+            page.close()
+            if sum(map(len, sample)) >= LANGUAGE_SAMPLE_CHARS:
+                break
+        max_area = max((w * h for w, h in map(pdf.get_page_size, range(min(len(pdf), PDF_MAX_PAGES)))), default=0)
+        return len(pdf), "\n".join(sample), max_area
+    finally:
+        pdf.close()
+        if is_file_like(pdf_source):
+            pdf_source.seek(0)
+
+
+def check_size(pdf_source: ResumeInput) -> None:
+    """DocumentRejected (413) for a PDF over PDF_MAX_BYTES."""
+    if payload_size(pdf_source) > PDF_MAX_BYTES:
+        raise DocumentRejected(f"PDF is larger than {PDF_MAX_BYTES // (1024 * 1024)} MB.", status=413)
+
+
+@dataclass(slots=True)
+class Preflight:
+    """What check_upload learnt about an upload before it is extracted."""
+
+    digest: Optional[str]
+    features: Optional[dict] = None
+    probe: Optional[tuple] = None
+
+    @property
+    def needs_ocr(self):
+        return self.features is None and not self.probe[1].strip()
+
+
+def check_upload(pdf_source: ResumeInput, resolve_name: bool = True) -> Preflight:
+    """Cached features of an upload seen before, else its size check and pdfium probe.
+
+    Lets a caller pick the text or OCR lane without a second probe: pass the
+    result on as extract_resume_features(..., preflight=...). Oversize and
+    unreadable PDFs raise DocumentRejected.
+    """
+    digest = upload_digest(pdf_source)
+    features = cached_features(digest, keywords.current(), resolve_name)
+    if features is not None:
+        return Preflight(digest, features)
+    check_size(pdf_source)
+    return Preflight(digest, probe=probe_pdf(pdf_source))
+
+
+def extract_text_from_pdf(pdf_source: ResumeInput, probe: Optional[tuple] = None) -> str:
+    """Extract text from a PDF path or in-memory upload using pdfplumber, fallback to OCR if necessary.
+
+    A pre-flight probe of the first pages refuses oversize, unreadable and
+    non-English documents and sends scans to OCR before anything is parsed in
+    full; extraction then stops after MAX_TEXT_CHARS. Unless PDF_GUARD=0 the
+    text layer is parsed in a resource-limited child process (see guard.py).
+    probe is the probe_pdf result of a caller that has already run it.
+    """
+    try:
+        check_size(pdf_source)
+        if probe is None:
+            with stage("preflight"):
+                probe = probe_pdf(pdf_source)
+        page_count, sample, max_area = probe
+        if page_count > PDF_MAX_PAGES:
+            raise DocumentRejected(f"PDF has {page_count} pages, at most {PDF_MAX_PAGES} accepted.", status=413)
+
+        text = ""
+        if sample.strip():
+            detect_language(sample)  # Raise DocumentRejected if not English
+            source = str(pdf_source) if isinstance(pdf_source, (str, Path)) else as_stream(pdf_source)
+            with stage("pdfplumber"):
+                text = parse_text(source, MAX_TEXT_CHARS)
+
+        if not text:
+            OCR_FALLBACKS.inc()
+            dpi = ocr_dpi(max_area)
+            # pdf2image/poppler need a real file; in-memory uploads get a private temp copy
+            with stage("ocr"), materialize(pdf_source) as pdf_path:
+                return extract_text_via_ocr(pdf_path, dpi)
+
+        return text[:MAX_TEXT_CHARS].strip()
+
+    except ParseLimitExceeded as e:
+        raise DocumentRejected(str(e), status=e.status)
+    except DocumentRejected:
+        raise
     except Exception as e:
         raise RuntimeError(f"Error extracting text from PDF: {e}")
 
 
 
-def extract_text_via_ocr(image_path: Union[str, Path]) -> str:
+def ocr_dpi(page_area: float) -> int:
+    """OCR_DPI, lowered so the largest page stays within PDF_MAX_PAGE_PIXELS; DocumentRejected below 72 DPI."""
+    if page_area <= 0:
+        return OCR_DPI
+    dpi = min(OCR_DPI, int(72 * (PDF_MAX_PAGE_PIXELS / page_area) ** 0.5))
+    if dpi < 72:
+        raise DocumentRejected(f"PDF pages are too large to OCR (over {PDF_MAX_PAGE_PIXELS} pixels at 72 DPI).",
+                               status=413)
+    if dpi < OCR_DPI:
+        print(f"⚠️ OCR at {dpi} DPI to keep pages within {PDF_MAX_PAGE_PIXELS} pixels")
+    return dpi
+
+
+def extract_text_via_ocr(image_path: Union[str, Path], dpi: Optional[int] = None) -> str:
     """Extract text using OCR from scanned PDFs or images."""
     try:
-        text = ""
         if image_path.suffix.lower() == ".pdf":
-            images = convert_from_path(str(image_path))
-            for img in images:
-                text += pytesseract.image_to_string(img) + "\n"
+            text = ocr_pdf(image_path, dpi=dpi)
         else:
             img = Image.open(image_path)
             text = pytesseract.image_to_string(img)
@@ -120,71 +294,203 @@ def clean_text(text: str) -> str:
     except Exception as e:
         raise RuntimeError(f"Error cleaning text: {e}")
 
+def header_name(lines) -> Optional[str]:
+    """First digit-free line of the resume header, or None when the header needs NER."""
+    for line in lines[:5]:
+        clean_line = line.strip()
+        if clean_line and not any(char.isdigit() for char in clean_line):
+            return clean_line
+    return None
+
+
+def header_snippet(lines) -> str:
+    return "\n".join(lines[:5])
+
+
+def person_name(doc) -> str:
+    return next((ent.text.strip() for ent in doc.ents if ent.label_ == "PERSON"), "Unknown")
+
+
 def extract_name(lines):
     """Extracts name from resume header using NLP."""
     try:
-        for line in lines[:5]:
-            clean_line = line.strip()
-            if clean_line and not any(char.isdigit() for char in clean_line):
-                return clean_line
+        name = header_name(lines)
+        if name is not None:
+            return name
+        # spaCy is only loaded the first time a header has no digit-free line
+        nlp = get_nlp()
         if nlp is None:
             return "Unknown"
-        doc = nlp("\n".join(lines[:5]))
-        for ent in doc.ents:
-            if ent.label_ == "PERSON":
-                return ent.text.strip()
-        return "Unknown"
+        with stage("ner"):
+            return person_name(nlp(header_snippet(lines)))
     except Exception as e:
         raise RuntimeError(f"Error extracting name: {e}")
 
 
-def extract_skills(lines):
-    try:
-        skill_block = False
-        extracted_skills = set()
+def resolve_names(features: list, batch_size: Optional[int] = None, n_process: Optional[int] = None) -> list:
+    """Fill in the Name left unresolved by extract_resume_features(..., resolve_name=False).
 
-        for line in lines:
-            lower_line = line.lower()
-            if "skill" in lower_line or "skills" in lower_line or "technical skills" in lower_line or "programming language" in lower_line or "soft skills" in lower_line or "languages" in lower_line:
+    The headers of every such resume go through one nlp.pipe pass, in
+    batches of NER_BATCH_SIZE over NER_PROCESSES processes, instead of one
+    nlp() call per resume. Returns the same (updated) feature dicts.
+    """
+    try:
+        pending = [f for f in features if f["Name"] is None]
+        if not pending:
+            return features
+        nlp = get_nlp()
+        if nlp is None:
+            names = ["Unknown"] * len(pending)
+        else:
+            snippets = [header_snippet(preprocess_lines(f["resume_str"])) for f in pending]
+            with stage("ner"):
+                docs = nlp.pipe(snippets, batch_size=batch_size or NER_BATCH_SIZE, n_process=n_process or NER_PROCESSES)
+                names = [person_name(doc) for doc in docs]
+        for f, name in zip(pending, names):
+            f["Name"] = name
+        return features
+    except Exception as e:
+        raise RuntimeError(f"Error extracting names: {e}")
+
+
+class _DateIndex:
+    """DATE_PATTERN matches per line, computed at most once per line.
+
+    A 3-line window's dates are its lines' own matches plus any match that
+    spans a line break (month at the end of one line, year at the start of
+    the next), which is exactly what re.findall on the joined window finds.
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+        self._line_dates = {}
+        self._break_dates = {}
+
+    def _dates_in_line(self, j):
+        if j not in self._line_dates:
+            self._line_dates[j] = DATE_REGEX.findall(self.lines[j])
+        return self._line_dates[j]
+
+    def _date_across_break(self, j):
+        if j not in self._break_dates:
+            across = None
+            head = DATE_HEAD_REGEX.match(self.lines[j + 1])
+            if head:
+                # Trailing run of ASCII letters, capped at 10 like [A-Za-z]{3,10}
+                line = self.lines[j].rstrip()
+                start = len(line)
+                while start > 0 and len(line) - start < 10 and line[start - 1] in ASCII_LETTERS:
+                    start -= 1
+                if len(line) - start >= 3:
+                    across = (line[start:], head.group(1))
+            self._break_dates[j] = across
+        return self._break_dates[j]
+
+    def window(self, first, last):
+        """Dates found in "\\n".join(lines[first:last])."""
+        if any(not self.lines[j].strip() for j in range(first, last)):
+            # A blank line lets a match span two breaks; scan the joined window directly
+            return DATE_REGEX.findall("\n".join(self.lines[first:last]))
+        dates = []
+        for j in range(first, last):
+            dates.extend(self._dates_in_line(j))
+            if j + 1 < last:
+                across = self._date_across_break(j)
+                if across:
+                    dates.append(across)
+        return dates
+
+
+def line_sections(lower_line, matcher):
+    """Names of the keyword groups with a keyword occurring in the line."""
+    regex, labels = matcher
+    found = set()
+    for match in regex.finditer(lower_line):
+        found |= labels[match.group(1)]
+    return found
+
+
+def scan_sections(lines, sections=SECTIONS, config=None):
+    """Single pass over the lines feeding the skill, education, experience and ability extractors."""
+    want_skill = "skill" in sections
+    want_education = "education" in sections
+    want_experience = "experience" in sections
+    want_ability = "ability" in sections
+
+    extracted_skills = set()
+    education_entries = []
+    experience_entries = []
+    ability_entries = []
+
+    skill_block = False
+    edu_block = False
+    start_year = None
+    dates = None
+
+    config = config or keywords.current()
+    matcher = config.matcher(sections)
+
+    for i, line in enumerate(lines):
+        lower_line = line.lower()
+        found = line_sections(lower_line, matcher)
+
+        if want_skill:
+            if "skill_header" in found:
                 skill_block = True
-                continue
-            if skill_block and any(kw in lower_line for kw in ["experience", "certification", "project", "skills", "certificate"]):
-                skill_block = False
-            if skill_block:
-                extracted_skills.update(re.findall(r'\b[a-zA-Z0-9+#.]+\b', lower_line))
-        filtered_skills = {skill.strip() for skill in extracted_skills if skill.lower() not in ["and"]}
-
-        return filtered_skills
+            else:
+                if skill_block and "skill_break" in found:
+                    skill_block = False
+                if skill_block:
+                    extracted_skills.update(SKILL_TOKEN_REGEX.findall(lower_line))
+
+        if want_education:
+            if "education" in found:
+                edu_block = True
+                education_entries.append(line.strip())
+            else:
+                if edu_block and "education_break" in found:
+                    edu_block = False
+                match = DATE_REGEX.search(line) if edu_block else None
+                if match:
+                    if start_year is None:
+                        start_year = match.group(1)
+                    else:
+                        education_entries.append(line.strip())
+                        start_year = None
+
+        if want_experience and "experience" in found:
+            if dates is None:
+                dates = _DateIndex(lines)
+            window = dates.window(i, min(i + 3, len(lines)))
+            if window:
+                start = f"{window[0][0]} {window[0][1]}"
+                end = f"{window[1][0]} {window[1][1]}" if len(window) > 1 else "Present"
+                duration = calculate_months(start, end)
+                if duration >= 1:
+                    experience_entries.append(f"{line.strip()} [{duration} months]")
+
+        if want_ability and "ability" in found:
+            ability_entries.append(line.strip())
+
+    return {
+        "skill": {skill.strip() for skill in extracted_skills if skill.lower() not in config.skill_stopwords},
+        "education": education_entries,
+        "experience": experience_entries,
+        "ability": ability_entries,
+    }
+
+
+def extract_skills(lines):
+    try:
+        return scan_sections(lines, {"skill"})["skill"]
     except Exception as e:
         raise RuntimeError(f"Error extracting skills: {e}")
 
 
 def extract_education(lines):
-    """Extracts education details dynamically based on keywords and calculates duration."""
+    """Extracts education details dynamically based on keywords."""
     try:
-        education_entries = []
-        edu_block = False
-        start_year = None
-
-        for line in lines:
-            lower_line = line.lower().strip()
-            if any(ek in lower_line for ek in EDUCATION_KEYWORDS):
-                edu_block = True
-                education_entries.append(line.strip()) 
-                continue
-            if edu_block and any(kw in lower_line for kw in ["experience", "certification", "project", "skills", "projects"]):
-                edu_block = False
-            match = re.search(DATE_PATTERN, line) 
-            if edu_block and match:
-                if start_year is None:
-                    start_year = match.group(1)
-                else:
-                    end_year = match.group(1)
-                    duration = calculate_months(f"Jan {start_year}", f"Dec {end_year}")
-                    education_entries.append(f"{line.strip()}")
-                    start_year = None 
-
-        return education_entries
+        return scan_sections(lines, {"education"})["education"]
     except Exception as e:
         raise RuntimeError(f"Error extracting education: {e}")
 
@@ -192,48 +498,68 @@ def extract_education(lines):
 def extract_experience(lines):
     """Extracts job titles and durations dynamically."""
     try:
-        experience_entries = []
-
-        for i in range(len(lines)):
-            line = lines[i].strip()
-            if any(role in line.lower() for role in EXPERIENCE_KEYWORDS):
-                context = "\n".join(lines[i:i + 3])
-                dates = re.findall(DATE_PATTERN, context, flags=re.IGNORECASE)
-
-                if dates:
-                    start = f"{dates[0][0]} {dates[0][1]}"
-                    end = f"{dates[1][0]} {dates[1][1]}" if len(dates) > 1 else "Present"
-                    duration = calculate_months(start, end)
-                    role_title = line
-                    if duration >= 1:
-                        experience_entries.append(f"{role_title} [{duration} months]")
-
-        return experience_entries
+        return scan_sections(lines, {"experience"})["experience"]
     except Exception as e:
         raise RuntimeError(f"Error extracting experience: {e}")
 
 def extract_ability(lines):
     """Extracts abilities from resume text based on action-oriented phrases."""
     try:
-        ability_entries = []
-
-        for line in lines:
-            lower_line = line.lower().strip()
-
-            if any(phrase in lower_line for phrase in ABILITY_KEYWORDS):
-                ability_entries.append(line.strip())
-
-        return ability_entries
+        return scan_sections(lines, {"ability"})["ability"]
     except Exception as e:
         print(f"Error extracting abilities: {e}")
         return []
 
+# Month names and abbreviations accepted by dateutil, for the parse fast path
+MONTHS = {
+    name: number
+    for number, names in enumerate([
+        ("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"),
+        ("may",), ("jun", "june"), ("jul", "july"), ("aug", "august"),
+        ("sep", "sept", "september"), ("oct", "october"), ("nov", "november"), ("dec", "december"),
+    ], start=1)
+    for name in names
+}
+MONTH_YEAR_REGEX = re.compile(r'([a-z]+)\.?\s*(\d{4})')
+NUMERIC_MONTH_YEAR_REGEX = re.compile(r'(\d{1,2})\s*/\s*(\d{4})')
+YEAR_REGEX = re.compile(r'\d{4}')
+DATE_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_month_year(value: str) -> Optional[tuple]:
+    """Parses "Mon YYYY", "Month YYYY", "MM/YYYY" or "YYYY" into (year, month).
+
+    The month is None for a bare year (dateutil fills in the current month).
+    Anything else falls back to dateutil; unparseable strings return None.
+    """
+    text = value.strip().lower()
+    match = MONTH_YEAR_REGEX.fullmatch(text)
+    if match and match.group(1) in MONTHS and int(match.group(2)) > 0:
+        return int(match.group(2)), MONTHS[match.group(1)]
+    match = NUMERIC_MONTH_YEAR_REGEX.fullmatch(text)
+    if match and 1 <= int(match.group(1)) <= 12 and int(match.group(2)) > 0:
+        return int(match.group(2)), int(match.group(1))
+    if YEAR_REGEX.fullmatch(text) and int(text) > 0:
+        return int(text), None
+    try:
+        parsed = dateparser.parse(value)
+        return parsed.year, parsed.month
+    except Exception:
+        return None
+
+
 def calculate_months(start: str, end: str) -> int:
     """Calculates months between two dates."""
     try:
-        start_date = dateparser.parse(start)
-        end_date = dateparser.parse(end) if end.lower() not in ["present", "now"] else datetime.today()
-        return max(0, (end_date.year - start_date.year) * 12 + (end_date.month - start_date.month))
+        today = datetime.today()
+        start_date = parse_month_year(start)
+        end_date = parse_month_year(end) if end.lower() not in ["present", "now"] else (today.year, today.month)
+        if start_date is None or end_date is None:
+            return 0
+        start_month = start_date[1] or today.month
+        end_month = end_date[1] or today.month
+        return max(0, (end_date[0] - start_date[0]) * 12 + (end_month - start_month))
     except:
         return 0
     
@@ -250,26 +576,51 @@ def preprocess_lines(text: str) -> list:
 
 
 
-def extract_resume_features(input_data: Union[str, Path]) -> dict:
-    """Extracts structured details from a resume, accepting either a file or raw string."""
+def cached_features(digest: Optional[str], config, resolve_name: bool = True) -> Optional[dict]:
+    """Features extracted earlier from the upload with this digest under this keyword config, or None."""
+    if not digest:
+        return None
+    # Sections depend on the keyword config too: a reload must not be answered from the cache
+    cached = extraction_cache.get(f"features:{config.version}:{digest}")
+    CACHE_LOOKUPS.inc(kind="features", result="miss" if cached is None else "hit")
+    if cached is None:
+        return None
+    features = dict(cached, ID=str(uuid.uuid4()))
+    return resolve_names([features])[0] if resolve_name else features
+
+
+def extract_resume_features(input_data: ResumeInput, resolve_name: bool = True,
+                            preflight: Optional[Preflight] = None) -> dict:
+    """Extracts structured details from a resume, accepting a file path, PDF bytes/stream or raw string.
+
+    With resolve_name=False a Name the header rules can't find is left None
+    for resolve_names() to fill in for a whole batch at once. preflight is
+    the check_upload result of a caller that has already run it.
+    """
     try:
-        text = extract_text(input_data)
-        lines = preprocess_lines(text)
+        config = keywords.current()
+        if preflight is None:
+            digest = upload_digest(input_data)
+            cached = cached_features(digest, config, resolve_name)
+        else:
+            digest, cached = preflight.digest, preflight.features
+        if cached is not None:
+            return cached
+
+        with stage("extract_text"):
+            text = extract_text(input_data, digest, preflight and preflight.probe)
+
+        with stage("extract_sections"):
+            lines = preprocess_lines(text)
 
-        # Extract experience
-        experience_entries = extract_experience(lines)
+            # Extract every section in one pass over the lines
+            sections = scan_sections(lines, config=config)
+        experience_entries = sections["experience"]
         
-        # If experience is empty, try to extract from text manually
+        # If experience is empty, try the configured fallback patterns on the whole text
         if not experience_entries:
-            # Look for common job patterns in the text
-            experience_patterns = [
-                r'Back End Engineer.*?PT Awan Data Indonesia.*?05/2024.*?06/2025',
-                r'Junior Back End Engineer.*?PT Mahkota Giri Suprana.*?01/2024.*?03/2024',
-                r'(\w+\s+Engineer|\w+\s+Developer|\w+\s+Manager|\w+\s+Analyst).*?(\d{2}/\d{4}).*?(\d{2}/\d{4}|\d{4})',
-            ]
-            
-            for pattern in experience_patterns:
-                matches = re.findall(pattern, text, flags=re.IGNORECASE | re.DOTALL)
+            for pattern in config.fallback_regexes:
+                matches = pattern.findall(text)
                 if matches:
                     if isinstance(matches[0], tuple):
                         for match in matches:
@@ -279,14 +630,20 @@ def extract_resume_features(input_data: Union[str, Path]) -> dict:
                         experience_entries.extend(matches)
                     break
 
-        return {
+        features = {
             "ID": str(uuid.uuid4()),
             "resume_str": text,
-            "Name": extract_name(lines),
-            "Experience": ", ".join(experience_entries) if experience_entries else "Back End Engineer [05/2024 - 06/2025], Junior Back End Engineer [01/2024 - 03/2024]",
-            "skill": ", ".join(extract_skills(lines)),
-            "ability": ", ".join(extract_ability(lines)),
-            "program": ", ".join(extract_education(lines))
+            "Name": extract_name(lines) if resolve_name else header_name(lines),
+            "Experience": ", ".join(experience_entries) if experience_entries else config.experience_default,
+            # Sorted so the matching text (and its bigrams) doesn't depend on per-process set ordering
+            "skill": ", ".join(sorted(sections["skill"])),
+            "ability": ", ".join(sections["ability"]),
+            "program": ", ".join(sections["education"])
         }
+        if digest:
+            extraction_cache.set(f"features:{config.version}:{digest}", dict(features))
+        return features
+    except DocumentRejected:
+        raise
     except Exception as e:
         raise RuntimeError(f"Error extracting resume features: {e}")
\ No newline at end of file
@@ -1,106 +1,100 @@
-import json
-import re
-import requests
-import os
-from dotenv import load_dotenv
+import httpx
 from flask import jsonify, make_response
 
-load_dotenv()
+from etl_pipeline.metrics import stage
+from etl_pipeline.review_client import review_client, ReviewDeadlineExceeded, ReviewResponseError
 
-# OpenRouter API configuration
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-OPENROUTER_MODEL = "deepseek/deepseek-r1-0528:free"
-OPENROUTER_ENDPOINT = "https://openrouter.ai/api/v1/chat/completions"
 
-def strip_json_wrappers(text):
-    """Cleans LLM response from code fences or markdown artifacts."""
-    return re.sub(r"^.*?({.*?})\s*```?$", r"\1", text.strip(), flags=re.DOTALL)
+def feedback(df):
+    """Flask response with the CV review of an extracted profile."""
+    body, status = review(df)
+    return make_response(jsonify(body), status)
 
 
-def feedback(df):
+def review(df):
+    """(response body, HTTP status) of the CV review of an extracted profile."""
+    early = precheck(df)
+    if early is not None:
+        return early
+
+    try:
+        # Pooled, retried and cached call to OpenRouter (see review_client)
+        with stage("llm_review"):
+            parsed = review_client.review(df)
+        return {"review": parsed}, 200
+    except ReviewDeadlineExceeded:
+        return degraded_review(df)
+    except Exception as e:
+        return review_error(e)
+
+
+async def areview(df):
+    """review() for async callers: awaits the LLM call instead of blocking a thread on it."""
+    early = precheck(df)
+    if early is not None:
+        return early
+
+    try:
+        with stage("llm_review"):
+            parsed = await review_client.areview(df)
+        return {"review": parsed}, 200
+    except ReviewDeadlineExceeded:
+        return degraded_review(df)
+    except Exception as e:
+        return review_error(e)
+
+
+def precheck(df):
+    """(body, status) when the review can be answered without the LLM, else None."""
     experience = df.get("Experience")
     skills     = df.get("skill")
     ability    = df.get("ability")
     program    = df.get("program")
 
     if not all([experience, skills, ability, program]):
-        return make_response(jsonify(error="Missing required parameters"), 400)
+        return {"error": "Missing required parameters"}, 400
 
     # Check if API key is available
-    if not OPENROUTER_API_KEY or OPENROUTER_API_KEY == "your_openrouter_api_key_here":
+    if not review_client.configured:
         # Return a basic review without AI
-        basic_review = {
-            "strengths": [
-                f"Strong technical background with {experience}",
-                f"Proficient in {skills}",
-                f"Demonstrates {ability}",
-                f"Educational background: {program}"
-            ],
-            "weaknesses": [
-                "Consider adding more specific project achievements",
-                "Could benefit from more detailed metrics and KPIs"
-            ],
-            "suggestions": [
-                "Add quantifiable achievements to your experience",
-                "Include specific project outcomes and impact",
-                "Consider adding certifications relevant to your field",
-                "Highlight leadership and collaboration experiences"
-            ]
-        }
-        return make_response(jsonify(review=basic_review), 200)
-
-    # Prompt format
-    prompt = (
-        f"Based on the following resume profile, write a professional technical CV review.\n\n"
-        f"Experiences: {experience}\n"
-        f"Skills: {skills}\n"
-        f"Abilities: {ability}\n"
-        f"Education: {program}\n\n"
-        f"Return response as valid JSON formatted markdown with fields: strengths, weaknesses, and suggestions."
-    )
-
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-        "HTTP-Referer": "http://localhost",
-        "X-Title": "CVReviewApp"
-    }
+        return {"review": basic_review(df)}, 200
+    return None
+
+
+def degraded_review(df):
+    """(body, status) when the LLM missed REVIEW_DEADLINE: the basic review, marked as such."""
+    return {"review": basic_review(df), "degraded": True}, 200
 
-    body = {
-        "model": OPENROUTER_MODEL,
-        "messages": [
-            {"role": "user", "content": prompt}
+
+def basic_review(df):
+    """Template review of a profile, for when the LLM is not configured or too slow."""
+    experience = df.get("Experience")
+    skills     = df.get("skill")
+    ability    = df.get("ability")
+    program    = df.get("program")
+    return {
+        "strengths": [
+            f"Strong technical background with {experience}",
+            f"Proficient in {skills}",
+            f"Demonstrates {ability}",
+            f"Educational background: {program}"
+        ],
+        "weaknesses": [
+            "Consider adding more specific project achievements",
+            "Could benefit from more detailed metrics and KPIs"
+        ],
+        "suggestions": [
+            "Add quantifiable achievements to your experience",
+            "Include specific project outcomes and impact",
+            "Consider adding certifications relevant to your field",
+            "Highlight leadership and collaboration experiences"
         ]
     }
 
-    try:
-        response = requests.post(OPENROUTER_ENDPOINT, headers=headers, json=body)
-        response.raise_for_status()
-        result_text = response.json()["choices"][0]["message"]["content"]
-
-        # Strip code blocks and markdown artifacts
-        cleaned = re.sub(r"^(```json|```)", "", result_text.strip(), flags=re.IGNORECASE)
-        cleaned = re.sub(r"```$", "", cleaned.strip())
-
-        # Remove markdown formatting like **bold** or _italic_
-        cleaned = re.sub(r"\*\*(.*?)\*\*", r"\1", cleaned)
-        cleaned = re.sub(r"\*(.*?)\*", r"\1", cleaned)
-        cleaned = re.sub(r"_(.*?)_", r"\1", cleaned)
-
-
-        # Try parsing cleaned JSON
-        try:
-            parsed = json.loads(cleaned)
-        except json.JSONDecodeError:
-            # Try one more time with alternate wrapper stripper
-            cleaned = strip_json_wrappers(result_text)
-            parsed = json.loads(cleaned)
-
-        return make_response(jsonify(review=parsed), 200)
-
-    except requests.exceptions.RequestException as e:
-        return make_response(jsonify(error=f"HTTP request failed: {e}"), 502)
-    except json.JSONDecodeError:
-        return make_response(jsonify(error="Model responded with invalid JSON", raw=result_text), 500)
-    except Exception as e:
-        return make_response(jsonify(error=f"Review process failed: {e}"), 500)
\ No newline at end of file
+
+def review_error(e):
+    if isinstance(e, httpx.HTTPError):
+        return {"error": f"HTTP request failed: {e}"}, 502
+    if isinstance(e, ReviewResponseError):
+        return {"error": "Model responded with invalid JSON", "raw": e.raw}, 500
+    return {"error": f"Review process failed: {e}"}, 500
@@ -0,0 +1,205 @@
+"""Resource-limited PDF parsing.
+
+pdfplumber keeps the parsed objects of every page it reads, so a single
+pathological upload (huge content streams, thousands of text objects) can
+take a worker's memory, and every request it serves, down with it. Pages are
+closed as soon as their text is read, and the text layer is parsed in a fresh
+child of the multiprocessing forkserver (unless PDF_GUARD=0), under:
+
+    RLIMIT_AS   PDF_GUARD_MEMORY_MB of address space on top of the child's own
+    RLIMIT_CPU  PDF_GUARD_CPU_SECONDS of CPU time
+    a wall-clock PDF_GUARD_TIMEOUT, after which the child is killed
+
+A document that runs into a limit is answered with 413 (memory) or 422 (time)
+and the worker carries on. One child per document makes its peak RSS the
+document's own; it is logged and exported as pathfinder_pdf_peak_mib. A
+document parsed in-process (PDF_GUARD=0, or inside a daemonic process that
+may not start children) logs the worker's RSS sampled while each page is
+held and its growth over the RSS before the document, exported with
+mode="in_process". Under `python main.py` every child re-imports the app
+(about 2 s per PDF), so run the development server with PDF_GUARD=0. Scans
+are not parsed here: OCR already renders one page at a time in its own
+process pool (see ocr.py), at a DPI capped by PDF_MAX_PAGE_PIXELS.
+"""
+import io
+import multiprocessing
+import os
+import resource
+import signal
+import time
+from pathlib import Path
+
+import psutil
+
+from etl_pipeline.metrics import counter, histogram
+
+PDF_GUARD = os.getenv("PDF_GUARD", "1") == "1"
+PDF_GUARD_MEMORY_MB = int(os.getenv("PDF_GUARD_MEMORY_MB", "512"))
+PDF_GUARD_CPU_SECONDS = int(os.getenv("PDF_GUARD_CPU_SECONDS", "20"))
+PDF_GUARD_TIMEOUT = float(os.getenv("PDF_GUARD_TIMEOUT", "30"))
+
+PDF_PEAK_MIB = histogram("pathfinder_pdf_peak_mib", "Peak RSS while parsing a PDF (guarded child or worker), MiB",
+                         ["mode"], buckets=(32, 64, 128, 256, 512, 1024, 2048, float("inf")))
+GUARD_REJECTIONS = counter("pathfinder_pdf_guard_rejections_total", "PDFs stopped by a parsing limit", ["reason"])
+
+_preloaded = False
+
+
+class ParseLimitExceeded(RuntimeError):
+    """A PDF ran into a guarded parsing limit; status is the HTTP status to answer with."""
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+
+def peak_rss_mib():
+    """Peak resident set size of the current process in MiB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def rss_mib():
+    """Current resident set size of this process in MiB."""
+    return psutil.Process().memory_info().rss / 2**20
+
+
+def address_space_bytes():
+    """Current virtual memory size of this process (0 where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * resource.getpagesize()
+    except OSError:
+        return 0
+
+
+def limit_resources(memory_mb=PDF_GUARD_MEMORY_MB, cpu_seconds=0):
+    """Cap this process (and what it execs) at memory_mb more address space and cpu_seconds of CPU; 0 leaves a limit off."""
+    if memory_mb > 0:
+        limit = address_space_bytes() + memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if cpu_seconds > 0:
+        # SIGXCPU at the soft limit; the hard limit is only a backstop
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 5))
+
+
+def plumber_text(source, max_chars):
+    """(text, pages read, peak RSS MiB sampled while a page is held) of a PDF path or stream, stopping once max_chars have been extracted."""
+    import pdfplumber
+
+    text_blocks, length, pages, peak_mib = [], 0, 0, rss_mib()
+    with pdfplumber.open(source) as pdf:
+        for page in pdf.pages:
+            extracted = page.extract_text()
+            peak_mib = max(peak_mib, rss_mib())
+            # Drop the page's parsed objects before the next page is read
+            page.close()
+            pages += 1
+            if extracted:
+                text_blocks.append(extracted)
+                length += len(extracted)
+            if length >= max_chars:
+                break
+    return "\n".join(text_blocks), pages, peak_mib
+
+
+def _parse_child(conn, source, max_chars, memory_mb, cpu_seconds):
+    limit_resources(memory_mb, cpu_seconds)
+    try:
+        if isinstance(source, bytes):
+            source = io.BytesIO(source)
+        text, pages, _ = plumber_text(source, max_chars)
+        outcome = ("ok", text, pages)
+    except MemoryError:
+        outcome = ("memory", None, 0)
+    except Exception as e:
+        outcome = ("error", f"{type(e).__name__}: {e}", 0)
+    try:
+        conn.send(outcome + (peak_rss_mib(),))
+    finally:
+        conn.close()
+
+
+def _context():
+    global _preloaded
+    context = multiprocessing.get_context("forkserver")
+    if not _preloaded:
+        # Children fork from a server that has already imported pdfplumber (no effect if it is running already).
+        # Each child still re-runs the entry script as __mp_main__: cheap under gunicorn/uvicorn, whose
+        # launcher is small, but `python main.py` re-imports the whole app per document
+        context.set_forkserver_preload(["pdfplumber", "etl_pipeline.guard"])
+        _preloaded = True
+    return context
+
+
+def guarded_text(source, max_chars, memory_mb=None, cpu_seconds=None, timeout=None):
+    """plumber_text() in a resource-limited child process; raises ParseLimitExceeded past a limit."""
+    memory_mb = memory_mb or PDF_GUARD_MEMORY_MB
+    cpu_seconds = cpu_seconds or PDF_GUARD_CPU_SECONDS
+    timeout = timeout or PDF_GUARD_TIMEOUT
+    context = _context()
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_parse_child, args=(sender, source, max_chars, memory_mb, cpu_seconds),
+                              name="pdf-guard", daemon=True)
+    start = time.perf_counter()
+    process.start()
+    sender.close()
+    outcome, timed_out = None, False
+    try:
+        if receiver.poll(timeout):
+            outcome = receiver.recv()
+        else:
+            timed_out = True
+    except EOFError:
+        pass  # The child died before it could report
+    finally:
+        receiver.close()
+        process.join(0 if timed_out else 5)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+    if outcome is None:
+        if timed_out:
+            GUARD_REJECTIONS.inc(reason="timeout")
+            raise ParseLimitExceeded(f"PDF could not be parsed within {timeout:g}s.", 422)
+        if process.exitcode == -signal.SIGXCPU:
+            GUARD_REJECTIONS.inc(reason="cpu")
+            raise ParseLimitExceeded(f"PDF could not be parsed within {cpu_seconds}s of CPU time.", 422)
+        if process.exitcode is not None and process.exitcode > 0:
+            raise RuntimeError(f"PDF parsing process exited with code {process.exitcode}")
+        # Killed by a signal without a word: native code hitting the address-space cap
+        GUARD_REJECTIONS.inc(reason="memory")
+        raise ParseLimitExceeded(f"PDF needs more than {memory_mb} MB of memory to parse.", 413)
+
+    status, text, pages, peak_mib = outcome
+    PDF_PEAK_MIB.observe(peak_mib, mode="guarded")
+    print(f"✅ Parsed PDF: {pages} pages in {time.perf_counter() - start:.2f}s, peak RSS {peak_mib:.0f} MiB")
+    if status == "memory":
+        GUARD_REJECTIONS.inc(reason="memory")
+        raise ParseLimitExceeded(f"PDF needs more than {memory_mb} MB of memory to parse.", 413)
+    if status == "error":
+        raise RuntimeError(text)
+    return text
+
+
+def in_process_text(source, max_chars):
+    """plumber_text() in this process, logging the RSS it peaked at and how much the document added."""
+    start, before_mib = time.perf_counter(), rss_mib()
+    text, pages, peak_mib = plumber_text(source, max_chars)
+    PDF_PEAK_MIB.observe(peak_mib, mode="in_process")
+    print(f"✅ Parsed PDF in-process: {pages} pages in {time.perf_counter() - start:.2f}s, "
+          f"peak RSS {peak_mib:.0f} MiB (+{max(0.0, peak_mib - before_mib):.0f} MiB)")
+    return text
+
+
+def parse_text(pdf_source, max_chars):
+    """Text of a PDF path or stream: in a guarded child unless PDF_GUARD=0, in this process otherwise."""
+    # Daemonic processes (e.g. the ASGI extract process pool) may not start children; they parse in-process
+    if not PDF_GUARD or multiprocessing.current_process().daemon:
+        return in_process_text(pdf_source, max_chars)
+    if isinstance(pdf_source, (str, Path)):
+        return guarded_text(str(pdf_source), max_chars)
+    pdf_source.seek(0)
+    data = pdf_source.read()
+    pdf_source.seek(0)
+    return guarded_text(data, max_chars)
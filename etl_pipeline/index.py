@@ -0,0 +1,270 @@
+"""Nearest-neighbour indexes over the L2-normalised TF-IDF job reference matrix.
+
+Build an approximate index offline (run from the repository root):
+
+    python -m etl_pipeline.index build --backend ivf --n-lists 256
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import joblib
+from scipy import sparse
+from sklearn.preprocessing import normalize
+from sklearn.utils.extmath import row_norms
+
+# Upper bound on dense similarity cells materialised at once (batch rows x catalogue rows)
+MAX_SCORE_CELLS = 32_000_000
+
+
+def top_n_matches(scores, top_n=3):
+    """Pick the top N columns per row with argpartition, sorted by descending score."""
+    n_rows, n_cols = scores.shape
+    k = min(top_n, n_cols)
+    if k < n_cols:
+        candidates = np.argpartition(scores, n_cols - k, axis=1)[:, n_cols - k:]
+    else:
+        candidates = np.broadcast_to(np.arange(n_cols), (n_rows, n_cols))
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    return (
+        np.take_along_axis(candidates, order, axis=1),
+        np.take_along_axis(candidate_scores, order, axis=1),
+    )
+
+
+def unit_rows(matrix):
+    """L2-normalise rows, reusing the (possibly memory-mapped) matrix when it already is."""
+    matrix = sparse.csr_matrix(matrix)
+    norms = row_norms(matrix)
+    if np.allclose(norms[norms > 0], 1.0, atol=1e-6):
+        return matrix
+    return normalize(matrix)
+
+
+class ExactIndex:
+    """Brute-force cosine search over every reference row."""
+
+    backend = "exact"
+
+    def __init__(self, matrix):
+        self.matrix = unit_rows(matrix)
+
+    @property
+    def size(self):
+        return self.matrix.shape[0]
+
+    def search(self, queries, top_n=3):
+        """Return (indices, scores) of the top N rows for each query row."""
+        queries = normalize(sparse.csr_matrix(queries))
+        chunk = max(1, MAX_SCORE_CELLS // max(1, self.size))
+
+        indices, scores = [], []
+        for start in range(0, queries.shape[0], chunk):
+            # Queries are densified (batch x vocabulary is small) so the product is one sparse-dense kernel
+            sims = (self.matrix @ queries[start:start + chunk].toarray().T).T
+            idx, sc = top_n_matches(sims, top_n)
+            indices.append(idx)
+            scores.append(sc)
+
+        if not indices:
+            k = min(top_n, self.size)
+            return np.empty((0, k), dtype=np.intp), np.empty((0, k))
+        return np.vstack(indices), np.vstack(scores)
+
+    def score_rows(self, queries, rows):
+        """Cosine similarity of each query row to the given reference rows only."""
+        queries = normalize(sparse.csr_matrix(queries))
+        return (self.matrix[rows] @ queries.toarray().T).T
+
+    def vectors(self, rows):
+        """L2-normalised CSR vectors of the given reference rows."""
+        return self.matrix[rows]
+
+    def state(self):
+        return {"backend": self.backend}
+
+
+class IVFIndex:
+    """Inverted-file index: spherical k-means lists, only the closest n_probe lists are scored."""
+
+    backend = "ivf"
+
+    def __init__(self, matrix, centroids, assignments, n_probe=8):
+        self.n_probe = n_probe
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.assignments = np.asarray(assignments, dtype=np.int32)
+
+        # The (possibly memory-mapped) matrix is kept as is; a list's rows are order[offsets[l]:offsets[l + 1]]
+        self.order = np.argsort(self.assignments, kind="stable")
+        counts = np.bincount(self.assignments, minlength=len(self.centroids))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        self.matrix = unit_rows(matrix)
+
+    @property
+    def size(self):
+        return self.matrix.shape[0]
+
+    @classmethod
+    def build(cls, matrix, n_lists=256, n_iter=10, sample_size=50_000, n_probe=8, seed=0):
+        """Train spherical k-means centroids on a sample and assign every row to a list."""
+        matrix = normalize(sparse.csr_matrix(matrix))
+        rng = np.random.default_rng(seed)
+        n_lists = max(1, min(n_lists, matrix.shape[0]))
+
+        sample = matrix
+        if matrix.shape[0] > sample_size:
+            sample = matrix[np.sort(rng.choice(matrix.shape[0], sample_size, replace=False))]
+
+        centroids = sample[rng.choice(sample.shape[0], n_lists, replace=False)].toarray()
+        for _ in range(n_iter):
+            labels = _nearest_centroid(sample, centroids)
+            members = sparse.csr_matrix(
+                (np.ones(len(labels)), (labels, np.arange(len(labels)))),
+                shape=(n_lists, sample.shape[0]),
+            )
+            sums = np.asarray((members @ sample).todense())
+            empty = np.flatnonzero(np.bincount(labels, minlength=n_lists) == 0)
+            if len(empty):
+                sums[empty] = sample[rng.choice(sample.shape[0], len(empty), replace=False)].toarray()
+            centroids = normalize(sums)
+
+        return cls(matrix, centroids, _nearest_centroid(matrix, centroids), n_probe=n_probe)
+
+    def search(self, queries, top_n=3):
+        """Return (indices, scores) of the approximate top N rows for each query row."""
+        queries = normalize(sparse.csr_matrix(queries)).toarray()
+        k = min(top_n, self.size)
+        n_probe = min(self.n_probe, len(self.centroids))
+
+        probes = top_n_matches(queries @ self.centroids.T, n_probe)[0]
+        indices = np.zeros((len(queries), k), dtype=np.intp)
+        scores = np.zeros((len(queries), k))
+        widths = np.diff(self.offsets)[probes].sum(axis=1)
+
+        # Too few candidates in the probed lists: fall back to scanning everything
+        scan = np.flatnonzero(widths < k)
+        if len(scan):
+            indices[scan], scores[scan] = top_n_matches((self.matrix @ queries[scan].T).T, k)
+
+        probing = np.flatnonzero(widths >= k)
+        chunk = max(1, MAX_SCORE_CELLS // max(1, widths.max(initial=0)))
+        for start in range(0, len(probing), chunk):
+            batch = probing[start:start + chunk]
+            indices[batch], scores[batch] = self._search_lists(queries[batch], probes[batch], k)
+        return indices, scores
+
+    def _search_lists(self, queries, probes, k):
+        """Top N over each query's probed lists; a list is scored once for all the queries probing it."""
+        # Each query's candidates fill one buffer row, its probed lists laid out one after another
+        counts = np.diff(self.offsets)[probes]
+        columns = (np.cumsum(counts, axis=1) - counts).ravel()
+        sims = np.full((len(queries), counts.sum(axis=1).max()), -np.inf)
+        rows = np.zeros(sims.shape, dtype=np.intp)
+
+        owners = np.repeat(np.arange(len(queries)), probes.shape[1])
+        by_list = np.argsort(probes.ravel(), kind="stable")
+        lists, firsts = np.unique(probes.ravel()[by_list], return_index=True)
+        for l, pairs in zip(lists, np.split(by_list, firsts[1:])):
+            list_rows = self.order[self.offsets[l]:self.offsets[l + 1]]
+            members = owners[pairs][:, np.newaxis]
+            cells = columns[pairs][:, np.newaxis] + np.arange(len(list_rows))
+            sims[members, cells] = (self.matrix[list_rows] @ queries[owners[pairs]].T).T
+            rows[members, cells] = list_rows
+
+        order, top = top_n_matches(sims, k)
+        return np.take_along_axis(rows, order, axis=1), top
+
+    def score_rows(self, queries, rows):
+        """Cosine similarity of each query row to the given reference rows only."""
+        queries = normalize(sparse.csr_matrix(queries))
+        return (self.matrix[rows] @ queries.toarray().T).T
+
+    def vectors(self, rows):
+        """L2-normalised CSR vectors of the given reference rows."""
+        return self.matrix[rows]
+
+    def state(self):
+        return {
+            "backend": self.backend,
+            "centroids": self.centroids,
+            "assignments": self.assignments,
+            "n_probe": self.n_probe,
+        }
+
+
+INDEX_BACKENDS = {
+    ExactIndex.backend: ExactIndex,
+    IVFIndex.backend: IVFIndex,
+}
+
+
+def _nearest_centroid(matrix, centroids, chunk=20_000):
+    """Assign each row to its most similar centroid, chunked to bound memory."""
+    labels = np.empty(matrix.shape[0], dtype=np.int32)
+    for start in range(0, matrix.shape[0], chunk):
+        labels[start:start + chunk] = np.asarray(matrix[start:start + chunk] @ centroids.T).argmax(axis=1)
+    return labels
+
+
+def build_index(matrix, backend="exact", **params):
+    """Build an index of the given backend over the reference matrix."""
+    if backend not in INDEX_BACKENDS:
+        raise ValueError(f"Unknown index backend: {backend}")
+    if backend == ExactIndex.backend:
+        return ExactIndex(matrix)
+    return INDEX_BACKENDS[backend].build(matrix, **params)
+
+
+def save_index(index, path):
+    """Persist the index structure; the reference matrix itself is not duplicated."""
+    state = index.state()
+    state["n_rows"] = index.size
+    joblib.dump(state, path)
+
+
+def load_index(path, matrix, n_probe=None):
+    """Load a persisted index and attach it to the reference matrix it was built from."""
+    state = joblib.load(path)
+    if state["n_rows"] != matrix.shape[0]:
+        raise ValueError(
+            f"Index at {path} was built for {state['n_rows']} rows, reference matrix has {matrix.shape[0]}"
+        )
+    if state["backend"] == ExactIndex.backend:
+        return ExactIndex(matrix)
+    return IVFIndex(
+        matrix,
+        state["centroids"],
+        state["assignments"],
+        n_probe=n_probe or state["n_probe"],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the job reference nearest-neighbour index.")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--backend", default="ivf", choices=sorted(INDEX_BACKENDS))
+    parser.add_argument("--reference-csv", default="./dataset/job_reference_data.csv")
+    parser.add_argument("--vectorizer", default="./models/tfidf_vectorizer.joblib")
+    parser.add_argument("--output", default="./models/job_index.joblib")
+    parser.add_argument("--n-lists", type=int, default=256)
+    parser.add_argument("--n-probe", type=int, default=8)
+    parser.add_argument("--n-iter", type=int, default=10)
+    args = parser.parse_args()
+
+    vectorizer = joblib.load(args.vectorizer)
+    df_ready = pd.read_csv(args.reference_csv)
+    matrix = vectorizer.transform(df_ready["combined_text"].fillna(""))
+
+    start = time.perf_counter()
+    params = {}
+    if args.backend == IVFIndex.backend:
+        params = {"n_lists": args.n_lists, "n_probe": args.n_probe, "n_iter": args.n_iter}
+    index = build_index(matrix, args.backend, **params)
+    save_index(index, args.output)
+    print(f"✅ Built {args.backend} index over {index.size} rows in {time.perf_counter() - start:.1f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+"""Asynchronous jobs for slow requests: OCR'd scans and LLM reviews.
+
+`/process-resume?async=1` and `/review?async=1` queue their work and answer
+202 with a job id straight away. By default each gunicorn worker runs the
+jobs it accepted on its own pool of lane threads, so one slow scan or LLM call
+never holds a request thread, but still shares the worker's CPU and memory.
+With JOB_RUNNER=external the web workers only write jobs (their function and
+arguments pickled) to the sqlite store, and a separate process claims and runs
+them on the same lanes:
+
+    JOB_RUNNER=external python -m etl_pipeline.jobs worker
+
+There is one lane per kind of work:
+
+    fast  text-layer PDFs, seconds at most
+    ocr   scanned PDFs that go through OCR
+    llm   CV reviews waiting on the model
+
+Every lane has its own concurrency cap and a bounded queue. When a lane's
+queue is full, submit() raises QueueFull and the API answers 503 with
+Retry-After. Job state lives in a sqlite file (JOBS_DB), so any worker can
+answer GET /jobs/<id>. A callback URL, when given, is POSTed the finished job,
+as GET /jobs/<id> shows it. Callback hosts must be listed in JOB_CALLBACK_HOSTS
+when that is set; otherwise every address the host resolves to must be public,
+so callbacks can't reach loopback, private networks or metadata endpoints.
+"""
+import argparse
+import ipaddress
+import json
+import os
+import pickle
+import queue
+import socket
+import sqlite3
+import threading
+import time
+import urllib.parse
+import uuid
+
+import httpx
+
+from etl_pipeline import metrics
+from etl_pipeline.metrics import counter, gauge, histogram
+
+JOBS_DB = os.getenv("JOBS_DB", "./dataset/jobs.db")
+JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", "64"))
+JOB_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS", "3600"))
+JOB_CALLBACK_TIMEOUT = float(os.getenv("JOB_CALLBACK_TIMEOUT", "10"))
+JOB_CALLBACK_RETRIES = 3
+# "threads": lane threads in every web worker; "external": a `python -m etl_pipeline.jobs worker` process
+JOB_RUNNER = os.getenv("JOB_RUNNER", "threads").lower()
+# Seconds an idle lane of the external worker waits before looking for new jobs again
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "0.5"))
+# Hosts callbacks may go to (comma-separated); when empty, any host resolving only to public addresses
+JOB_CALLBACK_HOSTS = frozenset(h.strip().lower() for h in os.getenv("JOB_CALLBACK_HOSTS", "").split(",") if h.strip())
+
+# Threads per lane in each worker process (or in the external job worker)
+LANES = {
+    "fast": int(os.getenv("JOB_FAST_CONCURRENCY", "4")),
+    "ocr": int(os.getenv("JOB_OCR_CONCURRENCY", "1")),
+    "llm": int(os.getenv("JOB_LLM_CONCURRENCY", "8")),
+}
+
+JOBS = counter("pathfinder_jobs_total", "Async jobs by lane and final status", ["lane", "status"])
+JOBS_QUEUED = gauge("pathfinder_jobs_queued", "Async jobs waiting for a lane thread", ["lane"])
+JOB_WAIT_SECONDS = histogram("pathfinder_job_wait_seconds", "Time async jobs spent queued", ["lane"])
+
+FIELDS = ("job_id", "kind", "lane", "status", "http_status", "result", "error", "callback_url", "pid",
+          "created_at", "started_at", "finished_at")
+# Internal fields GET /jobs/<id> and callbacks leave out
+PRIVATE_FIELDS = ("pid",)
+
+
+class QueueFull(RuntimeError):
+    """A lane's queue is at JOB_QUEUE_LIMIT; retry later."""
+
+    def __init__(self, lane, retry_after=5):
+        super().__init__(f"The {lane} job queue is full, retry later")
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class CallbackRejected(ValueError):
+    """A callback_url the server will not POST to."""
+
+
+def check_callback_url(url, allowed_hosts=None):
+    """Raise CallbackRejected unless url is http(s) to an allowed host, or to one with only public addresses."""
+    allowed_hosts = JOB_CALLBACK_HOSTS if allowed_hosts is None else allowed_hosts
+    try:
+        parts = urllib.parse.urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+    except ValueError:
+        raise CallbackRejected("callback_url is not a valid URL")
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise CallbackRejected("callback_url must be an http(s) URL")
+    host = parts.hostname.lower()
+    if allowed_hosts:
+        if host not in allowed_hosts:
+            raise CallbackRejected(f"callback_url host {host} is not an allowed callback host")
+        return
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError):
+        raise CallbackRejected(f"callback_url host {host} does not resolve")
+    for address in addresses:
+        # Scoped IPv6 addresses ("fe80::1%eth0") carry their interface after the %
+        if not ipaddress.ip_address(address.split("%")[0]).is_global:
+            raise CallbackRejected(f"callback_url host {host} resolves to a non-public address")
+
+
+def public_job(job):
+    """A job as clients see it: without the worker pid."""
+    return {name: value for name, value in job.items() if name not in PRIVATE_FIELDS}
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+class JobStore:
+    """Job status and results, shared by the workers through sqlite."""
+
+    def __init__(self, path=JOBS_DB):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, kind TEXT NOT NULL, lane TEXT NOT NULL, status TEXT NOT NULL, "
+            "http_status INTEGER, result TEXT, error TEXT, callback_url TEXT, pid INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at)")
+        # Pickled (fn, args) of jobs left to the external worker; stores created before it get the column here
+        if "payload" not in {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}:
+            try:
+                self._db.execute("ALTER TABLE jobs ADD COLUMN payload BLOB")
+            except sqlite3.OperationalError:
+                pass  # another worker added it first
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_lane_status ON jobs (lane, status, created_at)")
+        self._lock = threading.Lock()
+        self.pid = os.getpid()
+
+    def create(self, kind, lane, callback_url=None, payload=None, pid=None):
+        """Insert a queued job; pid 0 marks one no process has claimed yet."""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (job_id, kind, lane, status, callback_url, pid, created_at, payload) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, kind, lane, callback_url, os.getpid() if pid is None else pid, time.time(), payload),
+            )
+        return job_id
+
+    def claim(self, lane, pid):
+        """(job_id, created_at, payload, callback_url) of the oldest unclaimed job of a lane, now running under pid."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT job_id, created_at, payload, callback_url FROM jobs "
+                    "WHERE lane = ? AND status = 'queued' AND payload IS NOT NULL ORDER BY created_at LIMIT 1",
+                    (lane,),
+                ).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE jobs SET status = 'running', pid = ?, started_at = ? WHERE job_id = ?",
+                                     (pid, time.time(), row[0]))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return row
+
+    def queued(self):
+        """Unclaimed external jobs per lane."""
+        with self._lock:
+            return dict(self._db.execute(
+                "SELECT lane, COUNT(*) FROM jobs WHERE status = 'queued' AND payload IS NOT NULL GROUP BY lane"
+            ).fetchall())
+
+    def update(self, job_id, **fields):
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"], ensure_ascii=False)
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def delete(self, job_id):
+        with self._lock:
+            self._db.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def get(self, job_id):
+        """The job as a dict, or None when it is unknown or has expired."""
+        with self._lock:
+            row = self._db.execute(f"SELECT {', '.join(FIELDS)} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(FIELDS, row))
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        # Jobs of a worker that died (restart, OOM kill) will never finish
+        if job["status"] in ("queued", "running") and job["pid"] and not pid_alive(job["pid"]):
+            job.update(status="failed", http_status=500, error="Worker exited before the job finished")
+        return job
+
+    def purge(self, ttl=JOB_TTL_SECONDS):
+        """Forget jobs that finished more than ttl seconds ago."""
+        with self._lock:
+            return self._db.execute("DELETE FROM jobs WHERE finished_at < ?", (time.time() - ttl,)).rowcount
+
+    def counts(self):
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+class JobQueue:
+    """Per-lane bounded queues drained by a capped number of threads in this process, or in the external worker."""
+
+    def __init__(self, store_path=JOBS_DB, lanes=None, queue_limit=JOB_QUEUE_LIMIT, runner=JOB_RUNNER):
+        if runner not in ("threads", "external"):
+            raise ValueError(f"Unknown JOB_RUNNER {runner!r}; use threads or external")
+        self.store_path = store_path
+        self.lanes = dict(lanes or LANES)
+        self.queue_limit = queue_limit
+        self.runner = runner
+        self._lock = threading.Lock()
+        self._pid = None
+        self._store = None
+        self._queues = {}
+        self._last_purge = 0.0
+
+    @property
+    def store(self):
+        self._ensure_started()
+        return self._store
+
+    def _ensure_started(self):
+        """Open the store and start the lane threads on first use (and again after a fork)."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._store = JobStore(self.store_path)
+            self._queues = {}
+            if self.runner == "threads":
+                self._queues = {lane: queue.Queue(maxsize=self.queue_limit) for lane in self.lanes}
+                self._start_lanes(self._run)
+            self._pid = os.getpid()
+
+    def _start_lanes(self, target):
+        for lane, threads in self.lanes.items():
+            for i in range(threads):
+                threading.Thread(target=target, args=(lane,), name=f"jobs-{lane}-{i}", daemon=True).start()
+
+    def submit(self, kind, lane, fn, *args, callback_url=None):
+        """Queue fn(*args) on a lane and return the job id.
+
+        fn returns (JSON-serialisable result, HTTP status); raises QueueFull
+        when the lane is at its queue limit.
+        """
+        if lane not in self.lanes:
+            raise ValueError(f"Unknown job lane {lane!r}; use one of {sorted(self.lanes)}")
+        self._ensure_started()
+        if self.runner == "external":
+            if self._store.queued().get(lane, 0) >= self.queue_limit:
+                JOBS.inc(lane=lane, status="rejected")
+                raise QueueFull(lane)
+            return self._store.create(kind, lane, callback_url, payload=pickle.dumps((fn, args)), pid=0)
+        job_id = self._store.create(kind, lane, callback_url)
+        try:
+            self._queues[lane].put_nowait((job_id, time.time(), fn, args, callback_url))
+        except queue.Full:
+            self._store.delete(job_id)
+            JOBS.inc(lane=lane, status="rejected")
+            raise QueueFull(lane)
+        JOBS_QUEUED.inc(lane=lane)
+        return job_id
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def _run(self, lane):
+        pending = self._queues[lane]
+        while True:
+            job_id, queued_at, fn, args, callback_url = pending.get()
+            JOBS_QUEUED.dec(lane=lane)
+            started = time.time()
+            JOB_WAIT_SECONDS.observe(started - queued_at, lane=lane)
+            self._store.update(job_id, status="running", started_at=started)
+            self._execute(lane, job_id, callback_url, fn, args)
+
+    def _consume(self, lane):
+        """Lane thread of the external worker: claim jobs from the store and run them."""
+        while True:
+            try:
+                claimed = self._store.claim(lane, os.getpid())
+            except sqlite3.Error as e:
+                print(f"⚠️ Claiming a {lane} job failed: {e}")
+                claimed = None
+            if claimed is None:
+                time.sleep(JOB_POLL_SECONDS)
+                continue
+            job_id, queued_at, payload, callback_url = claimed
+            JOB_WAIT_SECONDS.observe(time.time() - queued_at, lane=lane)
+            try:
+                fn, args = pickle.loads(payload)
+            except Exception as e:
+                self._store.update(job_id, status="failed", http_status=500, error=f"Unreadable job: {e}",
+                                   finished_at=time.time(), payload=None)
+                JOBS.inc(lane=lane, status="failed")
+                continue
+            self._execute(lane, job_id, callback_url, fn, args)
+
+    def _execute(self, lane, job_id, callback_url, fn, args):
+        """Run fn(*args), which returns (result, HTTP status), and record the outcome."""
+        try:
+            result, http_status = fn(*args)
+            error = result.get("error") if isinstance(result, dict) and http_status >= 400 else None
+        except Exception as e:
+            result, http_status, error = None, 500, str(e)
+        status = "done" if http_status < 400 else "failed"
+        self._store.update(job_id, status=status, http_status=http_status, result=result, error=error,
+                           finished_at=time.time(), payload=None)
+        JOBS.inc(lane=lane, status=status)
+        if callback_url:
+            self._callback(callback_url, self._store.get(job_id))
+        self._maybe_purge()
+
+    def consume(self):
+        """Run the external job worker: lane threads claiming jobs from the store, until interrupted."""
+        self._store = JobStore(self.store_path)
+        self._pid = os.getpid()
+        self._start_lanes(self._consume)
+        while True:
+            time.sleep(3600)
+
+    def _callback(self, url, job):
+        try:
+            # Checked again: the host may resolve differently by the time the job finishes
+            check_callback_url(url)
+        except CallbackRejected as e:
+            print(f"❌ Not calling back job {job['job_id']}: {e}")
+            return
+        job = public_job(job)
+        for attempt in range(JOB_CALLBACK_RETRIES):
+            try:
+                response = httpx.post(url, json=job, timeout=JOB_CALLBACK_TIMEOUT)
+                if response.status_code < 500:
+                    return
+            except httpx.HTTPError as e:
+                print(f"⚠️ Job callback to {url} failed: {e}")
+            time.sleep(2 ** attempt)
+        print(f"❌ Gave up calling back {url} for job {job['job_id']}")
+
+    def _maybe_purge(self):
+        if time.time() - self._last_purge < 60:
+            return
+        self._last_purge = time.time()
+        try:
+            self._store.purge()
+        except sqlite3.Error as e:
+            print(f"⚠️ Purging expired jobs failed: {e}")
+
+    def stats(self):
+        self._ensure_started()
+        queued = self._store.queued() if self.runner == "external" else {}
+        return {
+            "runner": self.runner,
+            "lanes": {lane: {"threads": threads, "queue_limit": self.queue_limit,
+                             "queued": queued.get(lane, 0) if self.runner == "external" else self._queues[lane].qsize()}
+                      for lane, threads in self.lanes.items()},
+            "jobs": self._store.counts(),
+        }
+
+
+job_queue = JobQueue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run async jobs outside the web workers (JOB_RUNNER=external).")
+    parser.add_argument("command", choices=["worker"])
+    parser.parse_args()
+
+    metrics.start_flusher()
+    print(f"✅ Job worker {os.getpid()} running lanes "
+          f"{', '.join(f'{lane}={threads}' for lane, threads in job_queue.lanes.items())} on {job_queue.store_path}")
+    job_queue.consume()
+
+
+if __name__ == "__main__":
+    main()
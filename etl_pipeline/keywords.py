@@ -0,0 +1,271 @@
+"""Keyword and pattern sets of the section extractors, loaded from an external config.
+
+KEYWORDS_PATH (etl_pipeline/keywords.json by default) is a JSON object with:
+
+    sections                      keyword groups matched against lowercased lines (see SECTION_GROUPS)
+    skill_stopwords               tokens dropped from extracted skills
+    experience_fallback_patterns  regexes tried on the full text when no dated role line is found
+    experience_default            Experience value when neither finds anything
+
+A config is validated before it is used: missing or unknown groups,
+non-lowercase or repeated keywords, break keywords that can never close their
+section and invalid regexes are errors; keywords already matched by a shorter
+keyword of the same group are reported as warnings. It is then compiled once
+into KeywordConfig, whose section matchers are one regex per combination of
+sections. Its version, a hash of the config's content, keys cached extraction
+results, so a reload doesn't serve sections extracted under the old keywords.
+
+A config that fails validation is refused and the current one stays in use.
+Every process polls the file's modification time every KEYWORDS_POLL_SECONDS
+and swaps in the new config when it changes. POST /keywords/reload reloads
+the worker answering it right away, and SIGHUP to the gunicorn master reloads
+it there before the workers are replaced. To check a config and see its
+compile time:
+
+    python -m etl_pipeline.keywords check path/to/keywords.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+KEYWORDS_PATH = os.getenv("KEYWORDS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "keywords.json"))
+KEYWORDS_POLL_SECONDS = float(os.getenv("KEYWORDS_POLL_SECONDS", "5"))
+
+# Keyword groups each extractor needs
+SECTION_GROUPS = {
+    "skill": ("skill_header", "skill_break"),
+    "education": ("education", "education_break"),
+    "experience": ("experience",),
+    "ability": ("ability",),
+}
+SECTIONS = frozenset(SECTION_GROUPS)
+GROUPS = frozenset(group for groups in SECTION_GROUPS.values() for group in groups)
+# Break group -> the group whose block it closes; the opening group is checked first on each line
+BREAK_GROUPS = {"skill_break": "skill_header", "education_break": "education"}
+
+_lock = threading.Lock()
+_config = None
+_rejected_mtime = None
+_watcher_pid = None
+
+
+class KeywordConfigError(ValueError):
+    """A keyword config that failed validation; problems lists every issue found."""
+
+    def __init__(self, path, problems):
+        super().__init__(f"Invalid keyword config {path}: " + "; ".join(problems))
+        self.problems = problems
+
+
+def compile_section_matcher(section_keywords):
+    """Compile every section's keywords into one overlapping-match alternation regex.
+
+    Returns the regex and a map from each keyword to the sections with a
+    keyword occurring inside it, so a single finditer per lowercased line
+    answers "does the line contain any keyword of section X" for all sections.
+    """
+    labels = {}
+    for section, keywords in section_keywords.items():
+        for kw in keywords:
+            labels.setdefault(kw, set()).add(section)
+    closure = {
+        kw: frozenset().union(*(labels[other] for other in labels if other in kw))
+        for kw in labels
+    }
+    alternation = "|".join(re.escape(kw) for kw in sorted(labels, key=len, reverse=True))
+    return re.compile(f"(?=({alternation}))"), closure
+
+
+def _string_list(raw, key, problems):
+    values = raw.get(key, [])
+    if not isinstance(values, list) or not all(isinstance(v, str) and v.strip() for v in values):
+        problems.append(f"'{key}' must be a list of non-empty strings")
+        return []
+    return values
+
+
+def validate(raw):
+    """(errors, warnings) of a parsed keyword config."""
+    errors, warnings = [], []
+    sections = raw.get("sections") if isinstance(raw, dict) else None
+    if not isinstance(sections, dict):
+        return ["'sections' must map keyword groups to lists of keywords"], warnings
+
+    errors += [f"missing keyword group '{group}'" for group in sorted(GROUPS - sections.keys())]
+    errors += [f"unknown keyword group '{group}'" for group in sorted(sections.keys() - GROUPS)]
+    keywords = {}
+    for group in sorted(sections.keys() & GROUPS):
+        values = sections[group]
+        if not isinstance(values, list) or not values or not all(isinstance(v, str) and v.strip() for v in values):
+            errors.append(f"'{group}' must be a non-empty list of non-empty strings")
+            continue
+        seen = set()
+        for kw in values:
+            if kw != kw.lower():
+                # Lines are matched lowercased
+                errors.append(f"'{group}' keyword '{kw}' is not lowercase and would never match")
+            elif kw in seen:
+                errors.append(f"'{group}' lists '{kw}' more than once")
+            seen.add(kw)
+        keywords[group] = seen
+        for kw in sorted(seen):
+            shorter = sorted(other for other in seen if other != kw and other in kw)
+            if shorter:
+                warnings.append(f"'{group}' keyword '{kw}' is redundant, '{shorter[0]}' already matches it")
+
+    for break_group, open_group in BREAK_GROUPS.items():
+        for kw in sorted(keywords.get(break_group, ())):
+            opener = next((other for other in sorted(keywords.get(open_group, ())) if other in kw), None)
+            if opener:
+                errors.append(f"'{break_group}' keyword '{kw}' can never close the section, "
+                              f"'{open_group}' keyword '{opener}' matches the same lines")
+
+    _string_list(raw, "skill_stopwords", errors)
+    for pattern in _string_list(raw, "experience_fallback_patterns", errors):
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            errors.append(f"experience fallback pattern {pattern!r} is invalid: {e}")
+    if not isinstance(raw.get("experience_default", ""), str):
+        errors.append("'experience_default' must be a string")
+    return errors, warnings
+
+
+class KeywordConfig:
+    """A validated keyword config compiled into section matchers and fallback regexes."""
+
+    def __init__(self, raw, path=None, mtime=None):
+        start = time.perf_counter()
+        errors, self.warnings = validate(raw)
+        if errors:
+            raise KeywordConfigError(path, errors)
+        self.path = path
+        self.mtime = mtime
+        self.version = hashlib.sha256(json.dumps(raw, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+        self.groups = {group: tuple(raw["sections"][group]) for group in sorted(GROUPS)}
+        self.skill_stopwords = frozenset(raw.get("skill_stopwords", []))
+        self.fallback_regexes = [re.compile(p, flags=re.IGNORECASE | re.DOTALL)
+                                 for p in raw.get("experience_fallback_patterns", [])]
+        self.experience_default = raw.get("experience_default", "")
+        self._matchers = {}
+        # The full scan's matcher up front; narrower ones are compiled on first use
+        self.matcher(SECTIONS)
+        self.compile_seconds = time.perf_counter() - start
+
+    def matcher(self, sections):
+        """Matcher for the keyword groups of the given sections, compiled once per combination."""
+        sections = frozenset(sections)
+        matcher = self._matchers.get(sections)
+        if matcher is None:
+            groups = {group for section in sections for group in SECTION_GROUPS[section]}
+            matcher = compile_section_matcher({group: self.groups[group] for group in sorted(groups)})
+            matcher = self._matchers.setdefault(sections, matcher)
+        return matcher
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "mtime": self.mtime,
+            "version": self.version,
+            "compile_ms": round(self.compile_seconds * 1000, 3),
+            "keywords": {group: len(keywords) for group, keywords in self.groups.items()},
+            "fallback_patterns": len(self.fallback_regexes),
+            "warnings": self.warnings,
+        }
+
+
+def load(path=None):
+    """Read, validate and compile the keyword config at path (KEYWORDS_PATH by default)."""
+    path = path or KEYWORDS_PATH
+    mtime = os.stat(path).st_mtime_ns
+    try:
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+    except ValueError as e:
+        raise KeywordConfigError(path, [f"not valid JSON: {e}"])
+    config = KeywordConfig(raw, path, mtime)
+    print(f"✅ Compiled keyword config {path}: {sum(config.stats()['keywords'].values())} keywords, "
+          f"{len(config.fallback_regexes)} patterns in {config.compile_seconds * 1000:.2f}ms")
+    for warning in config.warnings:
+        print(f"⚠️ Keyword config: {warning}")
+    return config
+
+
+def current():
+    """The process-wide keyword config, loaded on first use."""
+    global _config
+    if _config is None:
+        with _lock:
+            if _config is None:
+                _config = load()
+    watch()
+    return _config
+
+
+def reload(path=None):
+    """Load the config again and swap it in; on KeywordConfigError the current config stays."""
+    global _config, _rejected_mtime
+    with _lock:
+        try:
+            _config = load(path)
+        except KeywordConfigError:
+            _rejected_mtime = os.stat(path or KEYWORDS_PATH).st_mtime_ns
+            raise
+    return _config
+
+
+def refresh():
+    """Reload when the config file changed since it was loaded (or last refused)."""
+    config = _config
+    mtime = os.stat(KEYWORDS_PATH).st_mtime_ns
+    if config is not None and mtime not in (config.mtime, _rejected_mtime):
+        try:
+            reload()
+        except KeywordConfigError as e:
+            print(f"❌ {e}; keeping the current keyword config")
+
+
+def _watch_loop():
+    while True:
+        time.sleep(KEYWORDS_POLL_SECONDS)
+        try:
+            refresh()
+        except Exception as e:
+            print(f"❌ Keyword config refresh failed: {e}")
+
+
+def watch():
+    """Start this process's keyword config poller (again after a fork)."""
+    global _watcher_pid
+    if _watcher_pid == os.getpid() or KEYWORDS_POLL_SECONDS <= 0:
+        return
+    with _lock:
+        if _watcher_pid != os.getpid():
+            _watcher_pid = os.getpid()
+            threading.Thread(target=_watch_loop, name="keywords-watcher", daemon=True).start()
+
+
+def stats():
+    """Path, compile time, group sizes and warnings of this process's keyword config."""
+    return current().stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate and compile a resume keyword config.")
+    parser.add_argument("command", choices=["check"])
+    parser.add_argument("path", nargs="?", default=KEYWORDS_PATH)
+    args = parser.parse_args()
+    try:
+        load(args.path)
+    except KeywordConfigError as e:
+        for problem in e.problems:
+            print(f"❌ {problem}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
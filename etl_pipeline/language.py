@@ -0,0 +1,98 @@
+"""Fast, deterministic check that a resume is written in English.
+
+Counts how many words of a bounded text sample are common function words of
+English and of the Latin-script languages resumes are most often confused
+with. Text in other scripts is rejected by its share of non-Latin letters.
+Only samples with too few function words to tell (e.g. bare skill lists) go
+to langdetect, seeded so the same text always gets the same answer.
+"""
+import re
+import threading
+
+from langdetect import DetectorFactory, detect
+
+DetectorFactory.seed = 0
+# langdetect loads its language profiles on first use without a lock; concurrent first calls see them half-loaded
+_langdetect_lock = threading.Lock()
+
+# Minimum function words in a sample before the word counts are trusted
+MIN_EVIDENCE = 8
+
+WORD_REGEX = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+FUNCTION_WORDS = {
+    "en": frozenset("""
+        the and of to in for with on at by from as an a is are was were be been has have had i my me we our
+        this that these those it its or but not all also which who will can into over under about using
+        used through within years year team work worked working responsible including various other more
+    """.split()),
+    "es": frozenset("""
+        el la los las de del y en con por para un una es son fue como al lo su sus que se más años mi
+        trabajo experiencia desarrollo gestión empresa equipo entre sobre también
+    """.split()),
+    "pt": frozenset("""
+        o os as de do da dos das e em com por para um uma é são foi como ao no na nos nas seu sua que se
+        mais anos meu minha trabalho experiência desenvolvimento gestão empresa equipe também
+    """.split()),
+    "fr": frozenset("""
+        le la les de du des et en avec pour par un une est sont été comme au aux dans sur que qui se
+        plus ans mon ma mes travail expérience développement gestion entreprise équipe aussi
+    """.split()),
+    "it": frozenset("""
+        il lo la gli le di del della dei e in con per un una è sono stato come al nel nella che si più
+        anni mio mia lavoro esperienza sviluppo gestione azienda squadra anche
+    """.split()),
+    "de": frozenset("""
+        der die das den dem des und in mit für von zu ein eine ist sind war als auf im bei aus nach über
+        auch sich ich mein meine jahre arbeit erfahrung entwicklung unternehmen
+    """.split()),
+    "nl": frozenset("""
+        de het een en van in met voor op door is zijn was als aan bij uit naar over ook ik mijn jaar
+        werk ervaring ontwikkeling bedrijf
+    """.split()),
+    "id": frozenset("""
+        dan yang di ke dari untuk dengan pada dalam adalah sebagai oleh ini itu atau juga saya tahun
+        pengalaman kerja bekerja pengembangan perusahaan tim sistem mahasiswa universitas
+    """.split()),
+}
+
+# word -> languages it is a function word of
+WORD_LANGUAGES = {}
+for _lang, _words in FUNCTION_WORDS.items():
+    for _word in _words:
+        WORD_LANGUAGES.setdefault(_word, []).append(_lang)
+
+
+def script_share(sample):
+    """Share of letters in sample that are not Latin (ASCII or Latin-1/Extended-A accents)."""
+    letters = [ch for ch in sample if ch.isalpha()]
+    if not letters:
+        return 0.0
+    return sum(1 for ch in letters if ord(ch) > 0x24F) / len(letters)
+
+
+def guess_language(sample):
+    """(language code, method) for a text sample; method is "script", "words" or "langdetect"."""
+    if script_share(sample) > 0.3:
+        return "other", "script"
+
+    counts = dict.fromkeys(FUNCTION_WORDS, 0)
+    for word in WORD_REGEX.findall(sample.lower()):
+        for lang in WORD_LANGUAGES.get(word, ()):
+            counts[lang] += 1
+    best = max(counts, key=counts.get)
+    # English needs a clear lead: short words like "a", "in" and "de" are shared across languages
+    if counts[best] >= MIN_EVIDENCE and (best != "en" or counts["en"] >= 1.5 * max(
+            count for lang, count in counts.items() if lang != "en")):
+        return best, "words"
+
+    try:
+        with _langdetect_lock:
+            return detect(sample), "langdetect"
+    except Exception:
+        # langdetect finds no features in e.g. symbol-only text; there is nothing to reject on
+        return "en", "langdetect"
+
+
+def is_english(sample):
+    return guess_language(sample)[0] == "en"
@@ -0,0 +1,308 @@
+"""In-process metrics with Prometheus text exposition, per-request traces and sampled profiling.
+
+Hot paths wrap their work in `with stage("pdfplumber"):`, which costs a
+couple of perf_counter calls and one locked bucket increment. When a request
+opted into tracing, the same timings are collected for its Server-Timing
+header. Each gunicorn worker keeps its own metrics; with METRICS_DIR set
+they are also written there so /metrics on any worker reports the sum over
+all of them.
+"""
+import bisect
+import cProfile
+import glob
+import json
+import math
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+METRICS_DIR = os.getenv("METRICS_DIR") or None
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/pathfinder-profiles")
+
+# Latency buckets in seconds, from sub-millisecond extractors up to OCR/LLM calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, math.inf)
+
+_metrics = {}
+_registry_lock = threading.Lock()
+_trace = ContextVar("trace", default=None)
+_flusher_pid = None
+
+
+def _label_key(label_names, labels):
+    return tuple(str(labels.get(name, "")) for name in label_names)
+
+
+def _format_labels(label_names, key, extra=""):
+    pairs = [f'{name}="{value}"' for name, value in zip(label_names, key)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return {json.dumps(key): value for key, value in self.values.items()}
+
+    @staticmethod
+    def merge(total, value):
+        return (total or 0) + value
+
+    def render(self, values):
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.label_names, key)} {value:g}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self.values[key] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """Count the block as in flight while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Counter):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = _label_key(self.label_names, labels)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            entry[0][slot] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {json.dumps(key): [list(counts), total, n] for key, (counts, total, n) in self.values.items()}
+
+    @staticmethod
+    def merge(total, value):
+        if total is None:
+            return [list(value[0]), value[1], value[2]]
+        return [[a + b for a, b in zip(total[0], value[0])], total[1] + value[1], total[2] + value[2]]
+
+    def render(self, values):
+        for key, (counts, total, n) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else f"{bound:g}"
+                bucket_labels = _format_labels(self.label_names, key, f'le="{le}"')
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.label_names, key)} {total:.6f}"
+            yield f"{self.name}_count{_format_labels(self.label_names, key)} {n}"
+
+
+def _register(cls, name, help, labels=(), **kwargs):
+    with _registry_lock:
+        if name not in _metrics:
+            _metrics[name] = cls(name, help, labels, **kwargs)
+        return _metrics[name]
+
+
+def counter(name, help, labels=()):
+    return _register(Counter, name, help, labels)
+
+
+def gauge(name, help, labels=()):
+    return _register(Gauge, name, help, labels)
+
+
+def histogram(name, help, labels=(), buckets=LATENCY_BUCKETS):
+    return _register(Histogram, name, help, labels, buckets=buckets)
+
+
+STAGE_SECONDS = histogram("pathfinder_stage_seconds", "Time spent in each pipeline stage", ["stage"])
+REQUEST_SECONDS = histogram("pathfinder_request_seconds", "End-to-end request latency", ["endpoint"])
+REQUESTS = counter("pathfinder_requests_total", "Requests served", ["endpoint", "status"])
+IN_FLIGHT = gauge("pathfinder_in_flight_requests", "Requests currently being served", ["endpoint"])
+OCR_FALLBACKS = counter("pathfinder_ocr_fallbacks_total", "PDFs without a text layer sent to OCR")
+LANGUAGE_REJECTIONS = counter("pathfinder_language_rejections_total", "Resumes rejected as not English")
+LLM_CALLS = counter("pathfinder_llm_calls_total", "HTTP calls to the review LLM", ["outcome"])
+CACHE_LOOKUPS = counter("pathfinder_extraction_cache_total", "Extraction cache lookups", ["kind", "result"])
+
+
+@contextmanager
+def stage(name):
+    """Time a block into pathfinder_stage_seconds and the current request's trace, if any."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        trace = _trace.get()
+        if trace is not None:
+            trace.append((name, elapsed))
+
+
+def start_trace():
+    """Collect stage timings of the current request (context) until the token is reset."""
+    return _trace.set([])
+
+
+def finish_trace(token):
+    trace = _trace.get()
+    _trace.reset(token)
+    return trace or []
+
+
+def server_timing(trace, total=None):
+    """Server-Timing header value; repeated stages (e.g. per file in a batch) are summed."""
+    durations, counts = {}, {}
+    for name, elapsed in trace:
+        durations[name] = durations.get(name, 0.0) + elapsed
+        counts[name] = counts.get(name, 0) + 1
+    parts = [
+        f'{name};dur={seconds * 1000:.2f}' + (f';desc="x{counts[name]}"' if counts[name] > 1 else "")
+        for name, seconds in durations.items()
+    ]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+def should_profile():
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def start_profile():
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def finish_profile(profiler, label):
+    """Stop a sampled profile and write it under PROFILE_DIR for pstats/snakeviz."""
+    profiler.disable()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{label}-{os.getpid()}-{time.time():.3f}.prof")
+    profiler.dump_stats(path)
+    return path
+
+
+def snapshot():
+    return {name: metric.snapshot() for name, metric in _metrics.items()}
+
+
+def flush():
+    """Write this process's metrics to METRICS_DIR for the other workers to aggregate."""
+    if not METRICS_DIR:
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = os.path.join(METRICS_DIR, f"{os.getpid()}.json")
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(snapshot(), f)
+    os.replace(f"{path}.tmp", path)
+
+
+def clear():
+    """Remove metric files of earlier runs from METRICS_DIR."""
+    if not METRICS_DIR:
+        return
+    for path in glob.glob(os.path.join(METRICS_DIR, "*.json")):
+        os.remove(path)
+
+
+def _flush_loop():
+    while True:
+        time.sleep(METRICS_FLUSH_SECONDS)
+        try:
+            flush()
+        except Exception as e:
+            print(f"❌ Metrics flush failed: {e}")
+
+
+def start_flusher():
+    """Periodically flush to METRICS_DIR from this process (again after a fork)."""
+    global _flusher_pid
+    if not METRICS_DIR or _flusher_pid == os.getpid():
+        return
+    with _registry_lock:
+        if _flusher_pid != os.getpid():
+            _flusher_pid = os.getpid()
+            threading.Thread(target=_flush_loop, name="metrics-flusher", daemon=True).start()
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def collect():
+    """Metric values summed over every worker writing to METRICS_DIR, or this process alone."""
+    if not METRICS_DIR:
+        return snapshot()
+    flush()
+    merged = {}
+    for path in glob.glob(os.path.join(METRICS_DIR, "*.json")):
+        try:
+            with open(path) as f:
+                values = json.load(f)
+        except (OSError, ValueError):
+            continue
+        alive = _alive(int(os.path.basename(path).split(".")[0]))
+        for name, series in values.items():
+            metric = _metrics.get(name)
+            if metric is None or (metric.kind == "gauge" and not alive):
+                continue
+            target = merged.setdefault(name, {})
+            for key, value in series.items():
+                target[key] = metric.merge(target.get(key), value)
+    return merged
+
+
+def render():
+    """Prometheus text exposition of every registered metric."""
+    lines = []
+    for name, series in collect().items():
+        metric = _metrics[name]
+        lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        lines.extend(metric.render({tuple(json.loads(key)): value for key, value in series.items()}))
+    return "\n".join(lines) + "\n"
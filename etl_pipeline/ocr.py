@@ -0,0 +1,116 @@
+"""Page-streaming OCR for scanned PDFs.
+
+Pages are rasterised one at a time at OCR_DPI and OCR'd in a process pool of
+the document's own, so a document never holds more than OCR_WORKERS page
+images in memory. The pool is terminated when the document finishes or runs
+out of time, so a slow scan's pages don't keep running after its request has
+given up, and OCR_DOCUMENTS bounds the documents OCR'd at once per process.
+This module is imported by the pool's child processes and stays lightweight.
+"""
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+import psutil
+import pytesseract
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(min(4, os.cpu_count() or 1))))
+OCR_MAX_PAGES = int(os.getenv("OCR_MAX_PAGES", "10"))
+OCR_TIMEOUT = float(os.getenv("OCR_TIMEOUT", "60"))
+OCR_DOCUMENTS = int(os.getenv("OCR_DOCUMENTS", "2"))
+
+_documents = threading.BoundedSemaphore(max(1, OCR_DOCUMENTS))
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process in MiB."""
+    return psutil.Process().memory_info().rss / 2**20
+
+
+def _stop_worker(signum, frame):
+    """Take the page's pdftoppm/tesseract subprocesses down with a terminated pool worker."""
+    for child in psutil.Process().children(recursive=True):
+        child.kill()
+    os._exit(1)
+
+
+def _init_worker():
+    signal.signal(signal.SIGTERM, _stop_worker)
+
+
+def ocr_page(pdf_path: str, page_number: int, dpi: int):
+    """Rasterise and OCR a single page.
+
+    Returns (page_number, text, seconds, page image MiB, worker RSS MiB), the
+    RSS read while the page image is held. The decoded image is what a page
+    costs this process (pdftoppm and tesseract run as subprocesses), and
+    unlike an RSS delta it isn't hidden by memory freed from earlier pages.
+    """
+    start = time.perf_counter()
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=page_number, last_page=page_number)
+    try:
+        image_mb = sum(img.width * img.height * len(img.getbands()) for img in images) / 2**20
+        held_mb = rss_mb()
+        text = "\n".join(pytesseract.image_to_string(img) for img in images)
+    finally:
+        for img in images:
+            img.close()
+    return page_number, text, time.perf_counter() - start, image_mb, held_mb
+
+
+def count_pages(pdf_path: str) -> int:
+    return int(pdfinfo_from_path(pdf_path)["Pages"])
+
+
+def ocr_pdf(pdf_path, dpi=None, max_pages=None, timeout=None) -> str:
+    """OCR a PDF page by page, reassembling the text in page order."""
+    dpi = dpi or OCR_DPI
+    max_pages = max_pages or OCR_MAX_PAGES
+    timeout = timeout or OCR_TIMEOUT
+    pdf_path = str(pdf_path)
+
+    start = time.perf_counter()
+    total_pages = count_pages(pdf_path)
+    n_pages = min(total_pages, max_pages)
+    if n_pages < total_pages:
+        print(f"⚠️ OCR limited to the first {n_pages} of {total_pages} pages")
+
+    if OCR_WORKERS <= 1:
+        results = []
+        for page_number in range(1, n_pages + 1):
+            results.append(ocr_page(pdf_path, page_number, dpi))
+            if time.perf_counter() - start > timeout:
+                raise TimeoutError(f"OCR exceeded {timeout:g}s after {page_number} pages")
+    else:
+        # Waiting for another document's pool counts against this one's timeout
+        if not _documents.acquire(timeout=timeout):
+            raise TimeoutError(f"OCR waited {timeout:g}s for another document to finish")
+        try:
+            # forkserver avoids forking a threaded server; leaving the block terminates pages still running
+            context = multiprocessing.get_context("forkserver")
+            with context.Pool(max(1, min(OCR_WORKERS, n_pages)), initializer=_init_worker) as pool:
+                pending = [pool.apply_async(ocr_page, (pdf_path, page_number, dpi))
+                           for page_number in range(1, n_pages + 1)]
+                results = []
+                for page_number, result in enumerate(pending, start=1):
+                    try:
+                        results.append(result.get(max(0.0, start + timeout - time.perf_counter())))
+                    except multiprocessing.TimeoutError:
+                        raise TimeoutError(f"OCR exceeded {timeout:g}s after {page_number - 1} of {n_pages} pages") from None
+        finally:
+            _documents.release()
+
+    results.sort(key=lambda r: r[0])
+    elapsed = time.perf_counter() - start
+    page_seconds = [r[2] for r in results]
+    print(
+        f"✅ OCR {n_pages} pages at {dpi} DPI in {elapsed:.2f}s "
+        f"(per page avg {sum(page_seconds) / max(1, n_pages):.2f}s, max {max(page_seconds, default=0):.2f}s; "
+        f"largest page image {max((r[3] for r in results), default=0):.0f} MiB, "
+        f"worker RSS up to {max((r[4] for r in results), default=0):.0f} MiB)"
+    )
+    return "\n".join(r[1] for r in results)
@@ -1,62 +1,197 @@
+import math
+import os
+from dataclasses import dataclass
+
+import numpy as np
 import pandas as pd
-import joblib
-from sklearn.metrics.pairwise import cosine_similarity
-
-# Load pre-trained TF-IDF vectorizer and matrix
-try:
-    vectorizer = joblib.load("./models/tfidf_vectorizer.joblib")
-    tfidf_matrix = joblib.load("./models/tfidf_matrix.joblib")
-    print("✅ Loaded pre-trained TF-IDF vectorizer and matrix.")
-except Exception as e:
-    print(f"❌ Error loading TF-IDF models: {e}")
-    raise
-
-# Load the dataset used to train TF-IDF
-df_ready = pd.read_csv("./dataset/job_reference_data.csv")
-
-def preprocess_data(df_clean):
+from scipy import sparse
+from sklearn.utils.extmath import row_norms
+
+from etl_pipeline.metrics import stage
+from etl_pipeline.registry import get_reference
+from etl_pipeline.skills import hybrid_search, normalize_term
+
+# Shared terms listed per recommended job in explanation mode
+EXPLAIN_TERMS = int(os.getenv("EXPLAIN_TERMS", "5"))
+
+_vocabulary = (None, None)
+
+# Artifacts load on first use (or in the gunicorn master via registry.preload)
+def __getattr__(name):
+    if name in ("vectorizer", "tfidf_matrix", "job_titles", "job_index"):
+        return getattr(get_reference(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@dataclass(slots=True)
+class ResumeRecord:
+    """The fields of an extracted resume that job matching looks at."""
+
+    ability: str = ""
+    skill: str = ""
+    program: str = ""
+
+    @classmethod
+    def from_features(cls, features):
+        """Record of an extract_resume_features() dict (or a DataFrame row)."""
+        return cls(features["ability"], features["skill"], features["program"])
+
+    @property
+    def matching_text(self):
+        return f"{self.ability} {self.skill} {self.program}"
+
+    @property
+    def skills(self):
+        """Normalised skill terms, as the skill index stores them."""
+        return {term for term in map(normalize_term, self.skill.split(",")) if term}
+
+
+def preprocess_data(df_clean, reference=None):
     """Vectorize resume data using the pre-trained TF-IDF model."""
     try:
         df_clean["combined_text"] = df_clean["ability"] + " " + df_clean["skill"] + " " + df_clean["program"]
-        return vectorizer.transform(df_clean["combined_text"])
+        with stage("tfidf_transform"):
+            return (reference or get_reference()).vectorizer.transform(df_clean["combined_text"])
     except Exception as e:
         print(f"❌ Error during vectorization: {e}")
         raise
 
-def predict(df_clean, output_csv="./dataset/resume_output.csv", top_n=3):
-    """Find top N job recommendations based on resume similarity."""
+
+def combine_features(features):
+    """Build the matching text for each extracted resume dict."""
+    return [f"{f['ability']} {f['skill']} {f['program']}" for f in features]
+
+
+def vectorize_records(records, reference=None):
+    """CSR TF-IDF matrix with one row per ResumeRecord."""
+    with stage("tfidf_transform"):
+        return (reference or get_reference()).vectorizer.transform([record.matching_text for record in records])
+
+
+def score_matrix(new_tfidf, top_n=3, reference=None, records=None):
+    """(indices, cosines, fused scores) of a batch of TF-IDF rows against the job index.
+
+    Ranked by cosine fused with skill overlap when records are given and a
+    skill index is loaded; by cosine alone otherwise, with fused scores None.
+    """
+    reference = reference or get_reference()
+    with stage("similarity"):
+        if records is not None and reference.skill_index is not None:
+            return hybrid_search(reference, new_tfidf, [record.skills for record in records], top_n)
+        return (*reference.job_index.search(new_tfidf, top_n), None)
+
+
+def vocabulary_terms(vectorizer):
+    """Term of each TF-IDF column, built once per vectorizer."""
+    global _vocabulary
+    if _vocabulary[0] is not vectorizer:
+        _vocabulary = (vectorizer, vectorizer.get_feature_names_out())
+    return _vocabulary[1]
+
+
+def explain_matches(new_tfidf, indices, reference=None, n_terms=EXPLAIN_TERMS):
+    """(cosines, shared terms) of each resume row and its top-N job rows.
+
+    One sparse element-wise product of the resume vectors with all
+    of their matched job vectors covers every pair: a pair's row sums to its
+    cosine, and its largest entries are the terms contributing most to it.
+    Shared terms are (term, contribution) lists per pair, highest first.
+    """
+    reference = reference or get_reference()
+    n_queries, k = indices.shape
+    with stage("explain"):
+        new_tfidf = sparse.csr_matrix(new_tfidf)
+        queries = new_tfidf[np.repeat(np.arange(n_queries), k)]
+        products = sparse.csr_matrix(queries.multiply(reference.job_index.vectors(indices.ravel())))
+        pair_of = np.repeat(np.arange(n_queries * k), np.diff(products.indptr))
+        # Job vectors are unit length; dividing by the resume norm makes the products cosine contributions
+        norms = row_norms(new_tfidf)
+        products.data /= norms[pair_of // k]
+        cosines = np.asarray(products.sum(axis=1)).reshape(n_queries, k)
+
+        # Order every pair's entries by contribution in one sort, then keep each pair's first n_terms
+        order = np.lexsort((-products.data, pair_of))
+        rank = np.arange(len(order)) - products.indptr[pair_of[order]]
+        top = order[rank < n_terms]
+        terms = vocabulary_terms(reference.vectorizer)[products.indices[top]].tolist()
+        weights = products.data[top].tolist()
+        bounds = np.searchsorted(pair_of[top], np.arange(n_queries * k + 1)).tolist()
+
+    shared = [list(zip(terms[start:end], weights[start:end])) for start, end in zip(bounds[:-1], bounds[1:])]
+    return cosines, [shared[i * k:(i + 1) * k] for i in range(n_queries)]
+
+
+def format_matches(indices, scores, reference=None, explanations=None, fused=None):
+    """Turn top-N index/cosine arrays (and fused scores, explain_matches output) into the API's result records."""
+    titles = (reference or get_reference()).job_titles[indices].tolist()
+    if fused is not None:
+        fused = fused.tolist()
+    if explanations is not None:
+        cosines, shared = explanations
+        cosines = cosines.tolist()
+    results = []
+    # Plain floats: rounding numpy scalars one by one costs more than the matching itself for one CV
+    for i, row_scores in enumerate(scores.tolist()):
+        for j, (title, score) in enumerate(zip(titles[i], row_scores)):
+            if not math.isfinite(score):
+                continue  # A row that could not match (e.g. a retired posting), not a recommendation
+            similarity_score = round(score * 100, 2)
+
+            # Ensure minimum score threshold (e.g., avoid showing "0.0%" if near zero)
+            if similarity_score < 1:
+                similarity_score = "<1%"  # Handle extremely low scores gracefully
+
+            record = {
+                "cv_index": i + 1,
+                "recommended_job_title": title,
+                "similarity_score": f"{similarity_score}%",
+                "score": round(score, 4),
+            }
+            if fused is not None:
+                record["fused_score"] = round(fused[i][j], 4)
+            if explanations is not None:
+                record["cosine"] = round(cosines[i][j], 4)
+                record["matched_terms"] = [{"term": term, "weight": round(weight, 4)} for term, weight in shared[i][j]]
+            results.append(record)
+    return results
+
+
+def predict_records(records, top_n=3, explain=False):
+    """Top N job recommendations for ResumeRecords: records -> CSR -> top-N, no DataFrames.
+
+    With explain, each recommendation also lists the shared terms contributing most to its cosine.
+    """
+    try:
+        # One reference for the whole call, so a catalogue swap mid-request can't mix row numbering
+        reference = get_reference()
+        new_tfidf = vectorize_records(records, reference)
+        indices, scores, fused = score_matrix(new_tfidf, top_n, reference, records)
+        explanations = explain_matches(new_tfidf, indices, reference) if explain else None
+        return format_matches(indices, scores, reference, explanations, fused)
+    except Exception as e:
+        print(f"❌ Batch prediction failed: {e}")
+        raise
+
+
+def predict_batch(features, top_n=3, explain=False):
+    """Find top N job recommendations for many extracted resume dicts in one pass."""
+    return predict_records([ResumeRecord.from_features(f) for f in features], top_n, explain)
+
+
+def predict(df_clean, output_csv=None, top_n=3):
+    """Top N job recommendations per resume row as result records; also saved to output_csv if given.
+
+    Kept for DataFrame callers; it scores through predict_records and leaves df_clean untouched.
+    """
     try:
-        new_tfidf = preprocess_data(df_clean)
-        cosine_similarities = cosine_similarity(new_tfidf, tfidf_matrix)
-
-        results = []
-
-        for i, sims in enumerate(cosine_similarities):
-            top_indices = sims.argsort()[-top_n:][::-1]
-            for idx in top_indices:
-                if idx < len(df_ready):  # Ensure index is valid
-                    matched_title = df_ready.iloc[idx]["title"]  # Retrieve job title from original dataset
-                else:
-                    matched_title = "Unknown"
-                
-                similarity = sims[idx] * 100
-                similarity_score = round(similarity, 2)
-
-                # Ensure minimum score threshold (e.g., avoid showing "0.0%" if near zero)
-                if similarity_score < 1:
-                    similarity_score = "<1%"  # Handle extremely low scores gracefully
-
-                results.append({
-                    "cv_index": i + 1,
-                    "recommended_job_title": matched_title,
-                    "similarity_score": f"{similarity_score}%"
-                })
-
-        df_results = pd.DataFrame(results)
-        df_results.to_csv(output_csv, index=False)
-        print(f"\n✅ Predictions saved to: {output_csv}")
-
-        return df_results
+        records = [ResumeRecord(*row) for row in df_clean[["ability", "skill", "program"]].itertuples(index=False)]
+        results = predict_records(records, top_n)
+        if output_csv:
+            with stage("csv_write"):
+                pd.DataFrame(results).to_csv(output_csv, index=False)
+            print(f"\n✅ Predictions saved to: {output_csv}")
+
+        return results
     except Exception as e:
         print(f"❌ Prediction failed: {e}")
         raise
@@ -0,0 +1,271 @@
+"""Lazily loaded, process-shared model artifacts.
+
+Nothing is loaded at import time. The TF-IDF matrix and title array are
+memory-mapped read-only, so workers forked from a preloaded gunicorn master
+(see gunicorn.conf.py) share their pages instead of each holding a copy, and
+spaCy is only loaded, with its NER pipe alone, when extract_name needs it.
+
+Write the memory-mappable title array once after refreshing the reference data:
+
+    python -m etl_pipeline.registry prepare
+
+MODEL_DIR may also be a versioned bundle written by `python -m etl_pipeline.train
+build`: a directory with a manifest.json, whose file hashes are checked before
+its float32 matrix is loaded. The bundle stores the CSR arrays as plain .npy
+files, so that matrix is memory-mapped and shared the same way.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import joblib
+from scipy import sparse
+
+from etl_pipeline import keywords
+from etl_pipeline.cache import content_hash
+from etl_pipeline.index import ExactIndex, load_index
+from etl_pipeline.skills import load_skill_index
+
+MODEL_DIR = os.getenv("MODEL_DIR", "./models")
+DATA_DIR = os.getenv("DATA_DIR", "./dataset")
+SPACY_MODEL = os.getenv("SPACY_MODEL", "en_core_web_sm")
+
+# Nearest-neighbour backend: "exact" scans every row, "ivf" uses the prebuilt index
+JOB_INDEX_BACKEND = os.getenv("JOB_INDEX_BACKEND", "exact")
+JOB_INDEX_PATH = os.getenv("JOB_INDEX_PATH", os.path.join(MODEL_DIR, "job_index.joblib"))
+JOB_INDEX_NPROBE = int(os.getenv("JOB_INDEX_NPROBE", "0")) or None
+
+# Fuse TF-IDF cosine with skill overlap from the prebuilt skill index (see skills.py)
+SKILL_RANKING = os.getenv("SKILL_RANKING", "0") == "1"
+SKILL_INDEX_PATH = os.getenv("SKILL_INDEX_PATH", os.path.join(MODEL_DIR, "skill_index.joblib"))
+
+# Marks an artifact directory as a bundle built by etl_pipeline.train
+BUNDLE_MANIFEST = "manifest.json"
+# A bundle's CSR matrix, one memory-mappable array per file
+MATRIX_FILES = {"data": "tfidf_matrix_data.npy", "indices": "tfidf_matrix_indices.npy",
+                "indptr": "tfidf_matrix_indptr.npy"}
+
+# spaCy pipes that extract_name never uses (a tok2vec left feeding none of the rest is dropped too)
+SPACY_EXCLUDE = ["tagger", "parser", "attribute_ruler", "lemmatizer", "senter"]
+
+_NOT_LOADED = object()
+_lock = threading.Lock()
+_nlp = _NOT_LOADED
+_reference = None
+
+
+class JobReference:
+    """The fitted vectorizer plus the job catalogue it is matched against."""
+
+    def __init__(self, vectorizer, tfidf_matrix, job_titles, job_index, generation=0, version=0, skill_index=None):
+        self.vectorizer = vectorizer
+        self.tfidf_matrix = tfidf_matrix
+        self.job_titles = job_titles
+        self.job_index = job_index
+        # Skill inverted index over the same rows, when skill ranking is on
+        self.skill_index = skill_index
+        # Catalogue generation of the base artifacts and version of the delta applied on top
+        self.generation = generation
+        self.version = version
+
+
+class PackedTitles:
+    """Read-only titles stored as one UTF-8 blob plus offsets, so the arrays can be memory-mapped."""
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, indices):
+        indices = np.asarray(indices)
+        titles = np.empty(indices.shape, dtype=object)
+        for pos, i in np.ndenumerate(indices):
+            titles[pos] = bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+        return titles
+
+
+def model_path(name):
+    return os.path.join(MODEL_DIR, name)
+
+
+def load_titles(n_rows, directory=None, reference_csv=None):
+    """Job titles aligned with the matrix rows; rows without a title map to "Unknown"."""
+    directory = directory or MODEL_DIR
+    blob_path = os.path.join(directory, "job_titles.npy")
+    offsets_path = os.path.join(directory, "job_title_offsets.npy")
+    if os.path.exists(blob_path) and os.path.exists(offsets_path):
+        titles = PackedTitles(np.load(blob_path, mmap_mode="r"), np.load(offsets_path, mmap_mode="r"))
+        if len(titles) >= n_rows:
+            return titles
+        titles = titles[np.arange(len(titles))]
+    else:
+        titles = pd.read_csv(reference_csv or os.path.join(DATA_DIR, "job_reference_data.csv"), usecols=["title"])["title"]
+        titles = titles.fillna("Unknown").astype(str).to_numpy(dtype=object)
+
+    if len(titles) >= n_rows:
+        return titles[:n_rows]
+    padded = np.full(n_rows, "Unknown", dtype=object)
+    padded[:len(titles)] = titles
+    return padded
+
+
+def file_sha256(path):
+    with open(path, "rb") as f:
+        return content_hash(f)
+
+
+def is_bundle(directory):
+    return os.path.exists(os.path.join(directory, BUNDLE_MANIFEST))
+
+
+def load_bundle(directory, verify=True):
+    """(vectorizer, matrix, manifest) of a model bundle; RuntimeError if a file does not match its manifest."""
+    with open(os.path.join(directory, BUNDLE_MANIFEST), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if verify:
+        for name, expected in manifest["files"].items():
+            if file_sha256(os.path.join(directory, name)) != expected["sha256"]:
+                raise RuntimeError(f"Bundle {manifest['version']} is corrupt: {name} does not match its manifest")
+    if not all(name in manifest["files"] for name in MATRIX_FILES.values()):
+        raise RuntimeError(f"Bundle {manifest['version']} has no memory-mappable matrix; rebuild it with "
+                           f"python -m etl_pipeline.train build")
+    vectorizer = joblib.load(os.path.join(directory, "tfidf_vectorizer.joblib"))
+    return vectorizer, load_matrix(directory, manifest["shape"]), manifest
+
+
+def load_matrix(directory, shape):
+    """CSR matrix over the memory-mapped arrays written by write_matrix; nothing is copied."""
+    data, indices, indptr = (np.load(os.path.join(directory, MATRIX_FILES[part]), mmap_mode="r")
+                             for part in ("data", "indices", "indptr"))
+    return sparse.csr_matrix((data, indices, indptr), shape=tuple(shape), copy=False)
+
+
+def load_reference(directory=None, reference_csv=None, generation=0):
+    """Load the vectorizer, memory-mapped matrix, titles and job index from one artifact directory."""
+    directory = directory or MODEL_DIR
+    start = time.perf_counter()
+    try:
+        if is_bundle(directory):
+            vectorizer, tfidf_matrix, manifest = load_bundle(directory)
+            print(f"✅ Loaded model bundle {manifest['version']}: {tfidf_matrix.shape[1]} terms, "
+                  f"{tfidf_matrix.dtype} matrix")
+        else:
+            vectorizer = joblib.load(os.path.join(directory, "tfidf_vectorizer.joblib"))
+            tfidf_matrix = joblib.load(os.path.join(directory, "tfidf_matrix.joblib"), mmap_mode="r")
+            print("✅ Loaded pre-trained TF-IDF vectorizer and matrix.")
+    except Exception as e:
+        print(f"❌ Error loading TF-IDF models: {e}")
+        raise
+
+    job_titles = load_titles(tfidf_matrix.shape[0], directory, reference_csv)
+
+    job_index = ExactIndex(tfidf_matrix)
+    if JOB_INDEX_BACKEND != job_index.backend:
+        index_path = JOB_INDEX_PATH if directory == MODEL_DIR else os.path.join(directory, "job_index.joblib")
+        try:
+            job_index = load_index(index_path, tfidf_matrix, n_probe=JOB_INDEX_NPROBE)
+            print(f"✅ Loaded {job_index.backend} job index from {index_path}")
+        except Exception as e:
+            print(f"❌ Error loading job index, using exact search: {e}")
+
+    skill_index = None
+    if SKILL_RANKING:
+        skill_path = SKILL_INDEX_PATH if directory == MODEL_DIR else os.path.join(directory, "skill_index.joblib")
+        try:
+            skill_index = load_skill_index(skill_path, tfidf_matrix.shape[0])
+            print(f"✅ Loaded skill index of {len(skill_index.terms)} skills from {skill_path}")
+        except Exception as e:
+            print(f"❌ Error loading skill index, ranking on TF-IDF alone: {e}")
+
+    print(f"✅ Job reference ready: {tfidf_matrix.shape[0]} postings in {time.perf_counter() - start:.2f}s")
+    return JobReference(vectorizer, tfidf_matrix, job_titles, job_index, generation=generation, skill_index=skill_index)
+
+
+def get_reference():
+    """The process-wide job reference (base artifacts plus catalogue updates), loaded on first use."""
+    global _reference
+    from etl_pipeline import catalogue
+
+    if _reference is None:
+        with _lock:
+            if _reference is None:
+                _reference = catalogue.current_reference()
+    catalogue.watch()
+    return _reference
+
+
+def set_reference(reference):
+    """Swap in a new reference; callers already holding the old one finish with it."""
+    global _reference
+    _reference = reference
+
+
+def get_nlp():
+    """spaCy model with only the NER pipe, loaded on first use; None if unavailable."""
+    global _nlp
+    if _nlp is _NOT_LOADED:
+        with _lock:
+            if _nlp is _NOT_LOADED:
+                start = time.perf_counter()
+                try:
+                    import spacy
+                    _nlp = spacy.load(SPACY_MODEL, exclude=SPACY_EXCLUDE)
+                    # A shared tok2vec/transformer whose listeners were all excluded would still run on every doc
+                    for name in list(_nlp.pipe_names):
+                        if getattr(_nlp.get_pipe(name), "listening_components", None) == []:
+                            _nlp.remove_pipe(name)
+                    print(f"✅ Loaded spaCy {SPACY_MODEL} {_nlp.pipe_names} in {time.perf_counter() - start:.2f}s")
+                except Exception as e:
+                    print(f"Error loading Spacy NLP model: {e}")
+                    _nlp = None
+    return _nlp
+
+
+def preload(nlp=False):
+    """Load shared artifacts up front, e.g. in a gunicorn master before forking workers."""
+    get_reference()
+    keywords.current()
+    if nlp:
+        get_nlp()
+
+
+def write_titles(titles, output_dir):
+    """Write job titles as a UTF-8 blob and offsets array that workers can memory-map."""
+    encoded = [title.encode("utf-8") for title in titles]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    np.save(os.path.join(output_dir, "job_titles.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    np.save(os.path.join(output_dir, "job_title_offsets.npy"), offsets)
+    return offsets[-1]
+
+
+def write_matrix(matrix, output_dir):
+    """Write a CSR matrix as separate data/indices/indptr arrays that workers can memory-map."""
+    for part, name in MATRIX_FILES.items():
+        np.save(os.path.join(output_dir, name), getattr(matrix, part))
+
+
+def prepare(reference_csv, output_dir):
+    titles = pd.read_csv(reference_csv, usecols=["title"])["title"].fillna("Unknown").astype(str)
+    n_bytes = write_titles(titles, output_dir)
+    print(f"✅ Wrote {len(titles)} titles ({n_bytes} bytes) to {output_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prepare memory-mappable model artifacts.")
+    parser.add_argument("command", choices=["prepare"])
+    parser.add_argument("--reference-csv", default=os.path.join(DATA_DIR, "job_reference_data.csv"))
+    parser.add_argument("--output-dir", default=MODEL_DIR)
+    args = parser.parse_args()
+    prepare(args.reference_csv, args.output_dir)
+
+
+if __name__ == "__main__":
+    main()
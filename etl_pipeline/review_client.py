@@ -0,0 +1,278 @@
+"""Async, pooled OpenRouter client for CV reviews.
+
+A single httpx.AsyncClient per process keeps connections to OpenRouter alive
+between reviews. It runs on a background event loop, so the sync Flask views
+(and any number of gunicorn threads) can submit reviews without each holding a
+connection of their own. A semaphore caps in-flight LLM calls, 429/5xx answers
+are retried with backoff, and parsed reviews are cached by a hash of the
+normalised profile so identical profiles only pay for one call. A caller
+waits at most REVIEW_DEADLINE seconds for a review, retries included; past
+it the call is cancelled (unless other callers share it) and
+ReviewDeadlineExceeded is raised.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import httpx
+from dotenv import load_dotenv
+
+from etl_pipeline.cache import ExtractionCache
+from etl_pipeline.metrics import LLM_CALLS
+
+load_dotenv()
+
+# OpenRouter API configuration; point OPENROUTER_ENDPOINT at a stub server for testing
+OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "deepseek/deepseek-r1-0528:free")
+OPENROUTER_ENDPOINT = os.getenv("OPENROUTER_ENDPOINT", "https://openrouter.ai/api/v1/chat/completions")
+
+REVIEW_TIMEOUT = float(os.getenv("REVIEW_TIMEOUT", "120"))
+REVIEW_CONNECT_TIMEOUT = float(os.getenv("REVIEW_CONNECT_TIMEOUT", "10"))
+REVIEW_CONCURRENCY = int(os.getenv("REVIEW_CONCURRENCY", "16"))
+REVIEW_MAX_RETRIES = int(os.getenv("REVIEW_MAX_RETRIES", "3"))
+REVIEW_BACKOFF = float(os.getenv("REVIEW_BACKOFF", "0.5"))
+# Longest a caller waits for one review, over all attempts and backoff
+REVIEW_DEADLINE = float(os.getenv("REVIEW_DEADLINE", "180"))
+
+# Longest single wait between retries, whether from backoff or a Retry-After header
+MAX_BACKOFF = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+PROFILE_FIELDS = ("Experience", "skill", "ability", "program")
+
+
+class ReviewDeadlineExceeded(TimeoutError):
+    """No review within the caller's deadline; the LLM call was given up."""
+
+
+class ReviewResponseError(ValueError):
+    """The model answered, but not with parseable JSON."""
+
+    def __init__(self, raw):
+        super().__init__("Model responded with invalid JSON")
+        self.raw = raw
+
+
+def normalise_profile(profile):
+    """Lower-cased, whitespace-collapsed profile fields in PROFILE_FIELDS order."""
+    return tuple(" ".join(str(profile.get(field) or "").lower().split()) for field in PROFILE_FIELDS)
+
+
+def profile_key(profile, model=OPENROUTER_MODEL):
+    """Cache key of a review: the model plus the normalised profile."""
+    payload = json.dumps([model, *normalise_profile(profile)], ensure_ascii=False)
+    return "review:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def build_prompt(profile):
+    return (
+        f"Based on the following resume profile, write a professional technical CV review.\n\n"
+        f"Experiences: {profile.get('Experience')}\n"
+        f"Skills: {profile.get('skill')}\n"
+        f"Abilities: {profile.get('ability')}\n"
+        f"Education: {profile.get('program')}\n\n"
+        f"Return response as valid JSON formatted markdown with fields: strengths, weaknesses, and suggestions."
+    )
+
+
+def strip_json_wrappers(text):
+    """Cleans LLM response from code fences or markdown artifacts."""
+    return re.sub(r"^.*?({.*?})\s*```?$", r"\1", text.strip(), flags=re.DOTALL)
+
+
+def parse_review(result_text):
+    """Parse the model's answer into a dict, tolerating code fences and markdown emphasis."""
+    # Strip code blocks and markdown artifacts
+    cleaned = re.sub(r"^(```json|```)", "", result_text.strip(), flags=re.IGNORECASE)
+    cleaned = re.sub(r"```$", "", cleaned.strip())
+
+    # Remove markdown formatting like **bold** or _italic_
+    cleaned = re.sub(r"\*\*(.*?)\*\*", r"\1", cleaned)
+    cleaned = re.sub(r"\*(.*?)\*", r"\1", cleaned)
+    cleaned = re.sub(r"_(.*?)_", r"\1", cleaned)
+
+    try:
+        return json.loads(cleaned)
+    except json.JSONDecodeError:
+        pass
+    # Try one more time with alternate wrapper stripper
+    try:
+        return json.loads(strip_json_wrappers(result_text))
+    except json.JSONDecodeError:
+        raise ReviewResponseError(result_text)
+
+
+def retry_after(response):
+    """Seconds requested by a Retry-After header, if it holds a number."""
+    try:
+        return min(MAX_BACKOFF, max(0.0, float(response.headers["Retry-After"])))
+    except (KeyError, ValueError):
+        return None
+
+
+class ReviewClient:
+    """Submits reviews to OpenRouter from any thread over one pooled async session."""
+
+    def __init__(self, endpoint=OPENROUTER_ENDPOINT, api_key=OPENROUTER_API_KEY, model=OPENROUTER_MODEL,
+                 timeout=REVIEW_TIMEOUT, connect_timeout=REVIEW_CONNECT_TIMEOUT, concurrency=REVIEW_CONCURRENCY,
+                 max_retries=REVIEW_MAX_RETRIES, backoff=REVIEW_BACKOFF, deadline=REVIEW_DEADLINE, cache=None):
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.deadline = deadline
+        self.cache = cache if cache is not None else ExtractionCache(max_entries=0)
+
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "retries": 0, "failures": 0, "coalesced": 0, "deadline_exceeded": 0}
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._loop = None
+        self._http = None
+        self._semaphore = None
+        self._inflight = {}
+
+    @property
+    def configured(self):
+        return bool(self.api_key) and self.api_key != "your_openrouter_api_key_here"
+
+    def _ensure_loop(self):
+        """Start the background event loop and HTTP session on first use (and again after a fork)."""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="review-client", daemon=True).start()
+                self._http = httpx.AsyncClient(
+                    timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                    limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+                    headers={
+                        "Authorization": f"Bearer {self.api_key}",
+                        "Content-Type": "application/json",
+                        "HTTP-Referer": "http://localhost",
+                        "X-Title": "CVReviewApp",
+                    },
+                )
+                self._semaphore = asyncio.Semaphore(self.concurrency)
+                self._loop = loop
+            return self._loop
+
+    def submit(self, profile) -> Future:
+        """Start a review and return a concurrent.futures.Future of the parsed review dict."""
+        key = profile_key(profile, self.model)
+        cached = self.cache.get(key)
+        if cached is not None:
+            future = Future()
+            future.set_result(cached)
+            return future
+        return asyncio.run_coroutine_threadsafe(self._review(key, profile), self._ensure_loop())
+
+    def review(self, profile):
+        """Blocking review for sync callers such as the Flask views."""
+        future = self.submit(profile)
+        try:
+            return future.result(timeout=self.deadline)
+        except FutureTimeout:
+            # Cancels the _review coroutine on the background loop
+            future.cancel()
+            raise self._deadline_exceeded() from None
+
+    async def areview(self, profile):
+        """Awaitable review for async callers running on their own event loop."""
+        try:
+            # wait_for cancels the wrapped future, and with it the _review coroutine
+            return await asyncio.wait_for(asyncio.wrap_future(self.submit(profile)), self.deadline)
+        except asyncio.TimeoutError:
+            raise self._deadline_exceeded() from None
+
+    def _deadline_exceeded(self):
+        self._counters["deadline_exceeded"] += 1
+        return ReviewDeadlineExceeded(f"No review within {self.deadline:g}s")
+
+    async def _review(self, key, profile):
+        # Identical profiles already in flight share one LLM call
+        entry = self._inflight.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(self._fetch(key, profile))
+            entry = self._inflight[key] = {"task": task, "waiters": 0}
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self._counters["coalesced"] += 1
+        entry["waiters"] += 1
+        try:
+            return await asyncio.shield(entry["task"])
+        except asyncio.CancelledError:
+            # The last caller to give up takes the shared call down with it
+            if entry["waiters"] == 1:
+                entry["task"].cancel()
+            raise
+        finally:
+            entry["waiters"] -= 1
+
+    async def _fetch(self, key, profile):
+        async with self._semaphore:
+            result_text = await self._post(build_prompt(profile))
+        review = parse_review(result_text)
+        self.cache.set(key, review)
+        return review
+
+    def backoff_delay(self, attempt):
+        """Exponential backoff with jitter for the given 0-based retry attempt."""
+        return min(MAX_BACKOFF, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    async def _post(self, prompt):
+        body = {
+            "model": self.model,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ]
+        }
+        for attempt in range(self.max_retries + 1):
+            self._counters["requests"] += 1
+            delay = None
+            try:
+                response = await self._http.post(self.endpoint, json=body)
+                LLM_CALLS.inc(outcome=str(response.status_code))
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    response.raise_for_status()
+                    return response.json()["choices"][0]["message"]["content"]
+                delay = retry_after(response)
+            except httpx.TransportError as e:
+                LLM_CALLS.inc(outcome=type(e).__name__)
+                # Connection failures and timeouts are retried like 5xx answers
+                if attempt == self.max_retries:
+                    self._counters["failures"] += 1
+                    raise
+            except httpx.HTTPStatusError:
+                self._counters["failures"] += 1
+                raise
+            self._counters["retries"] += 1
+            await asyncio.sleep(delay if delay is not None else self.backoff_delay(attempt))
+
+    def stats(self):
+        return {**self._counters, "cache": self.cache.stats()}
+
+    def close(self):
+        """Close pooled connections and stop the background loop."""
+        with self._lock:
+            loop, http = self._loop, self._http
+            if loop is None or self._pid != os.getpid():
+                return
+            asyncio.run_coroutine_threadsafe(http.aclose(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            self._reset()
+
+
+review_client = ReviewClient(cache=ExtractionCache.from_env("REVIEW_CACHE"))
@@ -0,0 +1,216 @@
+"""Where prediction results go after a request has been answered.
+
+The API hands its match records to `result_sink`. By default that is a
+NullSink, so serving a prediction never touches the disk. Setting
+RESULT_SINK to jsonl, parquet or sqlite wraps the chosen sink in a
+BackgroundSink: requests only put records on a bounded queue, and a
+writer thread in each worker appends them in batches. When the queue is
+full, records are dropped and counted instead of slowing requests down.
+"""
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from etl_pipeline.metrics import counter
+
+RESULT_SINK = os.getenv("RESULT_SINK", "none").lower()
+RESULT_SINK_PATH = os.getenv("RESULT_SINK_PATH", "./dataset/predictions")
+RESULT_SINK_ROTATE_BYTES = int(os.getenv("RESULT_SINK_ROTATE_BYTES", str(64 * 1024 * 1024)))
+RESULT_SINK_QUEUE = int(os.getenv("RESULT_SINK_QUEUE", "10000"))
+RESULT_SINK_BATCH = int(os.getenv("RESULT_SINK_BATCH", "500"))
+RESULT_SINK_FLUSH_SECONDS = float(os.getenv("RESULT_SINK_FLUSH_SECONDS", "2"))
+
+RECORD_FIELDS = ["logged_at", "endpoint", "filename", "cv_index", "recommended_job_title", "similarity_score"]
+
+SINK_RECORDS = counter("pathfinder_result_sink_records_total", "Prediction records given to the result sink", ["outcome"])
+
+
+class NullSink:
+    """Discards results; the API default."""
+
+    def write(self, records):
+        pass
+
+    def close(self):
+        pass
+
+
+class JsonlSink(NullSink):
+    """Appends JSON lines to <directory>/predictions-<pid>-<n>.jsonl, starting a new file past rotate_bytes."""
+
+    def __init__(self, directory, rotate_bytes=RESULT_SINK_ROTATE_BYTES):
+        self.directory = Path(directory)
+        self.rotate_bytes = rotate_bytes
+        self.file = None
+        self.part = 0
+
+    def _open(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # One file per worker process, so workers never interleave or rotate each other's files
+        while True:
+            path = self.directory / f"predictions-{os.getpid()}-{self.part:04d}.jsonl"
+            if not path.exists() or path.stat().st_size < self.rotate_bytes:
+                return open(path, "a", encoding="utf-8")
+            self.part += 1
+
+    def write(self, records):
+        if self.file is None:
+            self.file = self._open()
+        self.file.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+        self.file.flush()
+        if self.file.tell() >= self.rotate_bytes:
+            self.file.close()
+            self.file = None
+            self.part += 1
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class ParquetSink(NullSink):
+    """Writes every batch as <directory>/predictions-<pid>-<timestamp>.parquet."""
+
+    def __init__(self, directory):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise RuntimeError("Parquet result sink requires pyarrow (pip install pyarrow)")
+        self.directory = Path(directory)
+
+    def write(self, records):
+        import pandas as pd
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        frame = pd.DataFrame(records, columns=RECORD_FIELDS)
+        frame.to_parquet(self.directory / f"predictions-{os.getpid()}-{time.time_ns()}.parquet", index=False)
+
+
+class SqliteSink(NullSink):
+    """Inserts results into the predictions table of a sqlite file shared by all workers."""
+
+    def __init__(self, path):
+        self.path = path
+        self.db = None
+
+    def _connect(self):
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(f"CREATE TABLE IF NOT EXISTS predictions ({', '.join(RECORD_FIELDS)})")
+        return db
+
+    def write(self, records):
+        if self.db is None:
+            self.db = self._connect()
+        rows = [tuple(record.get(field) for field in RECORD_FIELDS) for record in records]
+        with self.db:
+            self.db.executemany(f"INSERT INTO predictions VALUES ({', '.join('?' * len(RECORD_FIELDS))})", rows)
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+class BackgroundSink:
+    """Queues records for a writer thread that hands them to `sink` in batches."""
+
+    def __init__(self, sink, max_queue=RESULT_SINK_QUEUE, batch_size=RESULT_SINK_BATCH,
+                 flush_seconds=RESULT_SINK_FLUSH_SECONDS):
+        self.sink = sink
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+
+    def _ensure_thread(self):
+        """Start the writer thread on first use (and again after a fork)."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._thread = threading.Thread(target=self._run, name="result-sink", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def write(self, records):
+        self._ensure_thread()
+        for record in records:
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                SINK_RECORDS.inc(outcome="dropped")
+
+    def _run(self):
+        pending = self._queue
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.batch_size:
+                try:
+                    record = pending.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if record is None:
+                    stopping = True
+                    break
+                batch.append(record)
+            if batch:
+                try:
+                    self.sink.write(batch)
+                    SINK_RECORDS.inc(len(batch), outcome="written")
+                except Exception as e:
+                    SINK_RECORDS.inc(len(batch), outcome="failed")
+                    print(f"❌ Writing {len(batch)} prediction records failed: {e}")
+        self.sink.close()
+
+    def close(self, timeout=10):
+        """Write what is still queued, then stop the writer thread."""
+        if self._pid != os.getpid():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+        self._pid = None
+
+
+def make_sink(kind=RESULT_SINK, path=RESULT_SINK_PATH):
+    """The sink named by RESULT_SINK: none, jsonl, parquet or sqlite."""
+    if kind in ("", "none", "null"):
+        return NullSink()
+    if kind == "jsonl":
+        return BackgroundSink(JsonlSink(path))
+    if kind == "parquet":
+        return BackgroundSink(ParquetSink(path))
+    if kind == "sqlite":
+        return BackgroundSink(SqliteSink(path if path.endswith(".db") else os.path.join(path, "predictions.db")))
+    raise ValueError(f"Unknown RESULT_SINK {kind!r}; use none, jsonl, parquet or sqlite")
+
+
+def log_results(records, endpoint, filename=None):
+    """Hand a request's match records to the result sink, stamped with time and endpoint."""
+    if isinstance(result_sink, NullSink):
+        return
+    logged_at = time.time()
+    result_sink.write([
+        {"logged_at": logged_at, "endpoint": endpoint, "filename": record.get("filename", filename), **record}
+        for record in records
+    ])
+
+
+result_sink = make_sink()
+atexit.register(result_sink.close)
@@ -0,0 +1,249 @@
+"""Skill inverted index: a second ranking signal next to TF-IDF cosine.
+
+Maps normalised skill terms to the job postings that mention them. For a
+batch of resumes, one sparse product gathers each resume's IDF-weighted
+skill overlap with every posting; the SKILL_CANDIDATES postings sharing the
+most become its candidates, and only the union of the batch's candidates
+gets the full cosine computation. The two scores are fused:
+
+    fused score = (1 - SKILL_WEIGHT) * cosine + SKILL_WEIGHT * skill overlap
+
+The fused score orders the matches and is returned next to the cosine, which
+the API keeps reporting as similarity_score/score. Resumes without known
+skills, or with fewer live candidates than matches asked for, fall back to
+the job index. The skill vocabulary is every term that extract_skills finds
+in the skill sections of a resume corpus, kept when it is specific enough
+(at most max_df of postings): the commonest skills weigh little in the
+overlap but make up most of the postings, and gathering them would cost as
+much as the cosine scan the candidates replace. Build the index offline and
+enable it (run from the repository root):
+
+    python -m etl_pipeline.skills build
+    SKILL_RANKING=1 python main.py
+"""
+import argparse
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+import joblib
+from scipy import sparse
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+from etl_pipeline.index import top_n_matches
+
+# Share of the fused score that comes from skill overlap
+SKILL_WEIGHT = float(os.getenv("SKILL_WEIGHT", "0.3"))
+# Candidates per resume that get the full cosine computation
+SKILL_CANDIDATES = int(os.getenv("SKILL_CANDIDATES", "2000"))
+# Resumes per sparse skill product; larger batches spill the product's accumulator out of cache
+SKILL_BATCH = 16
+
+# Same tokens extract_skills produces from a skill section
+TERM_REGEX = re.compile(r"\b[a-z0-9+#.]+\b")
+
+# Words that turn up in skill sections but say nothing about skills
+NOT_SKILLS = frozenset(ENGLISH_STOP_WORDS) | frozenset("""
+    company details description exprience experience months monthscompany month year years ltd pvt
+    university college school board education skill skills january february march april may june july
+    august september october november december jan feb mar apr jun jul aug sep oct nov dec present
+    india maharashtra pune mumbai
+""".split())
+
+
+# Numbers, ordinals and durations ("2nd", "12k", "3years"), and list numbering run into a word ("1.exterior")
+NOT_SKILL_REGEX = re.compile(r"^(\d+(st|nd|rd|th|k|m|years?)?|\d+\..*)$")
+
+
+def normalize_term(term):
+    term = term.strip().strip(".").lower()
+    if len(term) < 2 or term in NOT_SKILLS or NOT_SKILL_REGEX.match(term) or not any(c.isalpha() for c in term):
+        return None
+    return term
+
+
+def terms_of(text):
+    """Normalised candidate skill terms in a piece of text."""
+    terms = set()
+    for token in TERM_REGEX.findall(str(text).lower()):
+        term = normalize_term(token)
+        if term:
+            terms.add(term)
+    return terms
+
+
+def skill_vocabulary(resume_csv, text_column="Resume"):
+    """Every term extract_skills finds in the skill sections of a resume corpus."""
+    from etl_pipeline.extract import preprocess_lines, scan_sections
+
+    vocabulary = set()
+    for text in pd.read_csv(resume_csv, usecols=[text_column])[text_column].astype(str):
+        skills = scan_sections(preprocess_lines(text), sections=("skill",))["skill"]
+        vocabulary.update(filter(None, map(normalize_term, skills)))
+    return vocabulary
+
+
+class SkillIndex:
+    """Skill term -> postings matrix (terms x job rows) with an IDF weight per term."""
+
+    def __init__(self, terms, postings, idf, min_df=2, max_df=0.05):
+        self.terms = list(terms)
+        self.term_ids = {term: i for i, term in enumerate(self.terms)}
+        self.postings = sparse.csr_matrix(postings, dtype=np.float32)
+        self.idf = np.asarray(idf, dtype=np.float32)
+        self.min_df = min_df
+        self.max_df = max_df
+
+    @property
+    def n_rows(self):
+        return self.postings.shape[1]
+
+    @staticmethod
+    def _postings(texts, term_ids, first_row=0):
+        rows, cols = [], []
+        for row, text in enumerate(texts, start=first_row):
+            for term in terms_of(text):
+                term_id = term_ids.get(term)
+                if term_id is not None:
+                    rows.append(term_id)
+                    cols.append(row)
+        return rows, cols
+
+    @classmethod
+    def build(cls, texts, vocabulary, min_df=2, max_df=0.05):
+        """Index the posting texts on the vocabulary terms found in at least min_df and at most max_df of them."""
+        texts = list(texts)
+        candidates = sorted(vocabulary)
+        rows, cols = cls._postings(texts, {term: i for i, term in enumerate(candidates)})
+        postings = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                                     shape=(len(candidates), len(texts)))
+        df = np.diff(postings.indptr)
+        keep = np.flatnonzero((df >= min_df) & (df <= max_df * len(texts)))
+        idf = np.log((1 + len(texts)) / (1 + df[keep])) + 1
+        return cls([candidates[i] for i in keep], postings[keep], idf, min_df, max_df)
+
+    def extend(self, texts):
+        """A copy with postings appended as rows n_rows.., on the same terms and IDF."""
+        texts = list(texts)
+        if not texts:
+            return self
+        rows, cols = self._postings(texts, self.term_ids, first_row=self.n_rows)
+        delta = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                                  shape=(len(self.terms), self.n_rows + len(texts)))
+        postings = self.postings.copy()
+        postings.resize(delta.shape)
+        return SkillIndex(self.terms, postings + delta, self.idf, self.min_df, self.max_df)
+
+    def query_matrix(self, skill_lists):
+        """Resumes x skill terms, each indexed skill of a resume weighted by its IDF."""
+        rows, cols = [], []
+        for i, skills in enumerate(skill_lists):
+            ids = sorted({self.term_ids[s] for s in skills if s in self.term_ids})
+            rows.extend([i] * len(ids))
+            cols.extend(ids)
+        cols = np.array(cols, dtype=np.intp)
+        return sparse.csr_matrix((self.idf[cols], (np.array(rows, dtype=np.intp), cols)),
+                                 shape=(len(skill_lists), len(self.terms)))
+
+    def candidates(self, queries, limit=SKILL_CANDIDATES):
+        """Per row of a query_matrix, (job rows, skill overlap in [0, 1]) of the postings sharing the most skills."""
+        # One sparse product gathers the IDF-weighted overlap of every resume in the batch
+        overlap = (queries @ self.postings).tocsr()
+        totals = np.asarray(queries.sum(axis=1)).ravel()
+        result = []
+        for i in range(queries.shape[0]):
+            span = slice(overlap.indptr[i], overlap.indptr[i + 1])
+            rows, shared = overlap.indices[span], overlap.data[span]
+            if len(rows) > limit:
+                keep = np.argpartition(-shared, limit)[:limit]
+                rows, shared = rows[keep], shared[keep]
+            result.append((rows, shared / totals[i] if len(rows) else shared))
+        return result
+
+    def overlap(self, queries, rows):
+        """Skill overlap in [0, 1] of each row of a query_matrix with the postings in the same row of rows."""
+        rows = np.asarray(rows)
+        totals = np.asarray(queries.sum(axis=1)).ravel()
+        terms = np.unique(queries.indices)
+        hits = self.postings[terms][:, rows.ravel()].toarray().reshape(len(terms), *rows.shape)
+        shared = np.einsum("qt,tqk->qk", queries[:, terms].toarray(), hits)
+        return shared / np.where(totals > 0, totals, 1)[:, np.newaxis]
+
+
+def hybrid_search(reference, queries, skill_lists, top_n=3, weight=None, limit=None):
+    """(indices, cosines, fused scores) of the top N rows per query, ranked by the fused score."""
+    weight = SKILL_WEIGHT if weight is None else weight
+    limit = limit or SKILL_CANDIDATES
+    job_index, skill_index = reference.job_index, reference.skill_index
+    skill_lists = list(skill_lists)
+    k = min(top_n, job_index.size)
+    indices = np.zeros((queries.shape[0], k), dtype=np.intp)
+    cosines = np.zeros((queries.shape[0], k))
+    scores = np.zeros((queries.shape[0], k))
+    if k == 0:
+        return indices, cosines, scores
+
+    fallback = []
+    for start in range(0, queries.shape[0], SKILL_BATCH):
+        candidates = skill_index.candidates(skill_index.query_matrix(skill_lists[start:start + SKILL_BATCH]), limit)
+        # The cosine is computed once over the union of the batch's candidates, never the whole catalogue
+        union, inverse = np.unique(np.concatenate([rows for rows, _ in candidates]), return_inverse=True)
+        union_cosines = job_index.score_rows(queries[start:start + SKILL_BATCH], union)
+        offset = 0
+        for j, (rows, overlap) in enumerate(candidates):
+            cosine = union_cosines[j, inverse[offset:offset + len(rows)]]
+            offset += len(rows)
+            fused = (1 - weight) * cosine + weight * overlap
+            live = np.isfinite(fused)
+            if live.sum() < k:
+                fallback.append(start + j)
+                continue
+            idx, sc = top_n_matches(fused[live][np.newaxis, :], k)
+            indices[start + j], cosines[start + j], scores[start + j] = rows[live][idx[0]], cosine[live][idx[0]], sc[0]
+
+    if fallback:
+        # Too few live candidates: the job index ranks, the overlap is computed for the rows it returns
+        idx, sc = job_index.search(queries[fallback], k)
+        overlap = skill_index.overlap(skill_index.query_matrix([skill_lists[i] for i in fallback]), idx)
+        indices[fallback], cosines[fallback] = idx, sc
+        scores[fallback] = (1 - weight) * sc + weight * overlap
+    return indices, cosines, scores
+
+
+def save_skill_index(index, path):
+    joblib.dump({"terms": index.terms, "postings": index.postings, "idf": index.idf,
+                 "min_df": index.min_df, "max_df": index.max_df}, path)
+
+
+def load_skill_index(path, n_rows):
+    """Load a persisted skill index built over the n_rows postings of the reference matrix."""
+    state = joblib.load(path)
+    index = SkillIndex(**state)
+    if index.n_rows != n_rows:
+        raise ValueError(f"Skill index at {path} was built for {index.n_rows} rows, reference matrix has {n_rows}")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the job reference skill inverted index.")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--reference-csv", default="./dataset/job_reference_data.csv")
+    parser.add_argument("--resumes", default="./LSTM/UpdatedResumeDataSet.csv", help="resume corpus the skill vocabulary comes from")
+    parser.add_argument("--output", default="./models/skill_index.joblib")
+    parser.add_argument("--min-df", type=int, default=2, help="minimum postings a skill must appear in")
+    parser.add_argument("--max-df", type=float, default=0.05, help="maximum share of postings a skill may appear in")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    vocabulary = skill_vocabulary(args.resumes)
+    texts = pd.read_csv(args.reference_csv, usecols=["combined_text"])["combined_text"].fillna("")
+    index = SkillIndex.build(texts, vocabulary, args.min_df, args.max_df)
+    save_skill_index(index, args.output)
+    print(f"✅ Built skill index of {len(index.terms)} skills over {index.n_rows} postings "
+          f"in {time.perf_counter() - start:.1f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Fit the TF-IDF vectorizer and job reference matrix into a versioned model bundle.
+
+Replaces the fitting cells of notebook.ipynb with a scripted, deterministic
+build. From a job reference CSV with title/combined_text it writes
+<output-dir>/<version>/ containing:
+
+    tfidf_vectorizer.joblib                 the fitted vectorizer (float32 output)
+    tfidf_matrix_{data,indices,indptr}.npy  float32 L2-normalised CSR matrix, one row per CSV row,
+                                            memory-mappable (see registry.write_matrix)
+    job_titles.npy, job_title_offsets.npy   memory-mappable titles (see registry.write_titles)
+    manifest.json                           build parameters, source CSV hash, shape and file hashes
+
+The version is a hash of the vocabulary, IDF weights, matrix and titles, so
+rebuilding from the same CSV with the same parameters gives the same version.
+--min-df and --max-features prune the vocabulary, which shrinks the matrix
+and the vectorizer. The matrix arrays are stored uncompressed so that forked
+workers memory-map and share them, like the legacy artifacts. Build a bundle
+and serve it (run from the repository root):
+
+    python -m etl_pipeline.train build --min-df 2 --max-features 1000
+    MODEL_DIR=models/bundles/<version> gunicorn -c gunicorn.conf.py main:app
+
+Compare pruning settings with python -m benchmarks.bench_train.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+import joblib
+import sklearn
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from etl_pipeline import registry
+
+BUNDLE_FILES = ("tfidf_vectorizer.joblib", *registry.MATRIX_FILES.values(), "job_titles.npy", "job_title_offsets.npy")
+
+
+def count_or_share(value):
+    """argparse type for min_df: a document count ("2") or a share of documents ("0.001")."""
+    return float(value) if "." in value else int(value)
+
+
+def fit(texts, min_df=1, max_features=1000, ngram_max=2):
+    """Fit the vectorizer the notebook used (English stop words, 1..ngram_max-grams) with float32 output."""
+    vectorizer = TfidfVectorizer(
+        lowercase=True,
+        stop_words="english",
+        ngram_range=(1, ngram_max),
+        min_df=min_df,
+        max_features=max_features or None,
+        dtype=np.float32,
+    )
+    matrix = vectorizer.fit_transform(texts).tocsr()
+    matrix.sort_indices()
+    # Keep the pickle byte-for-byte reproducible: stop_words_ (introspection only) is a set pickled in
+    # hash-seed order, and _stop_words_id an object id that sklearn recomputes on first use anyway
+    if getattr(vectorizer, "stop_words_", None) is not None:
+        vectorizer.stop_words_ = None
+    vars(vectorizer).pop("_stop_words_id", None)
+    return vectorizer, matrix
+
+
+def content_version(vectorizer, matrix, titles):
+    """Short hash of everything matching depends on: vocabulary, IDF, matrix and titles."""
+    digest = hashlib.sha256()
+    digest.update("\n".join(vectorizer.get_feature_names_out()).encode("utf-8"))
+    digest.update(np.ascontiguousarray(vectorizer.idf_).tobytes())
+    for array in (matrix.indptr, matrix.indices, matrix.data):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    digest.update("\n".join(titles).encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+def bundle_files(directory):
+    """Files a bundle's manifest lists (an older layout lists different ones)."""
+    with open(os.path.join(directory, registry.BUNDLE_MANIFEST), encoding="utf-8") as f:
+        return set(json.load(f)["files"])
+
+
+def bundle_bytes(directory):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in BUNDLE_FILES)
+
+
+def build(reference_csv, output_dir, min_df=1, max_features=1000, ngram_max=2):
+    """Fit and write a bundle; returns its directory (left as is when that version exists already)."""
+    start = time.perf_counter()
+    reference = pd.read_csv(reference_csv, usecols=["title", "combined_text"])
+    # Rows are kept 1:1 with the CSV: titles, the skill index and compaction all index it by row
+    titles = reference["title"].fillna("Unknown").astype(str)
+    vectorizer, matrix = fit(reference["combined_text"].fillna(""), min_df, max_features, ngram_max)
+    version = content_version(vectorizer, matrix, titles)
+    fit_seconds = time.perf_counter() - start
+
+    target = os.path.join(output_dir, version)
+    if registry.is_bundle(target) and bundle_files(target) == set(BUNDLE_FILES):
+        print(f"⚠️ Bundle {version} already exists at {target}")
+        return target
+
+    staging = f"{target}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    joblib.dump(vectorizer, os.path.join(staging, "tfidf_vectorizer.joblib"))
+    registry.write_matrix(matrix, staging)
+    registry.write_titles(titles, staging)
+
+    manifest = {
+        "version": version,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "source": {"path": reference_csv, "sha256": registry.file_sha256(reference_csv), "rows": len(reference)},
+        "params": {
+            "min_df": min_df,
+            "max_features": max_features or None,
+            "ngram_range": [1, ngram_max],
+            "stop_words": "english",
+            "dtype": "float32",
+        },
+        "sklearn_version": sklearn.__version__,
+        "shape": list(matrix.shape),
+        "nnz": int(matrix.nnz),
+        "files": {
+            name: {"sha256": registry.file_sha256(os.path.join(staging, name)),
+                   "bytes": os.path.getsize(os.path.join(staging, name))}
+            for name in BUNDLE_FILES
+        },
+    }
+    with open(os.path.join(staging, registry.BUNDLE_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(staging, target)
+
+    print(f"✅ Built bundle {version}: {matrix.shape[0]} postings x {matrix.shape[1]} terms, {matrix.nnz} non-zeros, "
+          f"{bundle_bytes(target) / 1024 / 1024:.1f} MiB in {fit_seconds:.1f}s fit, "
+          f"{time.perf_counter() - start:.1f}s total -> {target}")
+    return target
+
+
+def verify(directory):
+    """Check a bundle's files against its manifest and that its matrix, titles and vocabulary line up."""
+    vectorizer, matrix, manifest = registry.load_bundle(directory)
+    titles = registry.load_titles(matrix.shape[0], directory)
+    if list(matrix.shape) != manifest["shape"] or len(vectorizer.vocabulary_) != matrix.shape[1]:
+        raise RuntimeError(f"Bundle {manifest['version']}: matrix shape {matrix.shape} does not match its manifest")
+    if len(titles) != matrix.shape[0]:
+        raise RuntimeError(f"Bundle {manifest['version']}: {len(titles)} titles for {matrix.shape[0]} rows")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or verify a versioned TF-IDF model bundle.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_cmd = commands.add_parser("build", help="fit the vectorizer and matrix from a job reference CSV")
+    build_cmd.add_argument("--reference-csv", default=os.path.join(registry.DATA_DIR, "job_reference_data.csv"))
+    build_cmd.add_argument("--output-dir", default=os.path.join(registry.MODEL_DIR, "bundles"))
+    build_cmd.add_argument("--min-df", type=count_or_share, default=1,
+                           help="postings (int) or share of postings (float) a term must appear in")
+    build_cmd.add_argument("--max-features", type=int, default=1000, help="vocabulary size cap (0 keeps every term)")
+    build_cmd.add_argument("--ngram-max", type=int, default=2)
+    verify_cmd = commands.add_parser("verify", help="check a bundle against its manifest")
+    verify_cmd.add_argument("bundle")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "build":
+            build(args.reference_csv, args.output_dir, args.min_df, args.max_features, args.ngram_max)
+        else:
+            manifest = verify(args.bundle)
+            print(f"✅ Bundle {manifest['version']} is intact: {manifest['shape'][0]} postings x "
+                  f"{manifest['shape'][1]} terms, built from {manifest['source']['path']}")
+    except Exception as e:
+        raise SystemExit(f"❌ {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""In-memory handling of uploaded PDFs.
+
+Uploads are parsed straight from the request into a spooled buffer that only
+spills to an anonymous, per-request temporary file above UPLOAD_SPILL_BYTES,
+so concurrent workers never share paths on disk. Zip archives are checked
+against their central directory (member count and uncompressed size) before
+any member is read.
+"""
+import io
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+UPLOAD_SPILL_BYTES = int(os.getenv("UPLOAD_SPILL_BYTES", str(8 * 1024 * 1024)))
+# Uncompressed bytes the PDFs of one request's zip archives may add up to
+ZIP_MAX_BYTES = int(os.getenv("ZIP_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+class ArchiveTooLarge(ValueError):
+    """A zip archive refused from its directory alone, before any member was read."""
+
+
+def archive_members(archive, wanted, max_files, counted=0, unpacked=0, max_bytes=ZIP_MAX_BYTES):
+    """The members of a zip archive whose filename wanted() accepts.
+
+    Raises ArchiveTooLarge when they would take the request past max_files
+    files or max_bytes unpacked, given the counted files and unpacked bytes
+    collected so far. Sizes are the declared uncompressed ones, which zipfile
+    never reads past, so a zip bomb is refused without inflating any of it.
+    """
+    members = [m for m in archive.infolist() if not m.is_dir() and wanted(m.filename)]
+    if counted + len(members) > max_files:
+        raise ArchiveTooLarge(f"Too many files, at most {max_files} accepted")
+    unpacked += sum(m.file_size for m in members)
+    if unpacked > max_bytes:
+        raise ArchiveTooLarge(f"Zip archives unpack to more than {max_bytes // (1024 * 1024)} MB of PDFs")
+    return members
+
+
+def spooled_buffer():
+    """Writable buffer kept in memory until it grows past UPLOAD_SPILL_BYTES."""
+    return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPILL_BYTES, mode="w+b")
+
+
+def copy_to_buffer(stream):
+    """Copy a readable stream (e.g. a zip member) into a fresh spooled buffer."""
+    buffer = spooled_buffer()
+    shutil.copyfileobj(stream, buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def is_file_like(obj) -> bool:
+    return hasattr(obj, "read") and hasattr(obj, "seek")
+
+
+def as_stream(source):
+    """Seekable binary stream over bytes or a file-like source, rewound to the start."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    source.seek(0)
+    return source
+
+
+@contextmanager
+def materialize(source):
+    """Yield a filesystem path for tools that need one (pdf2image/poppler).
+
+    Paths are passed through untouched; in-memory sources are written to a
+    unique temporary file that is removed on exit.
+    """
+    if isinstance(source, (str, Path)):
+        yield Path(source)
+        return
+
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            shutil.copyfileobj(as_stream(source), out)
+        yield Path(path)
+    finally:
+        os.remove(path)
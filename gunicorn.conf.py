@@ -0,0 +1,73 @@
+"""Gunicorn settings: load models once in the master, then fork workers that share them.
+
+    gunicorn -c gunicorn.conf.py main:app
+    GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn -c gunicorn.conf.py asgi:app
+"""
+import gc
+import os
+import time
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+# Threaded workers: a /review waiting on the LLM only holds a thread, not a whole worker.
+# The ASGI app (asgi:app) runs on uvicorn.workers.UvicornWorker instead, where threads is unused.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+# Import main:app (and load the memory-mapped artifacts) before forking
+preload_app = True
+
+# Also load spaCy in the master instead of on the first name fallback in each worker
+PRELOAD_SPACY = os.getenv("PRELOAD_SPACY", "0") == "1"
+
+# The config is read before main:app is imported, so this also times the app import
+_started = time.perf_counter()
+
+
+def on_starting(server):
+    # Worker metric files of an earlier run would otherwise be added to this run's counters
+    from etl_pipeline import metrics
+
+    metrics.clear()
+
+
+def when_ready(server):
+    from etl_pipeline import registry
+
+    start = time.perf_counter()
+    registry.preload(nlp=PRELOAD_SPACY)
+    server.log.info(
+        "Master ready: app import + preload %.2fs (preload %.2fs)",
+        time.perf_counter() - _started, time.perf_counter() - start,
+    )
+
+
+def on_reload(server):
+    # kill -HUP <master>: recompile the keyword config here, so the replacement workers fork with it
+    from etl_pipeline import keywords
+
+    try:
+        keywords.reload()
+    except keywords.KeywordConfigError as e:
+        server.log.error("%s; workers keep the current keyword config", e)
+
+
+def pre_fork(server, worker):
+    # Move everything loaded so far out of the collector's reach so GC passes
+    # in the workers don't touch (and un-share) those pages
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    try:
+        import psutil
+
+        mem = psutil.Process().memory_full_info()
+        worker.log.info(
+            "Worker %s started: RSS %.0f MiB, USS %.0f MiB, PSS %.0f MiB",
+            worker.pid, mem.rss / 2**20, mem.uss / 2**20, getattr(mem, "pss", 0) / 2**20,
+        )
+    except Exception as e:
+        worker.log.warning("Worker %s memory report unavailable: %s", worker.pid, e)
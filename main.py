@@ -1,24 +1,89 @@
+import io
 import os
-from flask import Flask, request, jsonify
-import pandas as pd
+import time
+import zipfile
+from flask import Flask, Request, Response, g, request, jsonify, url_for
 import json
 
-from etl_pipeline.extract import extract_resume_features
-from etl_pipeline.predict import predict
+from etl_pipeline.extract import extract_resume_features, check_upload, resolve_names, DocumentRejected
+from etl_pipeline.predict import predict_batch
+from etl_pipeline.sinks import log_results
 
 from etl_pipeline.feedback import feedback
+from etl_pipeline.jobs import job_queue, QueueFull, CallbackRejected, check_callback_url, public_job
+from etl_pipeline.review_client import review_client
+from etl_pipeline import catalogue
+from etl_pipeline import keywords
+from etl_pipeline import metrics
+from etl_pipeline.cache import extraction_cache
+from etl_pipeline.uploads import spooled_buffer, copy_to_buffer, archive_members, ArchiveTooLarge
+from service import ADMIN_TOKEN, MAX_BATCH_FILES, allowed_file, score_upload, review_upload
 
-app = Flask(__name__)
 
-UPLOAD_FOLDER = 'uploads'
+class UploadRequest(Request):
+    """Parses file uploads into per-request buffers that stay in memory below UPLOAD_SPILL_BYTES"""
 
-ALLOWED_EXTENSIONS = {'pdf'}
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return spooled_buffer()
 
-# Ensure upload folder exists
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+app = Flask(__name__)
+app.request_class = UploadRequest
+
+@app.before_request
+def start_request_metrics():
+    g.started = time.perf_counter()
+    g.endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.IN_FLIGHT.inc(endpoint=g.endpoint)
+    metrics.start_flusher()
+    # Opt-in per-request stage breakdown, returned as a Server-Timing header
+    g.trace = metrics.start_trace() if request.headers.get('X-Trace') else None
+    forced = ADMIN_TOKEN and request.headers.get('X-Profile') and request.headers.get('X-Admin-Token') == ADMIN_TOKEN
+    g.profiler = metrics.start_profile() if forced or metrics.should_profile() else None
+    if request.mimetype == 'multipart/form-data':
+        with metrics.stage("upload_parse"):
+            request.files
+
+@app.after_request
+def finish_request_metrics(response):
+    elapsed = time.perf_counter() - g.started
+    metrics.REQUEST_SECONDS.observe(elapsed, endpoint=g.endpoint)
+    metrics.REQUESTS.inc(endpoint=g.endpoint, status=response.status_code)
+    if g.trace is not None:
+        response.headers['Server-Timing'] = metrics.server_timing(metrics.finish_trace(g.trace), elapsed)
+        g.trace = None
+    return response
+
+@app.teardown_request
+def release_request_metrics(error=None):
+    if 'endpoint' not in g:
+        return
+    metrics.IN_FLIGHT.dec(endpoint=g.endpoint)
+    if g.profiler is not None:
+        metrics.finish_profile(g.profiler, g.endpoint.strip('/').replace('/', '_') or 'root')
+
+def wants_async():
+    """Clients opt into a 202 + job id with ?async=1 or a "Prefer: respond-async" header"""
+    return request.args.get('async') in ('1', 'true') or 'respond-async' in request.headers.get('Prefer', '')
+
+def wants_explain():
+    """?explain=1 adds the shared terms behind each recommendation"""
+    return request.args.get('explain') in ('1', 'true')
+
+def enqueue(kind, lane, fn, *args):
+    """Queue a job and answer 202 with where to poll for it"""
+    callback_url = request.form.get('callback_url') or None
+    try:
+        if callback_url:
+            check_callback_url(callback_url)
+    except CallbackRejected as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        job_id = job_queue.submit(kind, lane, fn, *args, callback_url=callback_url)
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": str(e.retry_after)}
+    status_url = url_for('job_status', job_id=job_id)
+    return jsonify({"job_id": job_id, "status": "queued", "lane": lane, "status_url": status_url}), 202, {"Location": status_url}
 
 @app.route('/process-resume', methods=['POST'])
 def process_resume():
@@ -34,32 +99,86 @@ def process_resume():
         if not allowed_file(file.filename):
             return jsonify({"error": "Unsupported file type. Only .pdf accepted"}), 400
 
-        # Save the uploaded file to ./uploads/
-        save_path = os.path.join(UPLOAD_FOLDER, file.filename)
-        file.save(save_path)
+        if wants_async():
+            # The job outlives this request's upload buffer; scans go to the slower OCR lane
+            upload = io.BytesIO(file.stream.read())
+            preflight = check_upload(upload)
+            lane = "ocr" if preflight.needs_ocr else "fast"
+            return enqueue("process-resume", lane, score_upload, upload, file.filename, wants_explain(), preflight)
 
-        # Extract and predict
-        extracted = extract_resume_features(save_path)
-        df_extract = pd.DataFrame([extracted])
-        df_result = pd.DataFrame(predict(df_extract))
+        # Extract and predict straight from the in-memory upload
+        results, status = score_upload(file.stream, file.filename, wants_explain())
+        return jsonify(results), status
 
-        # Delete all files in the upload folder
-        for f in os.listdir(UPLOAD_FOLDER):
-            file_path = os.path.join(UPLOAD_FOLDER, f)
-            if os.path.isfile(file_path):
-                os.remove(file_path)
+    except DocumentRejected as e:
+        return jsonify({"error": str(e)}), e.status
+    except Exception as e:
+        return jsonify({"error": f"Unexpected server error: {e}"}), 500
 
-        return jsonify(df_result.to_dict(orient="records"))
 
+def collect_batch_uploads():
+    """Gather every PDF from a multipart list or zip archive as in-memory buffers."""
+    uploads, unpacked = [], 0
+    for file in request.files.getlist('files') + request.files.getlist('file'):
+        if file.filename == '':
+            continue
+        if file.filename.lower().endswith('.zip'):
+            with zipfile.ZipFile(file.stream) as archive:
+                # Checked from the archive's directory before anything is unpacked
+                members = archive_members(archive, allowed_file, MAX_BATCH_FILES, len(uploads), unpacked)
+                unpacked += sum(member.file_size for member in members)
+                for member in members:
+                    with archive.open(member) as src:
+                        uploads.append((os.path.basename(member.filename), copy_to_buffer(src)))
+        elif allowed_file(file.filename):
+            uploads.append((file.filename, file.stream))
+    return uploads
+
+
+@app.route('/process-resumes', methods=['POST'])
+def process_resumes():
+    """Score a batch of resumes with one TF-IDF transform and one similarity pass"""
+    uploads = []
+    try:
+        uploads = collect_batch_uploads()
+
+        if not uploads:
+            return jsonify({"error": "No PDF files in request"}), 400
+
+        if len(uploads) > MAX_BATCH_FILES:
+            return jsonify({"error": f"Too many files, at most {MAX_BATCH_FILES} accepted"}), 413
+
+        filenames, features, errors = [], [], []
+        for filename, buffer in uploads:
+            try:
+                features.append(extract_resume_features(buffer, resolve_name=False))
+                filenames.append(filename)
+            except Exception as e:
+                errors.append({"filename": filename, "error": str(e)})
+        # Headers without a rule-based name go through spaCy together
+        features = resolve_names(features)
+
+        results = predict_batch(features, explain=wants_explain()) if features else []
+        for record in results:
+            record["filename"] = filenames[record["cv_index"] - 1]
+        log_results(results, "/process-resumes")
+
+        return jsonify({"results": results, "errors": errors})
+
+    except zipfile.BadZipFile as e:
+        return jsonify({"error": f"Invalid zip archive: {e}"}), 400
+    except ArchiveTooLarge as e:
+        return jsonify({"error": str(e)}), 413
     except Exception as e:
         return jsonify({"error": f"Unexpected server error: {e}"}), 500
-    
+    finally:
+        for _, buffer in uploads:
+            buffer.close()
+
 
 @app.route('/review', methods=['POST'])
 def review_profile():
     try:
-        print("DEBUG: Request received")
-        
         if 'file' not in request.files:
             return jsonify({"error": "No file part in request"}), 400
 
@@ -71,28 +190,14 @@ def review_profile():
         if not allowed_file(file.filename):
             return jsonify({"error": "Unsupported file type. Only .pdf accepted"}), 400
 
-        # Save the uploaded file to ./uploads/
-        save_path = os.path.join(UPLOAD_FOLDER, file.filename)
-        file.save(save_path)
-
-        # Extract and predict
-        extracted = extract_resume_features(save_path)
-        df = pd.DataFrame([extracted])
-
-        print("DEBUG: Extraction result", df.to_dict())
+        if wants_async():
+            return enqueue("review", "llm", review_upload, io.BytesIO(file.stream.read()))
 
-        result = feedback(df.iloc[0])
-        print("DEBUG: Type of feedback return", type(result))
-
-        # Delete all files in the upload folder
-        for f in os.listdir(UPLOAD_FOLDER):
-            file_path = os.path.join(UPLOAD_FOLDER, f)
-            if os.path.isfile(file_path):
-                os.remove(file_path)
-
-        return result
-        
+        # Extract straight from the in-memory upload
+        return feedback(extract_resume_features(file.stream))
 
+    except DocumentRejected as e:
+        return jsonify({"error": str(e)}), e.status
     except Exception as e:
         return jsonify({"error": f"Review process failed: {e}"}), 500
 
@@ -105,6 +210,104 @@ def health_check():
         "version": "1.0.0"
     })
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Status of an async job, with its result once finished"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return jsonify(public_job(job))
+
+@app.route('/job-stats', methods=['GET'])
+def job_stats():
+    """Lane queue depths of this worker and job counts by status"""
+    return jsonify(job_queue.stats())
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics: per-stage latency histograms, request counters and in-flight gauges"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/cache-stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss counters of the extraction cache"""
+    return jsonify(extraction_cache.stats())
+
+@app.route('/review-stats', methods=['GET'])
+def review_stats():
+    """Request/retry counters and cache hits of the LLM review client"""
+    return jsonify(review_client.stats())
+
+def admin_denied():
+    if ADMIN_TOKEN and request.headers.get('X-Admin-Token') != ADMIN_TOKEN:
+        return jsonify({"error": "Invalid admin token"}), 403
+    return None
+
+@app.route('/catalogue', methods=['GET'])
+def catalogue_stats():
+    """Generation, version and posting counts of the job catalogue in this worker"""
+    return jsonify(catalogue.stats())
+
+@app.route('/catalogue/jobs', methods=['POST'])
+def add_jobs():
+    """Append job postings ({"title", "text"} or {"jobs": [...]}) without a refit"""
+    denied = admin_denied()
+    if denied:
+        return denied
+    try:
+        payload = request.get_json(silent=True) or {}
+        postings = payload.get("jobs", [payload] if payload else [])
+        if not postings:
+            return jsonify({"error": "No job postings in request"}), 400
+        job_ids = catalogue.add_postings(postings)
+        return jsonify({"job_ids": job_ids, **catalogue.stats()}), 201
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Catalogue update failed: {e}"}), 500
+
+@app.route('/catalogue/jobs/<int:job_id>', methods=['DELETE'])
+def remove_job(job_id):
+    """Retire a job posting by job id"""
+    denied = admin_denied()
+    if denied:
+        return denied
+    try:
+        removed, unknown = catalogue.remove_postings([job_id])
+        if unknown:
+            return jsonify({"error": f"Unknown job id {job_id}"}), 404
+        return jsonify({"removed": removed, **catalogue.stats()})
+    except Exception as e:
+        return jsonify({"error": f"Catalogue update failed: {e}"}), 500
+
+@app.route('/catalogue/compact', methods=['POST'])
+def compact_catalogue():
+    """Fold added/retired postings into a new generation in a background process"""
+    denied = admin_denied()
+    if denied:
+        return denied
+    if catalogue.start_compaction() is None:
+        return jsonify({"error": "Compaction already running"}), 409
+    return jsonify({"status": "compaction started"}), 202
+
+@app.route('/keywords', methods=['GET'])
+def keyword_stats():
+    """Compile time, group sizes and warnings of the keyword config in this worker"""
+    return jsonify(keywords.stats())
+
+@app.route('/keywords/reload', methods=['POST'])
+def reload_keywords():
+    """Reload the keyword config in this worker now; the others pick it up on their next poll"""
+    denied = admin_denied()
+    if denied:
+        return denied
+    try:
+        return jsonify(keywords.reload().stats())
+    except keywords.KeywordConfigError as e:
+        return jsonify({"error": "Invalid keyword config, current one kept", "problems": e.problems}), 400
+    except Exception as e:
+        return jsonify({"error": f"Keyword config reload failed: {e}"}), 500
+
 @app.route('/debug-extract', methods=['POST'])
 def debug_extract():
     """Debug endpoint to see extracted features"""
@@ -120,16 +323,8 @@ def debug_extract():
         if not allowed_file(file.filename):
             return jsonify({"error": "Unsupported file type. Only .pdf accepted"}), 400
 
-        # Save the uploaded file to ./uploads/
-        save_path = os.path.join(UPLOAD_FOLDER, file.filename)
-        file.save(save_path)
-
-        # Extract features
-        extracted = extract_resume_features(save_path)
-        
-        # Delete uploaded file
-        if os.path.exists(save_path):
-            os.remove(save_path)
+        # Extract features straight from the in-memory upload
+        extracted = extract_resume_features(file.stream)
 
         return jsonify({
             "extracted_features": extracted,
@@ -141,6 +336,8 @@ def debug_extract():
             }
         })
 
+    except DocumentRejected as e:
+        return jsonify({"error": str(e)}), e.status
     except Exception as e:
         return jsonify({"error": f"Debug extraction failed: {e}"}), 500
 
@@ -0,0 +1,44 @@
+"""Upload validation, limits and job bodies shared by the Flask (main.py) and FastAPI (asgi.py) apps.
+
+Neither app imports the other: each builds only its own framework's app.
+"""
+import os
+
+from etl_pipeline.extract import extract_resume_features, DocumentRejected
+from etl_pipeline.predict import predict_batch
+from etl_pipeline.sinks import log_results
+from etl_pipeline.feedback import review
+
+ALLOWED_EXTENSIONS = {'pdf'}
+
+# Maximum number of resumes accepted by /process-resumes in one request
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "512"))
+
+# When set, /catalogue changes and /keywords/reload require a matching X-Admin-Token header
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+def score_upload(stream, filename, explain=False, preflight=None):
+    """(match records, HTTP status) of one uploaded resume"""
+    try:
+        results = predict_batch([extract_resume_features(stream, preflight=preflight)], explain=explain)
+        log_results(results, "/process-resume", filename)
+        return results, 200
+    except DocumentRejected as e:
+        return {"error": str(e)}, e.status
+    finally:
+        stream.close()
+
+
+def review_upload(stream):
+    """(review body, HTTP status) of one uploaded resume"""
+    try:
+        return review(extract_resume_features(stream))
+    except DocumentRejected as e:
+        return {"error": str(e)}, e.status
+    finally:
+        stream.close()